@@ -1,5 +1,5 @@
 """
-ASGI config for cleanify_v2 project.
+ASGI config for cleanify project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
@@ -11,6 +11,10 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cleanify_v2.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cleanify.settings')
 
 application = get_asgi_application()
+
+from waste_management.dispatcher import start_configured_dispatch_loop  # noqa: E402 (needs the app registry)
+
+start_configured_dispatch_loop()
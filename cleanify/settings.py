@@ -23,6 +23,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'waste_management.middleware.StaticFilesMiddleware',
+    'waste_management.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,9 +58,55 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Several gunicorn processes share this file: wait for the write lock instead of
+        # failing fast, and take it at BEGIN so assignment transactions never deadlock on upgrade.
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Rendered dashboard fragments live in their own cache, picked with CLEANIFY_FRAGMENT_CACHE_BACKEND:
+# 'locmem' (the default), 'redis' or 'file' (both shared by every server process), or 'dummy' to turn
+# fragment caching off. CLEANIFY_FRAGMENT_CACHE_LOCATION overrides the directory/URL.
+# With 'locmem' a version bump made while saving in one process does not reach the others, which keep
+# serving the old fragment until it expires, so the expiry defaults to seconds rather than minutes
+# (see CLEANIFY_FRAGMENT_CACHE_SECONDS). Run several processes with 'redis'. 'file' lists the whole
+# directory on every write (about 30 ms at 10,000 entries, and every request save writes), so it only
+# suits small deployments without Redis.
+FRAGMENT_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'cleanify-fragments', {'MAX_ENTRIES': 2000}),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / 'cache' / 'fragments'), {'MAX_ENTRIES': 5000}),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1', {}),
+    'dummy': ('django.core.cache.backends.dummy.DummyCache', '', {}),
+}
+_fragment_backend_name = os.getenv('CLEANIFY_FRAGMENT_CACHE_BACKEND', 'locmem')
+_fragment_backend, _fragment_location, _fragment_options = FRAGMENT_CACHE_BACKENDS[_fragment_backend_name]
+# Users' resolved roles (roles.py) use the same kind of shared backend, kept apart so clearing the
+# fragments does not drop them. CLEANIFY_ROLE_CACHE_LOCATION overrides the directory/URL.
+ROLE_CACHE_LOCATIONS = {
+    'locmem': 'cleanify-roles',
+    'file': str(BASE_DIR / 'cache' / 'roles'),
+    'redis': 'redis://127.0.0.1:6379/2',
+    'dummy': '',
+}
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'fragments': {
+        'BACKEND': _fragment_backend,
+        'LOCATION': os.getenv('CLEANIFY_FRAGMENT_CACHE_LOCATION', _fragment_location),
+        'OPTIONS': _fragment_options,
+    },
+    'roles': {
+        'BACKEND': _fragment_backend,
+        'LOCATION': os.getenv('CLEANIFY_ROLE_CACHE_LOCATION', ROLE_CACHE_LOCATIONS[_fragment_backend_name]),
+        'OPTIONS': _fragment_options,
+    },
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',},
@@ -77,6 +125,22 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')] 
+# collectstatic writes here; StaticFilesMiddleware serves it when CLEANIFY_SERVE_STATIC is on.
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    # Outside DEBUG, {% static %} links content-hashed copies (with .gz/.br variants) that collectstatic
+    # made, so they can be cached for a year; while debugging it links the source files as they are.
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'waste_management.staticfiles.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -114,3 +178,92 @@ LOGGING = {
          },
     },
 }
+
+# Free-worker pool used by auto-assignment: 'random', 'least_recent' or 'rating'.
+CLEANIFY_WORKER_POOL_POLICY = os.getenv('CLEANIFY_WORKER_POOL_POLICY', 'random')
+# Seconds between database re-reads of a category when the pool has no free worker for it.
+CLEANIFY_WORKER_POOL_MISS_REFRESH = 2.0
+# Give a request with a known building to the closest free worker of its category (by last known location).
+CLEANIFY_NEAREST_WORKER = True
+# Side of a cell in the pool's spatial grid, in the same units (metres) as Building.x/y.
+CLEANIFY_WORKER_GRID_CELL_METRES = 100.0
+# Run the bulk pending-queue dispatcher inside each server process every N seconds (unset: disabled).
+# Started by cleanify/wsgi.py and asgi.py only; `manage.py dispatch_pending --loop` runs it as one separate process.
+CLEANIFY_DISPATCH_INTERVAL = float(os.getenv('CLEANIFY_DISPATCH_INTERVAL', '0')) or None
+# Hours each priority (1 Low .. 4 Urgent) is moved ahead in the Pending queue. A request can only be
+# overtaken by work that arrived less than the difference in head starts after it, so nothing starves.
+CLEANIFY_PRIORITY_HEAD_START_HOURS = {1: 0, 2: 2, 3: 8, 4: 24}
+# Further hours a request is moved ahead each time its completed work is rejected.
+CLEANIFY_REJECTION_HEAD_START_HOURS = 4
+# Processes rendering image thumbnails/medium renditions off the request thread (0: render inline).
+CLEANIFY_IMAGE_WORKERS = int(os.getenv('CLEANIFY_IMAGE_WORKERS', '2'))
+# Seconds an unreferenced content-addressed image is kept before collect_media_garbage may purge it.
+CLEANIFY_MEDIA_GC_GRACE = int(os.getenv('CLEANIFY_MEDIA_GC_GRACE', str(24 * 3600)))
+# Admin changelists stop counting matching rows here, or at the end of the page after the one shown if that is
+# further, so every page stays reachable (the request list knows its unfiltered totals exactly).
+CLEANIFY_ADMIN_COUNT_CAP = 10000
+# Per-view budgets enforced by bench_views: {scenario: (max SQL queries, p95 latency in ms)}.
+CLEANIFY_VIEW_BUDGETS = {
+    'requestee_dashboard GET': (6, 150),
+    'requestee_dashboard GET cached': (2, 30),
+    'create_request GET': (4, 100),
+    'create_request POST': (22, 400),
+    'approve_request GET': (5, 100),
+    'approve_request POST': (15, 300),
+    'worker_dashboard GET': (5, 150),
+    'worker_dashboard GET cached': (2, 30),
+    'complete_task GET': (5, 100),
+    'complete_task POST': (24, 400),
+    'admin_dashboard GET': (6, 200),
+    'admin_dashboard GET cached': (2, 30),
+    'admin_sla GET': (4, 100),
+    'admin_manual_assign GET': (6, 300),
+    'admin_manual_assign POST': (15, 300),
+    'media GET': (3, 30),
+    'admin_export GET': (4, 150),
+    'admin_search GET': (5, 100),
+    'worker_assignment_poll GET': (4, 50),
+}
+# Directory shared by all server processes on this host for /metrics snapshots (unset: this process's
+# metrics only). Snapshots of exited processes are folded into a live process's and deleted.
+CLEANIFY_METRICS_DIR = os.getenv('CLEANIFY_METRICS_DIR') or None
+# Seconds between snapshot writes per process.
+CLEANIFY_METRICS_FLUSH_INTERVAL = 1.0
+# Bearer token a scraper sends (Authorization: Bearer <token>) to read /metrics. Unset, only staff sessions can.
+CLEANIFY_METRICS_TOKEN = os.getenv('CLEANIFY_METRICS_TOKEN') or None
+# Addresses allowed to scrape /metrics with neither, comma-separated. Empty by default: behind a reverse proxy
+# every request arrives from 127.0.0.1, so only list addresses that reach the app directly.
+CLEANIFY_METRICS_ALLOWED_IPS = [ip.strip() for ip in os.getenv('CLEANIFY_METRICS_ALLOWED_IPS', '').split(',') if ip.strip()]
+# Serve the three dashboards with the async views in async_views.py (best under ASGI).
+CLEANIFY_ASYNC_DASHBOARDS = os.getenv('CLEANIFY_ASYNC_DASHBOARDS', '').lower() in ('1', 'true', 'yes')
+# CACHES alias holding users' resolved roles. Unless it is shared by every server process (redis or file),
+# a process that did not handle a profile change keeps the old role until CLEANIFY_ROLE_CACHE_TTL.
+CLEANIFY_ROLE_CACHE = 'roles'
+# Backends whose deletions every server process sees; with any other, cached entries expire quickly.
+_shared_cache = _fragment_backend_name in ('redis', 'file')
+# Seconds a user's resolved role/category stays cached (it is also dropped whenever the UserProfile is saved).
+CLEANIFY_ROLE_CACHE_TTL = 300 if _shared_cache else 30
+# CACHES alias holding the rendered dashboard fragments (see waste_management/fragment_cache.py).
+CLEANIFY_FRAGMENT_CACHE = 'fragments'
+# Seconds a rendered fragment is kept. Saves through the ORM replace it at once in a shared cache; this
+# bounds how long a change made behind the signals' back (raw SQL, queryset.update() elsewhere), or in
+# another process with the per-process 'locmem', can go unseen.
+CLEANIFY_FRAGMENT_CACHE_SECONDS = 300 if _shared_cache else 30
+# Serve STATIC_ROOT from StaticFilesMiddleware (run collectstatic first). runserver serves static files itself while DEBUG.
+CLEANIFY_SERVE_STATIC = not DEBUG
+# Cache lifetime, in seconds, of collected static files without a hashed name (hashed ones are cached for a year).
+CLEANIFY_STATIC_MAX_AGE = 60
+# Hand media transfers to the front server after the permission check: 'x-accel-redirect' (nginx) or
+# 'x-sendfile' (Apache mod_xsendfile, lighttpd). None streams them from Python.
+CLEANIFY_MEDIA_OFFLOAD = os.getenv('CLEANIFY_MEDIA_OFFLOAD') or None
+# With x-accel-redirect: the nginx `internal` location whose alias is MEDIA_ROOT.
+CLEANIFY_MEDIA_ACCEL_PREFIX = os.getenv('CLEANIFY_MEDIA_ACCEL_PREFIX', '/protected-media/')
+# Node.js executable used by build_css to run the Tailwind compiler.
+CLEANIFY_NODE = os.getenv('CLEANIFY_NODE', 'node')
+# Seconds the worker assignment long-poll is held open before answering 204 (the page then polls again).
+# Only under ASGI: under WSGI a held poll would tie up a server worker per open dashboard.
+CLEANIFY_ASSIGNMENT_LONGPOLL_TIMEOUT = 25
+# Under WSGI the poll answers at once; seconds the page waits before the next one (it backs off while idle).
+CLEANIFY_ASSIGNMENT_SHORT_POLL_INTERVAL = 15
+# Seconds between database re-checks while a long-poll waits, to see assignments made by other processes.
+CLEANIFY_ASSIGNMENT_POLL_INTERVAL = float(os.getenv('CLEANIFY_ASSIGNMENT_POLL_INTERVAL', '5'))
@@ -22,6 +22,11 @@ urlpatterns = [
   
     path('dashboard-hub/', waste_views.dashboard_redirect_view, name='dashboard_redirect'),
 
+    path('metrics', waste_views.metrics_view, name='metrics'),
+
+    # Uploaded images, checked against the request they belong to (DEBUG or not).
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:name>", waste_views.media_view, name='media'),
+
     
     path('app/', include('waste_management.urls')), 
 
@@ -29,6 +34,5 @@ urlpatterns = [
 
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)  
 
@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cleanify.settings')
 
 application = get_wsgi_application()
+
+from waste_management.dispatcher import start_configured_dispatch_loop  # noqa: E402 (needs the app registry)
+
+start_configured_dispatch_loop()
@@ -1,9 +1,18 @@
 
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR, SEARCH_VAR
+from django.db import models
+from django.db.models import F
+from django.utils import timezone
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin 
 from django.contrib.auth.models import User, Group
 
-from .models import UserProfile, WasteRequest 
+from .models import Building, RequestStatusCount, UserProfile, WasteRequest 
+from .pagination import EstimatedCountPaginator
+from .search import search_available, search_requests
 
 class UserProfileInline(admin.StackedInline):
     model = UserProfile
@@ -11,9 +20,9 @@ class UserProfileInline(admin.StackedInline):
     verbose_name_plural = 'User Profile Details'
     fk_name = 'user' 
 
-    fields = ('role', 'category', 'is_busy', 'average_rating')
+    fields = ('role', 'category', 'current_task', 'average_rating', 'rating_count', 'recent_rating')
  
-    readonly_fields = ('average_rating',)
+    readonly_fields = ('current_task', 'average_rating', 'rating_count', 'recent_rating')
 
     def get_formset(self, request, obj=None, **kwargs):
         """
@@ -30,19 +39,33 @@ class UserProfileInline(admin.StackedInline):
 
     def get_readonly_fields(self, request, obj=None):
         """
-        Make 'category' and 'is_busy' readonly if the role is not 'Worker'.
-        'average_rating' is always readonly.
+        Make 'category' readonly if the role is not 'Worker'.
+        The current task and rating fields are always readonly.
         """
-        readonly = ['average_rating']
+        readonly = ['current_task', 'average_rating', 'rating_count', 'recent_rating']
         if obj and hasattr(obj, 'profile') and obj.profile.role != 'Worker':
-            readonly.extend(['category', 'is_busy'])
+            readonly.append('category')
         return readonly
 
 
 
-class CustomUserAdmin(BaseUserAdmin):
+class EstimatedCountAdminMixin:
+    """ Hands the requested page to the EstimatedCountPaginator, so it counts far enough to reach the next one. """
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        try:
+            page = max(int(request.GET.get(PAGE_VAR, 1)), 1)
+        except ValueError:
+            page = 1
+        return self.paginator(queryset, per_page, orphans, allow_empty_first_page, page=page)
+
+
+class CustomUserAdmin(EstimatedCountAdminMixin, BaseUserAdmin):
   
     inlines = (UserProfileInline,)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
     
     list_display = (
         'username', 'email', 'first_name', 'last_name', 'is_staff',
@@ -66,7 +89,8 @@ class CustomUserAdmin(BaseUserAdmin):
     def get_worker_is_busy(self, instance):
         if hasattr(instance, 'profile') and instance.profile.role == 'Worker':
             return instance.profile.is_busy
-        return "---"
+        # A boolean column: None shows the 'unknown' icon.
+        return None
     get_worker_is_busy.short_description = 'Is Busy?'
     get_worker_is_busy.boolean = True
 
@@ -85,25 +109,80 @@ class CustomUserAdmin(BaseUserAdmin):
         user_instance = form.instance
         if hasattr(user_instance, 'profile') and user_instance.profile.role == 'Worker':
             user_instance.profile.update_busy_status()
-            user_instance.profile.update_average_rating() 
 
 
 
+class DateHierarchyQuerySet(models.QuerySet):
+    """
+    The request changelist's queryset. On SQLite the stock datetimes() truncates every
+    matching row in Python, and the date hierarchy calls it on every load. Here it is
+    answered with one indexed EXISTS probe per year, month or day between the first and
+    last value instead. The hierarchy narrows the list to one year before asking for
+    months, and to one month before asking for days, so that is a few dozen probes at most.
+    """
+    # Periods probed one by one before falling back to the stock row-by-row DISTINCT.
+    MAX_PERIOD_PROBES = 40
+
+    def datetimes(self, field_name, kind, order='ASC', tzinfo=None):
+        """ The distinct periods as a list (which is all the date hierarchy needs), in `order`. """
+        if kind not in ('year', 'month', 'day') or not settings.USE_TZ:
+            return list(super().datetimes(field_name, kind, order, tzinfo))
+        tz = tzinfo or timezone.get_current_timezone()
+        values = self.exclude(**{f"{field_name}__isnull": True}).order_by().values_list(field_name, flat=True)
+        first = values.order_by(field_name).first()
+        if first is None:
+            return []
+        last = timezone.localtime(values.order_by(f"-{field_name}").first(), tz)
+        period = timezone.localtime(first, tz).replace(hour=0, minute=0, second=0, microsecond=0)
+        period = period.replace(month=1, day=1) if kind == 'year' else period.replace(day=1) if kind == 'month' else period
+        periods = []
+        while period <= last:
+            periods.append(period)
+            if len(periods) > self.MAX_PERIOD_PROBES:
+                return list(super().datetimes(field_name, kind, order, tzinfo))
+            if kind == 'year':
+                period = period.replace(year=period.year + 1)
+            elif kind == 'month':
+                period = period.replace(year=period.year + period.month // 12, month=period.month % 12 + 1)
+            else:
+                period = datetime.combine(period.date() + timedelta(days=1), time.min, tzinfo=tz)
+        ends = periods[1:] + [period]
+        found = [
+            start for start, end in zip(periods, ends)
+            if values.filter(**{f"{field_name}__gte": start, f"{field_name}__lt": end}).exists()
+        ]
+        return found if order == 'ASC' else found[::-1]
+
+
+class WasteRequestPaginator(EstimatedCountPaginator):
+    """ Unfiltered and status/category-filtered lists are counted exactly, from RequestStatusCount. """
+
+    def known_count(self):
+        return RequestStatusCount.total_for(self.object_list)
+
+
 @admin.register(WasteRequest) 
-class WasteRequestAdmin(admin.ModelAdmin):
+class WasteRequestAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
     list_display = (
-        'id', 'requestee_link', 'category', 'location', 'status',
+        'id', 'requestee_link', 'category', 'priority', 'location', 'status',
         'assigned_worker_link', 'worker_rating_display', 'is_approved_by_student',
         'created_at', 'updated_at'
     )
-    list_filter = ('status', 'category', 'is_approved_by_student', 'created_at', 'worker_rating')
+    list_select_related = ('requestee', 'assigned_worker')
+    # Only choice and boolean filters: none of them reads the table to build its options.
+    list_filter = ('status', 'category', 'priority', 'is_approved_by_student', 'worker_rating')
+    date_hierarchy = 'created_at'
+    paginator = WasteRequestPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
     search_fields = (
         'location', 'description', 'requestee__username',
         'assigned_worker__username', 'category'
     )
   
+    raw_id_fields = ('requestee', 'assigned_worker', 'building')
     readonly_fields = (
-        'created_at', 'updated_at', 'assigned_at', 'approved_at',
+        'created_at', 'updated_at', 'assigned_at', 'approved_at', 'queue_at',
 
     )
 
@@ -111,6 +190,25 @@ class WasteRequestAdmin(admin.ModelAdmin):
     list_per_page = 25 
     ordering = ('-created_at',) 
 
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return DateHierarchyQuerySet(self.model, query=queryset.query.chain(), using=queryset.db)
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Location and description go through the full-text index; usernames and the
+        category match by prefix instead of anywhere in the text (search_requests).
+        """
+        if not search_term.strip() or not search_available():
+            return super().get_search_results(request, queryset, search_term)
+        return search_requests(queryset, search_term, usernames=True), False
+
+    def get_ordering(self, request):
+        # Best match first, unless a column header was clicked (which replaces this ordering).
+        if request.GET.get(SEARCH_VAR, '').strip() and search_available():
+            return (F('search_rank').asc(nulls_last=True),)
+        return super().get_ordering(request)
+
     def requestee_link(self, obj):
         from django.urls import reverse
         from django.utils.html import format_html
@@ -132,6 +230,15 @@ class WasteRequestAdmin(admin.ModelAdmin):
     assigned_worker_link.short_description = 'Assigned Worker'
     assigned_worker_link.admin_order_field = 'assigned_worker__username'
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and {'worker_rating', 'status', 'assigned_worker'}.intersection(form.changed_data):
+            # Hand edits bypass the incremental rating counters, so recompute the affected workers.
+            worker_ids = {obj.assigned_worker_id, form.initial.get('assigned_worker')} - {None}
+            for profile in UserProfile.objects.filter(user_id__in=worker_ids, role='Worker').select_related('user'):
+                profile.update_average_rating()
+                profile.update_busy_status()
+
     def worker_rating_display(self, obj):
         return obj.get_worker_rating_display() if obj.worker_rating else "Not Rated"
     worker_rating_display.short_description = 'Rating Given'
@@ -142,16 +249,46 @@ try:
 except admin.sites.NotRegistered:
     pass
 admin.site.register(User, CustomUserAdmin)
+class BusyListFilter(admin.SimpleListFilter):
+    """ is_busy is derived from current_task, so filter on that. """
+    title = 'busy'
+    parameter_name = 'is_busy'
+
+    def lookups(self, request, model_admin):
+        return (('1', 'Yes'), ('0', 'No'))
+
+    def queryset(self, request, queryset):
+        if self.value() in ('0', '1'):
+            return queryset.filter(current_task__isnull=self.value() == '0')
+        return queryset
+
+
 @admin.register(UserProfile)
-class UserProfileAdmin(admin.ModelAdmin):
-    list_display = ('user', 'role', 'category', 'is_busy', 'average_rating')
-    list_filter = ('role', 'category', 'is_busy')
+class UserProfileAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
+    list_display = ('user', 'role', 'category', 'get_is_busy', 'average_rating')
+    list_select_related = ('user',)
+    list_filter = ('role', 'category', BusyListFilter)
+    raw_id_fields = ('user',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
     search_fields = ('user__username', 'category')
-    readonly_fields = ('average_rating',) 
+    readonly_fields = ('current_task', 'average_rating', 'rating_sum', 'rating_count', 'recent_rating', 'location_x', 'location_y', 'location_updated_at') 
+
+    def get_is_busy(self, obj):
+        return obj.is_busy
+    get_is_busy.short_description = 'Is Busy?'
+    get_is_busy.boolean = True
 
     
     def save_model(self, request, obj, form, change):
         super().save_model(request, obj, form, change)
         if obj.role == 'Worker':
             obj.update_busy_status()
-            obj.update_average_rating()
+
+
+@admin.register(Building)
+class BuildingAdmin(admin.ModelAdmin):
+    list_display = ('name', 'zone', 'x', 'y')
+    list_filter = ('zone',)
+    search_fields = ('name', 'zone')
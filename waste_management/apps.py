@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class WasteManagementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'waste_management'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from . import signals
+
+        post_migrate.connect(signals.restore_search_index_after_migrate, sender=self)
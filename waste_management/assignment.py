@@ -0,0 +1,136 @@
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+import logging
+
+from .models import UserProfile, WasteRequest
+from .transitions import Transition, notify_transitions
+from .worker_pool import get_worker_pool
+
+logger = logging.getLogger(__name__)
+
+
+CLAIMED = 'claimed'
+LOST_WORKER = 'lost_worker'
+LOST_REQUEST = 'lost_request'
+NO_WORKER = 'no_worker'
+NO_REQUEST = 'no_request'
+
+
+class AssignmentResult:
+    """ Outcome of an assignment attempt. Truthy only when the worker and request were both claimed. """
+
+    def __init__(self, outcome, request_id=None, worker_id=None, assigned_at=None):
+        self.outcome = outcome
+        self.request_id = request_id
+        self.worker_id = worker_id
+        self.assigned_at = assigned_at
+
+    def __bool__(self):
+        return self.outcome == CLAIMED
+
+    @property
+    def claimed(self):
+        return self.outcome == CLAIMED
+
+    def __repr__(self):
+        return f"<AssignmentResult {self.outcome} request={self.request_id} worker={self.worker_id}>"
+
+
+def claim_assignment(request_id, worker_id, category=None):
+    """
+    Atomically pairs a Pending request with a free worker.
+
+    Both rows are claimed with conditional UPDATEs inside one transaction, always
+    worker first (setting their current_task) and then request, so concurrent
+    callers in any number of processes cannot hand the same worker or the same
+    request out twice. If the request was taken in the meantime the worker claim
+    is rolled back.
+    """
+    assigned_at = timezone.now()
+    with transaction.atomic():
+        workers = UserProfile.objects.filter(user_id=worker_id, role='Worker', current_task__isnull=True, user__is_active=True)
+        if category is not None:
+            workers = workers.filter(category=category)
+        if not workers.update(current_task_id=request_id):
+            return AssignmentResult(LOST_WORKER, request_id, worker_id)
+
+        claimed = WasteRequest.objects.filter(pk=request_id, status='Pending').update(
+            status='Assigned',
+            assigned_worker_id=worker_id,
+            assigned_at=assigned_at,
+            updated_at=assigned_at,
+        )
+        if not claimed:
+            transaction.set_rollback(True)
+            return AssignmentResult(LOST_REQUEST, request_id, worker_id)
+
+        claimed_category, created_at, requestee_id = WasteRequest.objects.filter(pk=request_id).values_list(
+            'category', 'created_at', 'requestee_id'
+        ).get()
+        notify_transitions(WasteRequest, [Transition(
+            request_id=request_id, category=claimed_category, old_status='Pending', new_status='Assigned',
+            worker_id=worker_id, created_at=created_at, at=assigned_at, old_category=claimed_category,
+            requestee_id=requestee_id,
+        )])
+
+    logger.debug(f"Claimed Request ID: {request_id} for Worker ID: {worker_id}")
+    return AssignmentResult(CLAIMED, request_id, worker_id, assigned_at)
+
+
+def assign_request(waste_request, exclude=None):
+    """
+    Assigns a Pending request to a free worker of its category taken from the worker pool, nearest first.
+    The worker `exclude` (the one whose work on it was just rejected) only gets it if nobody else is free.
+    """
+    pool = get_worker_pool()
+    near = waste_request.coordinates if settings.CLEANIFY_NEAREST_WORKER else None
+    while True:
+        worker_id = pool.pick(waste_request.category, near=near, exclude=exclude)
+        if worker_id is None:
+            return AssignmentResult(NO_WORKER, waste_request.pk)
+        result = claim_assignment(waste_request.pk, worker_id, category=waste_request.category)
+        if result.outcome == LOST_WORKER:
+            logger.debug(f"Pooled worker ID {worker_id} is no longer free for Cat: {waste_request.category}, trying next.")
+            continue
+        if result.outcome == LOST_REQUEST:
+            pool.unpick(worker_id)
+        return result
+
+
+def assign_next_pending(worker, max_attempts=5):
+    """ Assigns the first Pending request of the worker's category, in queue order, to the worker if they are free. """
+    category = worker.profile.category
+    # Read straight off wr_pending_queue_idx: priority and aging are both folded into queue_at.
+    candidates = WasteRequest.objects.filter(
+        status='Pending', category=category
+    ).order_by('queue_at', 'id').values_list('pk', flat=True)[:max_attempts]
+    for request_id in candidates:
+        result = claim_assignment(request_id, worker.pk, category=category)
+        if result.outcome == LOST_REQUEST:
+            continue
+        if result:
+            get_worker_pool().discard(worker.pk)
+        return result
+    return AssignmentResult(NO_REQUEST, worker_id=worker.pk)
+
+
+def manual_assign(request_id, worker):
+    """ Admin override: assigns a specific free worker to a Pending request, regardless of category. """
+    result = claim_assignment(request_id, worker.pk)
+    if result:
+        get_worker_pool().discard(worker.pk)
+    return result
+
+
+def apply_result(waste_request, result):
+    """ Mirrors a successful claim onto an in-memory WasteRequest instance. """
+    if result:
+        waste_request.status = 'Assigned'
+        waste_request.assigned_worker = User.objects.get(pk=result.worker_id)
+        waste_request.assigned_at = result.assigned_at
+        waste_request.updated_at = result.assigned_at
+        waste_request._tracked_state = ('Assigned', waste_request.category)
+    return waste_request
@@ -0,0 +1,172 @@
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import render
+from django.urls import reverse
+import logging
+
+from .fragment_cache import ADMIN_SCOPE, user_scope
+from .models import WasteRequest, UserProfile, RequestStatusCount
+from .notifications import get_notifier
+from .pagination import akeyset_page
+from .views import (
+    requestee_required,
+    worker_required,
+    admin_required,
+    REQUEST_HISTORY_PAGE_SIZE,
+    WORKER_HISTORY_PAGE_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+# Async counterparts of the dashboards in views.py, selected by CLEANIFY_ASYNC_DASHBOARDS.
+# Independent queries are awaited together; every list is materialised before rendering,
+# and rendering itself runs in a worker thread because the context processors
+# (messages, session) are synchronous. The templates' cached fragments still save the
+# rendering, but the data is loaded either way.
+#
+# The assignment poll is always served from here. Under ASGI it is a long-poll, whose idle
+# wait costs a coroutine. Under WSGI the same wait would hold a server worker for its whole
+# length, so there it answers at once and the page polls again after a back-off.
+
+
+async def _first(queryset):
+    return await queryset.afirst()
+
+
+async def _list(queryset):
+    return [obj async for obj in queryset]
+
+
+async def _render(request, template_name, context):
+    return await sync_to_async(render)(request, template_name, context)
+
+
+@requestee_required
+async def requestee_dashboard(request):
+    """Displays the requestee's submitted requests."""
+    user = await request.auser()
+    my_requests = WasteRequest.objects.filter(requestee=user).select_related('assigned_worker')
+    pending_approval, other = await asyncio.gather(
+        _list(my_requests.filter(status='Pending Approval').order_by('-updated_at')),
+        akeyset_page(
+            my_requests.exclude(status='Pending Approval'), 'updated_at',
+            token=request.GET.get('cursor'), page_size=REQUEST_HISTORY_PAGE_SIZE,
+        ),
+    )
+    context = {
+        'pending_approval_requests': pending_approval,
+        'other_requests': other,
+        'fragment_scopes': [user_scope(user.pk)],
+        'cursor': request.GET.get('cursor'),
+    }
+    return await _render(request, 'requestee/dashboard.html', context)
+
+
+@worker_required
+async def worker_dashboard(request):
+    """Displays the worker's currently assigned task, average rating and completed history."""
+    worker = await request.auser()
+    worker_profile, completed_tasks = await asyncio.gather(
+        _first(UserProfile.objects.select_related('current_task__requestee').filter(user=worker)),
+        akeyset_page(
+            WasteRequest.objects.filter(
+                assigned_worker=worker,
+                status='Completed',
+                approved_at__isnull=False
+            ).select_related('requestee'),
+            'approved_at',
+            token=request.GET.get('cursor'),
+            page_size=WORKER_HISTORY_PAGE_SIZE,
+        ),
+    )
+
+    current_task = None
+    rating_str = "Not Rated Yet"
+    if worker_profile is None:
+        logger.error(f"UserProfile missing for worker {worker.username} on dashboard!")
+        rating_str = "Profile Error"
+    else:
+        current_task = worker_profile.current_task
+        if worker_profile.average_rating is not None:
+            rating_str = f"{worker_profile.average_rating:.2f} / 5.00"
+
+    context = {
+        'current_task': current_task,
+        'average_rating_str': rating_str,
+        'completed_tasks': completed_tasks,
+        'fragment_scopes': [user_scope(worker.pk)],
+        'cursor': request.GET.get('cursor'),
+    }
+    return await _render(request, 'worker/dashboard.html', context)
+
+
+@admin_required
+async def admin_dashboard(request):
+    totals, recent_pending, recent_assigned, recent_pending_approval, recent_completed = await asyncio.gather(
+        sync_to_async(RequestStatusCount.totals_by_status)(),
+        _list(WasteRequest.objects.filter(status='Pending').select_related('requestee').order_by('-created_at')[:15]),
+        _list(WasteRequest.objects.filter(status='Assigned').select_related('requestee', 'assigned_worker').order_by('-assigned_at')[:15]),
+        _list(WasteRequest.objects.filter(status='Pending Approval').select_related('requestee', 'assigned_worker').order_by('-updated_at')[:15]),
+        _list(WasteRequest.objects.filter(status='Completed').select_related('requestee', 'assigned_worker').order_by('-approved_at')[:15]),
+    )
+    context = {
+        'total_pending': totals['Pending'], 'total_assigned': totals['Assigned'],
+        'total_pending_approval': totals['Pending Approval'], 'total_completed': totals['Completed'],
+        'recent_pending': recent_pending, 'recent_assigned': recent_assigned,
+        'recent_pending_approval': recent_pending_approval, 'recent_completed': recent_completed,
+        'fragment_scopes': [ADMIN_SCOPE],
+    }
+    return await _render(request, 'admin/dashboard.html', context)
+
+
+async def _current_task_summary(worker):
+    task = await WasteRequest.objects.filter(assigned_worker=worker, status='Assigned').values(
+        'id', 'category', 'location', 'description', 'assigned_at', 'requestee__username',
+    ).afirst()
+    if task is None:
+        return None
+    return {
+        'id': task['id'],
+        'category': task['category'],
+        'location': task['location'],
+        'description': task['description'] or '',
+        'requestee': task['requestee__username'],
+        'assigned_at': task['assigned_at'].isoformat() if task['assigned_at'] else None,
+        'complete_url': reverse('complete_task', args=[task['id']]),
+    }
+
+
+@worker_required
+async def worker_assignment_poll(request):
+    """
+    Assignment poll for the worker dashboard. ?task= is the id of the task the page shows
+    (empty for none); answers with {"task": summary or null} as soon as the worker's
+    current task differs. Otherwise, under ASGI, 204 after CLEANIFY_ASSIGNMENT_LONGPOLL_TIMEOUT
+    seconds; under WSGI, 204 at once with a Retry-After of CLEANIFY_ASSIGNMENT_SHORT_POLL_INTERVAL.
+    """
+    worker = await request.auser()
+    known = request.GET.get('task', '')
+    notifier = get_notifier()
+    loop = asyncio.get_running_loop()
+    long_poll = isinstance(request, ASGIRequest)
+    deadline = loop.time() + settings.CLEANIFY_ASSIGNMENT_LONGPOLL_TIMEOUT
+    while True:
+        version = notifier.version(worker.pk)
+        task = await _current_task_summary(worker)
+        if str(task['id'] if task else '') != known:
+            return JsonResponse({'task': task})
+        if not long_poll:
+            response = HttpResponse(status=204)
+            response['Retry-After'] = str(settings.CLEANIFY_ASSIGNMENT_SHORT_POLL_INTERVAL)
+            return response
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return HttpResponse(status=204)
+        # Woken at once by assignments made in this process; the periodic re-check
+        # catches those committed by other server processes.
+        await notifier.wait(worker.pk, version, min(remaining, settings.CLEANIFY_ASSIGNMENT_POLL_INTERVAL))
@@ -0,0 +1,282 @@
+
+import io
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User, Group
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.test import override_settings
+from django.utils import timezone
+from PIL import Image
+
+from .models import UserProfile, WasteRequest, RequestStatusCount, SlaRollup, StoredBlob, CATEGORY_CHOICES, queue_head_start
+from .roles import invalidate_roles
+from .storage import media_storage
+
+
+@contextmanager
+def throwaway_database(verbosity=0, on_disk=False):
+    """
+    Runs the enclosed block against a freshly created test database, so benchmarks never touch real data.
+    on_disk=True uses a temporary SQLite file instead of shared memory, which forked processes can open too.
+    """
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    previous_test_name = test_settings.get('NAME')
+    temp_dir = None
+    if on_disk and connection.vendor == 'sqlite':
+        temp_dir = tempfile.mkdtemp(prefix='cleanify-bench-db-')
+        test_settings['NAME'] = f"{temp_dir}/bench.sqlite3"
+    old_name = connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        test_settings['NAME'] = previous_test_name
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+@contextmanager
+def temporary_media_root():
+    """ Points MEDIA_ROOT at a temporary directory so uploads made by a benchmark are thrown away. """
+    media_root = tempfile.mkdtemp(prefix='cleanify-bench-media-')
+    try:
+        with override_settings(MEDIA_ROOT=media_root):
+            yield media_root
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
+
+
+def placeholder_image_bytes(size=(64, 48), color=(46, 160, 67), image_format='PNG'):
+    """ Returns the bytes of a small, valid image suitable for ImageField uploads. """
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+def percentile(samples, pct):
+    """ Nearest-rank percentile of a list of numbers. """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples):
+    """ Returns mean/p50/p95/p99 of samples given in seconds, converted to milliseconds. """
+    return {
+        'mean_ms': statistics.fmean(samples) * 1000 if samples else 0.0,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+    }
+
+
+def time_calls(func, repeat):
+    """ Calls func() repeat times and returns the per-call wall times in seconds. """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def create_workers(count, prefix='bench_worker', busy_ratio=0.0, batch_size=1000):
+    """
+    Bulk-creates `count` workers spread evenly over CATEGORY_CHOICES.
+    All share one unusable password so no hashing cost is paid per user.
+    The first busy_ratio of them get an Assigned request as their current task.
+    Returns the list of created User IDs.
+    """
+    categories = [value for value, _label in CATEGORY_CHOICES]
+    password = make_password(None)
+    users = [User(username=f"{prefix}_{i}", password=password) for i in range(count)]
+    User.objects.bulk_create(users, batch_size=batch_size)
+    user_ids = list(User.objects.filter(username__startswith=f"{prefix}_").order_by('id').values_list('id', flat=True))
+    profiles = [
+        UserProfile(user_id=user_id, role='Worker', category=categories[i % len(categories)])
+        for i, user_id in enumerate(user_ids)
+    ]
+    UserProfile.objects.bulk_create(profiles, batch_size=batch_size)
+    invalidate_roles(user_ids)
+
+    busy = profiles[:int(len(profiles) * busy_ratio)]
+    if busy:
+        requestee = User.objects.create_user(username=f"{prefix}-requestee")
+        tasks = WasteRequest.objects.bulk_create([
+            WasteRequest(
+                requestee=requestee, category=profile.category, location='Benchmark',
+                request_image='request_images/benchmark.jpg', status='Assigned',
+                assigned_worker_id=profile.user_id, assigned_at=timezone.now(), queue_at=timezone.now(),
+            )
+            for profile in busy
+        ], batch_size=batch_size)
+        task_by_worker = {task.assigned_worker_id: task.pk for task in tasks}
+        busy = list(UserProfile.objects.filter(user_id__in=list(task_by_worker)))
+        for profile in busy:
+            profile.current_task_id = task_by_worker[profile.user_id]
+        UserProfile.objects.bulk_update(busy, ['current_task'], batch_size=batch_size)
+    return user_ids
+
+
+# Share of seeded requests per status; Assigned is further capped at one request per worker.
+STATUS_MIX = (
+    ('Pending', 0.10),
+    ('Assigned', 0.10),
+    ('Pending Approval', 0.10),
+    ('Completed', 0.70),
+)
+# Share of seeded requests per priority (1 Low .. 4 Urgent).
+PRIORITY_MIX = ((1, 0.30), (2, 0.50), (3, 0.15), (4, 0.05))
+SEED_HISTORY_DAYS = 90
+# Seeded text, so that searches have realistic vocabularies and result sizes to work with.
+SEED_PLACES = (
+    'Block', 'Library', 'Hostel', 'Canteen', 'Lecture Hall', 'Sports Complex', 'Admin Building',
+    'Workshop', 'Auditorium', 'Parking Lot', 'Medical Centre', 'Guest House',
+)
+SEED_ISSUES = {
+    'Garbage Collection': ('bins overflowing', 'litter scattered', 'dustbin missing lid', 'food waste left', 'recycling not collected'),
+    'Water Leakage': ('pipe leaking', 'tap dripping', 'ceiling seepage', 'cooler overflowing', 'tank overflow'),
+    'Washroom Cleaning': ('toilet blocked', 'floor slippery', 'no soap', 'bad smell', 'sink clogged'),
+    'Electricity Issue': ('light flickering', 'fan not working', 'socket sparking', 'exposed wiring', 'power outage'),
+}
+SEED_DETAILS = ('near the entrance', 'on the first floor', 'behind the stairs', 'next to the lift', 'since yesterday', 'again this week', 'urgent please', 'outside room')
+
+
+def _bulk_users(prefix, count, role, password, batch_size):
+    User.objects.bulk_create([User(username=f"{prefix}_{i}", password=password) for i in range(count)], batch_size=batch_size)
+    user_ids = list(User.objects.filter(username__startswith=f"{prefix}_").order_by('id').values_list('id', flat=True))
+    group, _created = Group.objects.get_or_create(name=role)
+    group.user_set.through.objects.bulk_create(
+        [group.user_set.through(user_id=user_id, group_id=group.id) for user_id in user_ids], batch_size=batch_size
+    )
+    return user_ids
+
+
+def seed_dataset(requestees, workers, requests, images=8, busy_ratio=0.5, seed=0, batch_size=1000, prefix='seed'):
+    """
+    Bulk-creates a realistic dataset: requestees, workers spread over CATEGORY_CHOICES
+    (with their groups), and requests in the STATUS_MIX spread over SEED_HISTORY_DAYS.
+    At most busy_ratio of each category's workers get an Assigned request.
+    Busy flags, rating totals, status counters and image references are left consistent,
+    as if everything had gone through the views. Returns {status: count}.
+    """
+    rng = random.Random(seed)
+    categories = [value for value, _label in CATEGORY_CHOICES]
+    password = make_password(None)
+    now = timezone.now()
+
+    with transaction.atomic():
+        requestee_ids = _bulk_users(f"{prefix}_requestee", requestees, 'Requestee', password, batch_size)
+        UserProfile.objects.bulk_create(
+            [UserProfile(user_id=user_id, role='Requestee') for user_id in requestee_ids], batch_size=batch_size
+        )
+        worker_ids = _bulk_users(f"{prefix}_worker", workers, 'Worker', password, batch_size)
+        worker_category = {user_id: categories[i % len(categories)] for i, user_id in enumerate(worker_ids)}
+        workers_by_category = defaultdict(list)
+        for user_id, category in worker_category.items():
+            workers_by_category[category].append(user_id)
+
+        image_names = []
+        for i in range(max(1, images)):
+            color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+            name = media_storage().save(f"request_images/seed_{i}.jpg", ContentFile(placeholder_image_bytes(color=color, image_format='JPEG')))
+            image_names.append(name)
+        references = defaultdict(int)
+
+        free_workers = {}
+        for category, ids in workers_by_category.items():
+            ids = list(ids)
+            rng.shuffle(ids)
+            free_workers[category] = ids[:int(len(ids) * busy_ratio)]
+        statuses, weights = zip(*STATUS_MIX)
+        priorities, priority_weights = zip(*PRIORITY_MIX)
+        rows = []
+        for _ in range(requests):
+            category = rng.choice(categories)
+            status = rng.choices(statuses, weights)[0]
+            if status == 'Assigned' and not free_workers.get(category):
+                status = 'Completed'
+            if not workers_by_category.get(category):
+                status = 'Pending'
+            created_at = updated_at = now - timedelta(seconds=rng.uniform(0, SEED_HISTORY_DAYS * 86400))
+            request_image = rng.choice(image_names)
+            references[request_image] += 1
+            row = WasteRequest(
+                requestee_id=rng.choice(requestee_ids),
+                category=category,
+                location=f"{rng.choice(SEED_PLACES)} {rng.randrange(1, 40)}, Room {rng.randrange(1, 300)}",
+                description=f"{rng.choice(SEED_ISSUES[category]).capitalize()} {rng.choice(SEED_DETAILS)}",
+                request_image=request_image,
+                status=status,
+                priority=rng.choices(priorities, priority_weights)[0],
+            )
+            row.queue_at = created_at - queue_head_start(row.priority)
+            if status == 'Assigned':
+                row.assigned_worker_id = free_workers[category].pop()
+            elif status != 'Pending':
+                row.assigned_worker_id = rng.choice(workers_by_category[category])
+            if status != 'Pending':
+                row.assigned_at = updated_at = min(created_at + timedelta(minutes=rng.uniform(1, 240)), now)
+            if status in ('Pending Approval', 'Completed'):
+                row.completion_image = rng.choice(image_names)
+                references[row.completion_image.name] += 1
+                updated_at = min(updated_at + timedelta(minutes=rng.uniform(10, 600)), now)
+            if status == 'Completed':
+                row.is_approved_by_student = True
+                row.approved_at = updated_at = min(updated_at + timedelta(minutes=rng.uniform(5, 1440)), now)
+                row.worker_rating = rng.choices((1, 2, 3, 4, 5), (1, 2, 4, 6, 5))[0]
+            row._seed_times = (created_at, updated_at)
+            rows.append(row)
+
+        created = WasteRequest.objects.bulk_create(rows, batch_size=batch_size)
+        # created_at/updated_at are auto fields, so the seeded history is written in a second pass.
+        for row in created:
+            row.created_at, row.updated_at = row._seed_times
+        WasteRequest.objects.bulk_update(created, ['created_at', 'updated_at'], batch_size=batch_size)
+
+        totals = defaultdict(lambda: [0, 0])
+        for row in created:
+            if row.status == 'Completed':
+                totals[row.assigned_worker_id][0] += row.worker_rating
+                totals[row.assigned_worker_id][1] += 1
+        current_task = {row.assigned_worker_id: row.pk for row in created if row.status == 'Assigned'}
+        profiles = []
+        for user_id in worker_ids:
+            rating_sum, rating_count = totals[user_id]
+            profiles.append(UserProfile(
+                user_id=user_id,
+                role='Worker',
+                category=worker_category[user_id],
+                current_task_id=current_task.get(user_id),
+                rating_sum=rating_sum,
+                rating_count=rating_count,
+                average_rating=round(rating_sum / rating_count, 2) if rating_count else None,
+                recent_rating=round(rating_sum / rating_count, 2) if rating_count else None,
+            ))
+        UserProfile.objects.bulk_create(profiles, batch_size=batch_size)
+        # No post_save was sent for these users or profiles, so drop any role cached under their ids.
+        invalidate_roles(requestee_ids + worker_ids)
+
+        # Each save() above counted one reference; the rows hold the rest.
+        for name in set(image_names):
+            StoredBlob.objects.filter(name=name).update(
+                refcount=references[name], released_at=None if references[name] else now
+            )
+        RequestStatusCount.rebuild()
+        SlaRollup.rebuild()
+
+    mix = defaultdict(int)
+    for row in created:
+        mix[row.status] += 1
+    return dict(mix)
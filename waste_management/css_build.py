@@ -0,0 +1,111 @@
+"""
+Builds the site's stylesheet, static/css/cleanify.css, with Tailwind.
+
+The Tailwind compiler in node_modules turns waste_management/tailwind/input.css into
+the CSS for exactly the class names found in the sources (templates, scripts and the
+widget attributes in forms.py), so browsers download one small cacheable file instead
+of the Play CDN script compiling the styles on every page view.
+"""
+
+import gzip
+import re
+import subprocess
+from pathlib import Path
+
+from django.conf import settings
+
+
+TAILWIND_DIR = Path(__file__).resolve().parent / 'tailwind'
+BUILD_SCRIPT = TAILWIND_DIR / 'build.cjs'
+# Written under the first STATICFILES_DIRS entry.
+STYLESHEET = 'css/cleanify.css'
+# (directory under BASE_DIR, glob) pairs scanned for class names.
+SOURCES = (
+    ('templates', '**/*.html'),
+    ('static/js', '**/*.js'),
+    ('waste_management', '*.py'),
+)
+
+_TOKEN_SEPARATORS = re.compile(r"[\s\"'`<>{}]+")
+_COMMENT = re.compile(r'/\*(?!!).*?\*/', re.S)
+_STRING = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')''')
+_SPACE_AROUND = re.compile(r'\s*([{};,])\s*')
+
+
+class StylesheetBuildError(Exception):
+    pass
+
+
+def source_files():
+    base = Path(settings.BASE_DIR)
+    for directory, pattern in SOURCES:
+        yield from sorted((base / directory).glob(pattern))
+
+
+def scan_candidates(paths):
+    """
+    Every token in the files that could be a class name. Like Tailwind's own scanner this
+    over-collects (words of prose, template syntax); the compiler ignores what it does not know.
+    """
+    candidates = set()
+    for path in paths:
+        for token in _TOKEN_SEPARATORS.split(Path(path).read_text(encoding='utf-8')):
+            if 0 < len(token) <= 100 and re.search(r'[a-z]', token):
+                candidates.add(token)
+    return candidates
+
+
+def minify_css(css):
+    """ Drops comments (except /*! licences */) and the whitespace around {, }, ; and , outside strings. """
+    css = _COMMENT.sub('', css)
+    parts = _STRING.split(css)
+    for i in range(0, len(parts), 2):
+        parts[i] = _SPACE_AROUND.sub(r'\1', re.sub(r'\s+', ' ', parts[i]))
+    return ''.join(parts).replace(';}', '}').strip() + '\n'
+
+
+def compile_css(candidates):
+    """ Runs build.cjs; returns (css, optimized) where optimized means lightningcss already minified it. """
+    try:
+        result = subprocess.run(
+            [settings.CLEANIFY_NODE, str(BUILD_SCRIPT)],
+            input='\n'.join(sorted(candidates)), capture_output=True, text=True, encoding='utf-8',
+        )
+    except OSError as e:
+        raise StylesheetBuildError(f"Could not run {settings.CLEANIFY_NODE!r} (set CLEANIFY_NODE): {e}")
+    if result.returncode != 0:
+        raise StylesheetBuildError(f"Tailwind build failed:\n{result.stderr.strip()}")
+    mode, _newline, css = result.stdout.partition('\n')
+    return css, mode == 'optimized'
+
+
+def stylesheet_path():
+    return Path(settings.STATICFILES_DIRS[0]) / STYLESHEET
+
+
+def build_stylesheet(write=True):
+    """
+    Compiles and minifies the stylesheet; writes it unless write=False. Returns a dict with
+    the css, whether it differs from the file on disk, and sizes for reporting.
+    """
+    candidates = scan_candidates(source_files())
+    css, optimized = compile_css(candidates)
+    raw_bytes = len(css.encode())
+    if not optimized:
+        css = minify_css(css)
+    encoded = css.encode()
+    path = stylesheet_path()
+    changed = not path.exists() or path.read_bytes() != encoded
+    if write and changed:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(encoded)
+    return {
+        'css': css,
+        'path': path,
+        'changed': changed,
+        'candidates': len(candidates),
+        'optimized': optimized,
+        'raw_bytes': raw_bytes,
+        'bytes': len(encoded),
+        'gzip_bytes': len(gzip.compress(encoded, 9)),
+    }
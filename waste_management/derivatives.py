@@ -0,0 +1,138 @@
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+import logging
+
+from .fragment_cache import invalidate_scopes, request_scopes
+from .image_ops import RENDITIONS, render_derivatives
+from .models import WasteRequest
+from .storage import is_content_addressed
+
+logger = logging.getLogger(__name__)
+
+
+IMAGE_FIELDS = ('request_image', 'completion_image')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """ Process pool for image work, created on first use. Spawned (not forked) so it is safe from threaded servers. """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(
+                    max_workers=settings.CLEANIFY_IMAGE_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+    return _executor
+
+
+def shutdown_executor():
+    """ Waits for queued renders (and their callbacks) and stops the process pool, if it was started. """
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+
+def derivative_name(source_name, rendition):
+    """ 'request_images/a.png' -> 'derivatives/request_images/a_thumb.jpg' """
+    base, _ext = os.path.splitext(source_name)
+    return f"derivatives/{base}_{rendition}.jpg"
+
+
+def derivative_targets(source_name):
+    return {rendition: default_storage.path(derivative_name(source_name, rendition)) for rendition in RENDITIONS}
+
+
+def record_derivatives(request_id, field_name, source_name, scopes=None):
+    """
+    Stores the derivative paths, unless the source image was replaced in the meantime, and
+    refreshes the dashboards showing the request (`scopes`, looked up if not given).
+    """
+    updated = WasteRequest.objects.filter(pk=request_id, **{field_name: source_name}).update(**{
+        f"{field_name}_{rendition}": derivative_name(source_name, rendition) for rendition in RENDITIONS
+    })
+    if updated:
+        # Dashboards cached before the renders finished link the full-size image as the thumbnail.
+        if scopes is None:
+            users = WasteRequest.objects.filter(pk=request_id).values_list('requestee_id', 'assigned_worker_id').first()
+            scopes = request_scopes(*users) if users else ()
+        invalidate_scopes(scopes)
+    return updated
+
+
+def _on_rendered(request_id, field_name, source_name, scopes, future):
+    try:
+        written = future.result()
+        record_derivatives(request_id, field_name, source_name, scopes)
+        logger.debug(f"Derivatives ready for Request ID: {request_id} {field_name}: {written}")
+    except Exception as e:
+        logger.error(f"Derivative generation failed for Request ID: {request_id} {field_name}: {e}", exc_info=True)
+    finally:
+        # Runs on the executor's callback thread, which owns its own connection.
+        connection.close()
+
+
+def submit_derivatives(request_id, field_name, source_name, force=False, scopes=None):
+    """ Renders derivatives for one image in the process pool, or inline when CLEANIFY_IMAGE_WORKERS is 0. Returns the future or None. """
+    source_path = default_storage.path(source_name)
+    targets = derivative_targets(source_name)
+    if not force and is_content_addressed(source_name) and all(os.path.exists(path) for path in targets.values()):
+        # Same content was uploaded before: its renditions are shared.
+        record_derivatives(request_id, field_name, source_name, scopes)
+        return None
+    if not settings.CLEANIFY_IMAGE_WORKERS:
+        try:
+            render_derivatives(source_path, targets)
+            record_derivatives(request_id, field_name, source_name, scopes)
+        except Exception as e:
+            logger.error(f"Derivative generation failed for Request ID: {request_id} {field_name}: {e}", exc_info=True)
+        return None
+    future = get_executor().submit(render_derivatives, source_path, targets)
+    future.add_done_callback(partial(_on_rendered, request_id, field_name, source_name, scopes))
+    return future
+
+
+def schedule_derivatives(waste_request, field_name):
+    """ Queues thumbnail/medium renditions of a freshly uploaded image once the upload is committed. """
+    source = getattr(waste_request, field_name)
+    if not source:
+        return
+    scopes = request_scopes(waste_request.requestee_id, waste_request.assigned_worker_id)
+    transaction.on_commit(partial(submit_derivatives, waste_request.pk, field_name, source.name, scopes=scopes))
+
+
+def discard_derivatives(waste_request, field_name):
+    """
+    Clears the renditions of an image on the instance (the caller saves). Renditions of
+    content-addressed images are shared and stay until the blob is purged; others are deleted.
+    """
+    for rendition in RENDITIONS:
+        attribute = f"{field_name}_{rendition}"
+        derivative = getattr(waste_request, attribute)
+        if derivative and not derivative.name.startswith('derivatives/cas/'):
+            try:
+                derivative.delete(save=False)
+            except Exception as e:
+                logger.error(f"Error deleting {attribute} for Request ID: {waste_request.pk}: {e}")
+        setattr(waste_request, attribute, None)
+
+
+def purge_derivatives(source_name):
+    """ Deletes the renditions belonging to a source image, if any. """
+    for rendition in RENDITIONS:
+        name = derivative_name(source_name, rendition)
+        if default_storage.exists(name):
+            default_storage.delete(name)
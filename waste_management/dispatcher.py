@@ -0,0 +1,183 @@
+
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import connection, transaction, close_old_connections
+from django.utils import timezone
+import logging
+
+from .models import UserProfile, WasteRequest
+from .transitions import Transition, notify_transitions
+from .worker_pool import get_worker_pool
+
+logger = logging.getLogger(__name__)
+
+
+class DispatchReport:
+    """ Summary of one dispatch pass. """
+
+    def __init__(self):
+        self.assigned_by_category = defaultdict(int)
+        self.pending_seen = 0
+        self.free_workers_seen = 0
+        self.elapsed = 0.0
+
+    @property
+    def assigned(self):
+        return sum(self.assigned_by_category.values())
+
+    @property
+    def rate(self):
+        """ Assignments committed per second of wall time. """
+        return self.assigned / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self):
+        per_category = ', '.join(f"{category}: {count}" for category, count in sorted(self.assigned_by_category.items()))
+        return (
+            f"Assigned {self.assigned} of {self.pending_seen} pending requests to "
+            f"{self.free_workers_seen} free workers in {self.elapsed * 1000:.1f} ms "
+            f"({self.rate:.0f} assignments/s){' [' + per_category + ']' if per_category else ''}"
+        )
+
+
+def _for_update(queryset):
+    """ Row-locks the queryset where the backend supports it; SQLite serialises writers at BEGIN IMMEDIATE instead. """
+    features = connection.features
+    if not features.has_select_for_update:
+        return queryset
+    kwargs = {}
+    if features.has_select_for_update_skip_locked:
+        kwargs['skip_locked'] = True
+    if features.has_select_for_update_of:
+        kwargs['of'] = ('self',)
+    return queryset.select_for_update(**kwargs)
+
+
+def dispatch_pending(limit=None, batch_size=500):
+    """
+    Pairs Pending requests with free workers across all categories in one transaction.
+
+    Requests are taken in queue order (WasteRequest.queue_at) within each category. Everything is loaded in
+    two queries, matched in memory and written back with one bulk_update of the
+    requests and one of the workers' current_task.
+    """
+    report = DispatchReport()
+    started = time.perf_counter()
+    with transaction.atomic():
+        pending = _for_update(WasteRequest.objects.filter(status='Pending')).order_by('queue_at', 'id')
+        if limit:
+            pending = pending[:limit]
+        pending_by_category = defaultdict(list)
+        for request_id, category, created_at, requestee_id in pending.values_list('id', 'category', 'created_at', 'requestee_id'):
+            pending_by_category[category].append((request_id, created_at, requestee_id))
+            report.pending_seen += 1
+
+        free_by_category = defaultdict(deque)
+        if pending_by_category:
+            free = _for_update(UserProfile.objects.filter(
+                role='Worker',
+                current_task__isnull=True,
+                category__in=list(pending_by_category),
+                user__is_active=True
+            )).order_by('user_id')
+            for profile_id, worker_id, category in free.values_list('id', 'user_id', 'category'):
+                free_by_category[category].append((worker_id, profile_id))
+                report.free_workers_seen += 1
+
+        now = timezone.now()
+        updates = []
+        profiles = []
+        transitions = []
+        for category, requests in pending_by_category.items():
+            workers = free_by_category.get(category)
+            for request_id, created_at, requestee_id in requests:
+                if not workers:
+                    break
+                worker_id, profile_id = workers.popleft()
+                profiles.append(UserProfile(id=profile_id, current_task_id=request_id))
+                updates.append(WasteRequest(
+                    id=request_id,
+                    status='Assigned',
+                    assigned_worker_id=worker_id,
+                    assigned_at=now,
+                    updated_at=now,
+                ))
+                transitions.append(Transition(
+                    request_id=request_id, category=category, old_status='Pending', new_status='Assigned',
+                    worker_id=worker_id, created_at=created_at, at=now, old_category=category,
+                    requestee_id=requestee_id,
+                ))
+                report.assigned_by_category[category] += 1
+
+        if updates:
+            WasteRequest.objects.bulk_update(
+                updates, ['status', 'assigned_worker', 'assigned_at', 'updated_at'], batch_size=batch_size
+            )
+            UserProfile.objects.bulk_update(profiles, ['current_task'], batch_size=batch_size)
+            worker_ids = [update.assigned_worker_id for update in updates]
+            notify_transitions(WasteRequest, transitions)
+
+            def drop_from_pool():
+                pool = get_worker_pool()
+                for worker_id in worker_ids:
+                    pool.discard(worker_id)
+            transaction.on_commit(drop_from_pool)
+
+    report.elapsed = time.perf_counter() - started
+    if report.assigned:
+        logger.info(f"Dispatcher: {report}")
+    else:
+        logger.debug(f"Dispatcher: {report}")
+    return report
+
+
+class DispatchLoop(threading.Thread):
+    """ Background thread that runs dispatch_pending every `interval` seconds until stopped. """
+
+    def __init__(self, interval, limit=None):
+        super().__init__(name='cleanify-dispatcher', daemon=True)
+        self.interval = interval
+        self.limit = limit
+        self._stop_event = threading.Event()
+
+    def run(self):
+        logger.info(f"Pending-queue dispatcher started (every {self.interval}s).")
+        while not self._stop_event.is_set():
+            close_old_connections()
+            try:
+                dispatch_pending(limit=self.limit)
+            except Exception as e:
+                logger.error(f"Dispatcher pass failed: {e}", exc_info=True)
+            finally:
+                close_old_connections()
+            self._stop_event.wait(self.interval)
+        logger.info("Pending-queue dispatcher stopped.")
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def start_dispatch_loop(interval, limit=None):
+    """ Starts the in-process dispatcher thread once per process; returns it. """
+    global _loop
+    with _loop_lock:
+        if _loop is None or not _loop.is_alive():
+            _loop = DispatchLoop(interval, limit=limit)
+            _loop.start()
+    return _loop
+
+
+def start_configured_dispatch_loop():
+    """
+    Starts the loop if CLEANIFY_DISPATCH_INTERVAL is set. Called from cleanify/wsgi.py and
+    asgi.py, so only server processes run one: not management commands, tests or the
+    runserver autoreloader's parent.
+    """
+    interval = settings.CLEANIFY_DISPATCH_INTERVAL
+    return start_dispatch_loop(interval) if interval else None
@@ -0,0 +1,111 @@
+
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import WasteRequest, CATEGORY_CHOICES, STATUS_CHOICES
+
+
+FORMATS = ('csv', 'jsonl')
+CONTENT_TYPES = {'csv': 'text/csv; charset=utf-8', 'jsonl': 'application/x-ndjson; charset=utf-8'}
+DEFAULT_CHUNK_SIZE = 2000
+# A spreadsheet opening the CSV runs a cell starting with one of these as a formula.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+# (column, values() lookup). Usernames come from joins, so one query feeds the whole export.
+EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+    ('status', 'status'),
+    ('category', 'category'),
+    ('location', 'location'),
+    ('description', 'description'),
+    ('requestee', 'requestee__username'),
+    ('assigned_worker', 'assigned_worker__username'),
+    ('assigned_at', 'assigned_at'),
+    ('approved_at', 'approved_at'),
+    ('approved_by_requestee', 'is_approved_by_student'),
+    ('worker_rating', 'worker_rating'),
+    ('priority', 'priority'),
+    ('building', 'building__name'),
+)
+
+
+def _moment(value, end_of_day=False):
+    """ A datetime from 'YYYY-MM-DD' or ISO 8601; a bare date as an upper bound means the whole day. """
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"{value!r} is not a date (YYYY-MM-DD) or ISO 8601 date/time")
+        moment = datetime.combine(day + timedelta(days=1) if end_of_day else day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def export_queryset(since=None, until=None, statuses=(), categories=(), worker=None):
+    """
+    The filtered export as a .values() queryset in id order, which SQLite walks
+    along the primary key without sorting, so the first row is ready at once.
+    since/until bound created_at (until is inclusive of a bare date); worker is a username.
+    """
+    unknown = set(statuses) - {value for value, _label in STATUS_CHOICES}
+    if unknown:
+        raise ValueError(f"Unknown status: {', '.join(sorted(unknown))}")
+    unknown = set(categories) - {value for value, _label in CATEGORY_CHOICES}
+    if unknown:
+        raise ValueError(f"Unknown category: {', '.join(sorted(unknown))}")
+    queryset = WasteRequest.objects.all()
+    if since:
+        queryset = queryset.filter(created_at__gte=_moment(since))
+    if until:
+        queryset = queryset.filter(created_at__lt=_moment(until, end_of_day=True))
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+    if categories:
+        queryset = queryset.filter(category__in=categories)
+    if worker:
+        queryset = queryset.filter(assigned_worker__username=worker)
+    return queryset.order_by('id').values_list(*(lookup for _column, lookup in EXPORT_COLUMNS))
+
+
+class _Echo:
+    """ A file-like object whose write() hands back what csv.writer gives it. """
+
+    def write(self, value):
+        return value
+
+
+def _isoformat(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _csv_cell(value):
+    """ Text that would start a formula gets a leading quote, which spreadsheets show as plain text. """
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return _isoformat(value)
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([column for column, _lookup in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow([_csv_cell(value) for value in row])
+
+
+def jsonl_lines(rows):
+    columns = [column for column, _lookup in EXPORT_COLUMNS]
+    for row in rows:
+        yield json.dumps(dict(zip(columns, map(_isoformat, row)))) + '\n'
+
+
+def export_lines(queryset, fmt='csv', chunk_size=DEFAULT_CHUNK_SIZE):
+    """ Lazily renders the queryset, fetching chunk_size rows at a time. """
+    rows = queryset.iterator(chunk_size=chunk_size)
+    return csv_lines(rows) if fmt == 'csv' else jsonl_lines(rows)
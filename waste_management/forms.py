@@ -5,7 +5,7 @@ from django.contrib.auth.models import User, Group
 from django.db import transaction 
 from django.db import transaction 
 
-from .models import UserProfile, WasteRequest, ROLE_CHOICES, CATEGORY_CHOICES, RATING_CHOICES
+from .models import Building, UserProfile, WasteRequest, ROLE_CHOICES, CATEGORY_CHOICES, RATING_CHOICES, PRIORITY_CHOICES, DEFAULT_PRIORITY
 
 import logging
 logger = logging.getLogger(__name__)
@@ -102,6 +102,23 @@ class RequestCreationForm(forms.ModelForm):
         required=True,
         widget=forms.Select(attrs={'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-indigo-500 focus:ring-indigo-500 sm:text-sm'})
     )
+    # Urgent is reserved for staff (set from the admin).
+    priority = forms.TypedChoiceField(
+        choices=[(value, label) for value, label in PRIORITY_CHOICES if value != 4],
+        coerce=int,
+        required=False,
+        empty_value=DEFAULT_PRIORITY,
+        initial=DEFAULT_PRIORITY,
+        help_text="High priority is for hazards such as exposed wiring or flooding.",
+        widget=forms.Select(attrs={'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-indigo-500 focus:ring-indigo-500 sm:text-sm'})
+    )
+    building = forms.ModelChoiceField(
+        queryset=Building.objects.all(),
+        required=False,
+        empty_label="--- Not in a listed building ---",
+        help_text="Lets the nearest available worker be sent.",
+        widget=forms.Select(attrs={'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-indigo-500 focus:ring-indigo-500 sm:text-sm'})
+    )
     request_image = forms.ImageField(
         required=True,
         label="Upload Image of Issue *",
@@ -111,7 +128,7 @@ class RequestCreationForm(forms.ModelForm):
     class Meta:
         model = WasteRequest
        
-        fields = ['category', 'location', 'description', 'request_image']
+        fields = ['category', 'priority', 'building', 'location', 'description', 'request_image']
         widgets = {
             'location': forms.TextInput(attrs={'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-indigo-500 focus:ring-indigo-500 sm:text-sm', 'placeholder': 'E.g., Near Library, Room 303'}),
             'description': forms.Textarea(attrs={'rows': 4, 'class': 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-indigo-500 focus:ring-indigo-500 sm:text-sm', 'placeholder': 'Provide details about the issue (optional)'}),
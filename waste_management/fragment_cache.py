@@ -0,0 +1,94 @@
+"""
+Versioned cache of rendered dashboard fragments.
+
+A fragment is stored under a key built from the current version of every scope
+it depends on: 'user:<id>' for a requestee's or worker's own dashboard and
+'role:admin' for the dashboard all staff share. Writes never look for fragments
+to delete; the receivers in signals.py give the affected scopes new versions, so
+everything rendered from the old rows stops being addressed at once and ages out
+of the cache.
+"""
+
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+
+from .metrics import get_registry
+
+
+ADMIN_SCOPE = 'role:admin'
+
+
+def user_scope(user_id):
+    return f"user:{user_id}"
+
+
+def request_scopes(requestee_id, worker_id):
+    """ Scopes showing a request: its requestee's dashboard, its worker's and the admin's. """
+    scopes = {ADMIN_SCOPE}
+    for user_id in (requestee_id, worker_id):
+        if user_id is not None:
+            scopes.add(user_scope(user_id))
+    return scopes
+
+
+def get_fragment_cache():
+    return caches[settings.CLEANIFY_FRAGMENT_CACHE]
+
+
+def _version_key(scope):
+    return f"cleanify:fragment-version:{scope}"
+
+
+def _new_version():
+    # Random rather than a counter: a version key that was evicted, or that belonged to a
+    # deleted user whose primary key is reused, can never come back to an old value.
+    return uuid.uuid4().hex[:12]
+
+
+def scope_versions(scopes):
+    """ {scope: version} in one cache round trip; a scope with no version yet gets a fresh one. """
+    fragment_cache = get_fragment_cache()
+    keys = {_version_key(scope): scope for scope in scopes}
+    versions = {keys[key]: version for key, version in fragment_cache.get_many(keys).items()}
+    for key, scope in keys.items():
+        if scope not in versions:
+            version = _new_version()
+            if not fragment_cache.add(key, version, None):
+                version = fragment_cache.get(key, version)
+            versions[scope] = version
+    return versions
+
+
+def _bump(scopes):
+    get_fragment_cache().set_many({_version_key(scope): _new_version() for scope in scopes}, None)
+
+
+def invalidate_scopes(scopes):
+    """
+    Gives the scopes new versions now and, inside a transaction, again after commit, so a
+    dashboard rendered from the pre-commit rows in the meantime cannot stay cached.
+    """
+    scopes = set(scopes)
+    if not scopes:
+        return
+    _bump(scopes)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _bump(scopes))
+
+
+def cached_fragment(name, scopes, vary_on, render):
+    """ The cached text of fragment `name` for the current scope versions, rendering it with render() on a miss. """
+    fragment_cache = get_fragment_cache()
+    versions = scope_versions(scopes)
+    digest = hashlib.md5(repr((sorted(versions.items()), list(vary_on))).encode()).hexdigest()
+    key = f"cleanify:fragment:{name}:{digest}"
+    content = fragment_cache.get(key)
+    get_registry().inc('cleanify_fragment_cache_total', {'fragment': name, 'result': 'miss' if content is None else 'hit'})
+    if content is None:
+        content = render()
+        fragment_cache.set(key, content, settings.CLEANIFY_FRAGMENT_CACHE_SECONDS)
+    return content
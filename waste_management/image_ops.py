@@ -0,0 +1,41 @@
+"""
+Pure-Pillow image work for the derivative pipeline.
+
+Nothing in here touches Django, so it can run in spawned worker processes
+without setting the project up.
+"""
+
+import os
+import threading
+
+from PIL import Image, ImageOps
+
+
+# name -> (max width, max height, JPEG quality)
+RENDITIONS = {
+    'thumb': (160, 160, 70),
+    'medium': (1024, 1024, 80),
+}
+
+
+def render_derivatives(source_path, targets):
+    """
+    Writes one JPEG per rendition. `targets` maps rendition name -> absolute output path.
+    Returns {rendition: bytes written}.
+    """
+    written = {}
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        for rendition, target_path in targets.items():
+            max_width, max_height, quality = RENDITIONS[rendition]
+            derivative = image.copy()
+            derivative.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            # Identical uploads share content-addressed targets and may be rendered concurrently.
+            temp_path = f"{target_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            derivative.save(temp_path, format='JPEG', quality=quality, optimize=True, progressive=True)
+            os.replace(temp_path, target_path)
+            written[rendition] = os.path.getsize(target_path)
+    return written
@@ -0,0 +1,440 @@
+
+import csv
+import json
+import os
+import time
+from collections import Counter, OrderedDict
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User, Group
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.validators import validate_email
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from PIL import Image, UnidentifiedImageError
+import logging
+
+from .models import (
+    Building, UserProfile, WasteRequest, StoredBlob, ROLE_CHOICES, CATEGORY_CHOICES, STATUS_CHOICES, RATING_CHOICES,
+    PRIORITY_CHOICES, DEFAULT_PRIORITY, RECENT_RATING_WEIGHT, queue_head_start,
+)
+from .roles import invalidate_roles
+from .storage import media_storage
+from .transitions import Transition, notify_transitions
+
+logger = logging.getLogger(__name__)
+
+
+FORMATS = ('csv', 'jsonl')
+ERROR_SAMPLES = 20
+ROLES = {value for value, _label in ROLE_CHOICES}
+CATEGORIES = {value for value, _label in CATEGORY_CHOICES}
+STATUSES = {value for value, _label in STATUS_CHOICES}
+RATINGS = {value for value, _label in RATING_CHOICES}
+# Priorities are accepted by number or by name.
+PRIORITIES = {**{str(value): value for value, _label in PRIORITY_CHOICES}, **{label: value for value, label in PRIORITY_CHOICES}}
+
+
+class RowError(Exception):
+    """ A row that fails validation; it is reported and skipped. """
+
+
+class ImportReport:
+    """ Counts for one input file. Only the first ERROR_SAMPLES errors are kept in memory. """
+
+    def __init__(self, label):
+        self.label = label
+        self.rows = 0
+        self.created = 0
+        self.requeued = 0
+        self.errors = 0
+        self.error_samples = []
+        self.elapsed = 0.0
+        # Oldest created_at imported, so derived tables can be rebuilt from that day on.
+        self.earliest = None
+
+    def error(self, line, message):
+        self.errors += 1
+        if len(self.error_samples) < ERROR_SAMPLES:
+            self.error_samples.append((line, str(message)))
+
+    @property
+    def rate(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        summary = f"{self.label}: {self.created}/{self.rows} rows imported, {self.errors} rejected"
+        if self.requeued:
+            summary += f", {self.requeued} Assigned rows requeued"
+        return f"{summary} in {self.elapsed:.2f}s ({self.rate:.0f} rows/s)"
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    raise ValueError(f"Cannot tell the format of {path}; pass --format ({', '.join(FORMATS)}).")
+
+
+def read_rows(path, fmt=None):
+    """ Streams (line number, row dict) from a CSV file with a header row or a JSON-lines file. """
+    fmt = detect_format(path, fmt)
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_no, e
+                continue
+            yield line_no, row if isinstance(row, dict) else ValueError("not a JSON object")
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _text(row, key, max_length=None, required=False):
+    value = row.get(key)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise RowError(f"{key} is required")
+    if max_length and len(value) > max_length:
+        raise RowError(f"{key} is longer than {max_length} characters")
+    return value
+
+
+def _datetime(row, key, default=None):
+    value = _text(row, key)
+    if not value:
+        return default
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise RowError(f"{key} {value!r} is not an ISO 8601 date/time")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _choice(row, key, choices, default=''):
+    value = _text(row, key) or default
+    if value not in choices:
+        raise RowError(f"{key} {value!r} is not one of: {', '.join(sorted(choices))}")
+    return value
+
+
+def _rows(batch, report):
+    """ Skips rows the reader could not parse. """
+    for line, row in batch:
+        report.rows += 1
+        if isinstance(row, Exception):
+            report.error(line, row)
+            continue
+        yield line, row
+
+
+def import_users(path, fmt=None, batch_size=1000):
+    """
+    Creates users with their profile and role group from username, email,
+    first_name, last_name, role and category columns. Every imported account
+    shares one unusable password (set a real one through the admin), so no
+    hashing is paid per row.
+    """
+    report = ImportReport(f"users ({os.path.basename(path)})")
+    started = time.perf_counter()
+    password = make_password(None)
+    groups = {role: Group.objects.get_or_create(name=role)[0] for role in ROLES}
+    username_validator = UnicodeUsernameValidator()
+    for batch in batched(read_rows(path, fmt), batch_size):
+        valid = []
+        for line, row in _rows(batch, report):
+            try:
+                username = _text(row, 'username', 150, required=True)
+                try:
+                    username_validator(username)
+                    email = _text(row, 'email', 254)
+                    if email:
+                        validate_email(email)
+                except ValidationError as e:
+                    raise RowError('; '.join(e.messages))
+                role = _choice(row, 'role', ROLES)
+                category = _text(row, 'category') or None
+                if role == 'Worker' and category not in CATEGORIES:
+                    raise RowError(f"Workers need a category, one of: {', '.join(sorted(CATEGORIES))}")
+                valid.append((line, username, email, role, category if role == 'Worker' else None, row))
+            except RowError as e:
+                report.error(line, e)
+
+        taken = set(User.objects.filter(username__in=[v[1] for v in valid]).values_list('username', flat=True))
+        taken_emails = set(User.objects.filter(email__in=[v[2] for v in valid if v[2]]).values_list('email', flat=True))
+        users, roles = [], {}
+        for line, username, email, role, category, row in valid:
+            if username in taken:
+                report.error(line, f"username {username!r} already exists")
+                continue
+            if email and email in taken_emails:
+                report.error(line, f"email {email!r} is already in use")
+                continue
+            taken.add(username)
+            if email:
+                taken_emails.add(email)
+            users.append(User(
+                username=username, email=email, password=password,
+                first_name=_text(row, 'first_name', 150), last_name=_text(row, 'last_name', 150),
+            ))
+            roles[username] = (role, category)
+        if not users:
+            continue
+
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=batch_size)
+            ids = dict(User.objects.filter(username__in=list(roles)).values_list('username', 'id'))
+            UserProfile.objects.bulk_create([
+                UserProfile(user_id=ids[username], role=role, category=category)
+                for username, (role, category) in roles.items()
+            ], batch_size=batch_size)
+            membership = User.groups.through
+            membership.objects.bulk_create([
+                membership(user_id=ids[username], group_id=groups[role].id)
+                for username, (role, _category) in roles.items()
+            ], batch_size=batch_size)
+            # bulk_create sends no post_save, so the receivers that drop a reused id's cached role do not run.
+            invalidate_roles(ids.values())
+        report.created += len(users)
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+class ImageImporter:
+    """
+    Copies request/completion images into media storage.
+
+    A path seen again (within a bounded window) is not re-read: its stored name
+    is reused and the extra references are added in one UPDATE per blob and batch.
+    In dry runs files are only checked, not stored.
+    """
+    WINDOW = 1024
+
+    def __init__(self, root, dry_run=False):
+        self.root = root
+        self.dry_run = dry_run
+        self._names = OrderedDict()
+        self._extra_references = Counter()
+
+    def _full_path(self, path):
+        return path if os.path.isabs(path) else os.path.join(self.root, path)
+
+    def check(self, path):
+        if not os.path.isfile(self._full_path(path)):
+            raise RowError(f"image {path!r} not found under {self.root}")
+
+    def store(self, path, upload_to):
+        full_path = self._full_path(path)
+        name = self._names.get(full_path)
+        if name is not None:
+            self._names.move_to_end(full_path)
+            self._extra_references[name] += 1
+            return name
+        try:
+            with open(full_path, 'rb') as f:
+                with Image.open(f) as image:
+                    image_format = image.format
+                f.seek(0)
+                if self.dry_run:
+                    name = path
+                else:
+                    name = media_storage().save(f"{upload_to}{os.path.basename(path)}", File(f))
+        except FileNotFoundError:
+            raise RowError(f"image {path!r} not found under {self.root}")
+        except (OSError, UnidentifiedImageError) as e:
+            raise RowError(f"image {path!r} is not readable: {e}")
+        logger.debug(f"Imported {image_format} image {path} as {name}")
+        self._names[full_path] = name
+        if len(self._names) > self.WINDOW:
+            self._names.popitem(last=False)
+        return name
+
+    def flush(self):
+        if not self.dry_run:
+            for name, count in self._extra_references.items():
+                StoredBlob.objects.filter(name=name).update(refcount=F('refcount') + count, released_at=None)
+        self._extra_references.clear()
+
+
+def _restore_times(requests):
+    """
+    Writes the historical created_at/updated_at that bulk_create replaced (they are
+    auto fields). A parametrised executemany: bulk_update's CASE expressions cost
+    more than the inserts themselves.
+    """
+    for request in requests:
+        request.created_at, request.updated_at = request._import_times
+    ops = connection.ops
+    sql = "UPDATE {} SET {} = %s, {} = %s WHERE {} = %s".format(
+        ops.quote_name(WasteRequest._meta.db_table), ops.quote_name('created_at'),
+        ops.quote_name('updated_at'), ops.quote_name('id'),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            (ops.adapt_datetimefield_value(r.created_at), ops.adapt_datetimefield_value(r.updated_at), r.pk)
+            for r in requests
+        ])
+
+
+def import_requests(path, fmt=None, image_root=None, batch_size=1000, dry_run=False):
+    """
+    Creates WasteRequest rows from requestee, category, location, description,
+    status, priority, building, request_image, completion_image, assigned_worker,
+    worker_rating, created_at and approved_at columns. Users and buildings are looked
+    up by username/name once per batch. Assigned rows are imported as Pending: the closing dispatch assigns them
+    to whichever workers are free. Returns the report and the set of workers whose
+    rating totals changed.
+    """
+    report = ImportReport(f"requests ({os.path.basename(path)})")
+    started = time.perf_counter()
+    images = ImageImporter(image_root or os.path.dirname(os.path.abspath(path)), dry_run=dry_run)
+    rated_workers = set()
+    now = timezone.now()
+    for batch in batched(read_rows(path, fmt), batch_size):
+        rows = list(_rows(batch, report))
+        usernames = {_text(row, key) for _line, row in rows for key in ('requestee', 'assigned_worker')} - {''}
+        people = {
+            username: (user_id, role)
+            for username, user_id, role in User.objects.filter(username__in=usernames).values_list('username', 'id', 'profile__role')
+        }
+        building_names = {_text(row, 'building') for _line, row in rows} - {''}
+        buildings = dict(Building.objects.filter(name__in=building_names).values_list('name', 'id')) if building_names else {}
+        valid = []
+        for line, row in rows:
+            try:
+                requestee_id, role = people.get(_text(row, 'requestee', required=True), (None, None))
+                if role != 'Requestee':
+                    raise RowError(f"requestee {row.get('requestee')!r} is not a requestee")
+                status = _choice(row, 'status', STATUSES, default='Pending')
+                request = WasteRequest(
+                    requestee_id=requestee_id,
+                    category=_choice(row, 'category', CATEGORIES),
+                    location=_text(row, 'location', 255, required=True),
+                    description=_text(row, 'description') or None,
+                    status='Pending' if status == 'Assigned' else status,
+                    priority=PRIORITIES[_choice(row, 'priority', PRIORITIES, default=str(DEFAULT_PRIORITY))],
+                )
+                building = _text(row, 'building')
+                if building:
+                    if building not in buildings:
+                        raise RowError(f"Unknown building {building!r}")
+                    request.building_id = buildings[building]
+                created_at = _datetime(row, 'created_at', default=now)
+                request.queue_at = created_at - queue_head_start(request.priority)
+                updated_at = created_at
+                if request.status in ('Pending Approval', 'Completed'):
+                    worker_id, worker_role = people.get(_text(row, 'assigned_worker', required=True), (None, None))
+                    if worker_role != 'Worker':
+                        raise RowError(f"assigned_worker {row.get('assigned_worker')!r} is not a worker")
+                    request.assigned_worker_id = worker_id
+                    request.assigned_at = created_at
+                if request.status == 'Completed':
+                    request.is_approved_by_student = True
+                    request.approved_at = updated_at = _datetime(row, 'approved_at', default=created_at)
+                    rating = _text(row, 'worker_rating')
+                    if rating:
+                        if not rating.isdigit() or int(rating) not in RATINGS:
+                            raise RowError(f"worker_rating {rating!r} must be 1-5")
+                        request.worker_rating = int(rating)
+                request_image = _text(row, 'request_image', required=True)
+                completion_image = _text(row, 'completion_image') if request.status != 'Pending' else ''
+                # Both files are checked before either is stored, so a rejected row holds no blob reference.
+                for image_path in filter(None, (request_image, completion_image)):
+                    images.check(image_path)
+                request._import_images = (request_image, completion_image)
+                request._import_times = (created_at, updated_at)
+                valid.append((line, request, status))
+            except RowError as e:
+                report.error(line, e)
+        if not valid:
+            continue
+
+        # Each batch commits on its own. Its images are stored inside its transaction, so the blob
+        # references commit with the rows holding them: a batch that fails leaves none behind, only
+        # files for collect_media_garbage --orphans.
+        with transaction.atomic():
+            created = []
+            for line, request, status in valid:
+                request_image, completion_image = request._import_images
+                try:
+                    request.request_image = images.store(request_image, 'request_images/')
+                    if completion_image:
+                        request.completion_image = images.store(completion_image, 'completion_images/')
+                except RowError as e:
+                    report.error(line, e)
+                    continue
+                if status == 'Assigned':
+                    report.requeued += 1
+                created.append(request)
+            images.flush()
+            if not created:
+                continue
+            created = WasteRequest.objects.bulk_create(created, batch_size=batch_size)
+            _restore_times(created)
+            notify_transitions(WasteRequest, [
+                Transition(
+                    request_id=request.pk, category=request.category, old_status=None, new_status=request.status,
+                    worker_id=request.assigned_worker_id, created_at=request.created_at, at=request.updated_at,
+                    old_category=request.category, requestee_id=request.requestee_id,
+                )
+                for request in created
+            ])
+        rated_workers.update(request.assigned_worker_id for request in created if request.worker_rating)
+        report.created += len(created)
+        report.earliest = min(filter(None, [report.earliest, *(request.created_at for request in created)]))
+    report.elapsed = time.perf_counter() - started
+    return report, rated_workers
+
+
+def refresh_rating_totals(worker_ids, batch_size=1000):
+    """
+    Recomputes the rating totals of the given workers from their Completed
+    requests: one ordered, streamed query and one bulk_update per batch of workers.
+    """
+    worker_ids = sorted(worker_ids)
+    for start in range(0, len(worker_ids), batch_size):
+        chunk = worker_ids[start:start + batch_size]
+        totals = {worker_id: [0, 0, None] for worker_id in chunk}
+        rated = WasteRequest.objects.filter(
+            status='Completed', assigned_worker_id__in=chunk, worker_rating__isnull=False
+        ).order_by('approved_at', 'id').values_list('assigned_worker_id', 'worker_rating')
+        for worker_id, rating in rated.iterator(chunk_size=batch_size):
+            entry = totals[worker_id]
+            entry[0] += rating
+            entry[1] += 1
+            entry[2] = rating if entry[2] is None else entry[2] * (1 - RECENT_RATING_WEIGHT) + rating * RECENT_RATING_WEIGHT
+        profiles = list(UserProfile.objects.filter(user_id__in=chunk, role='Worker'))
+        for profile in profiles:
+            rating_sum, rating_count, recent = totals[profile.user_id]
+            profile.rating_sum = rating_sum
+            profile.rating_count = rating_count
+            profile.average_rating = round(rating_sum / rating_count, 2) if rating_count else None
+            profile.recent_rating = recent
+        UserProfile.objects.bulk_update(
+            profiles, ['rating_sum', 'rating_count', 'average_rating', 'recent_rating'], batch_size=batch_size
+        )
@@ -0,0 +1,48 @@
+
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from waste_management.derivatives import IMAGE_FIELDS, shutdown_executor, submit_derivatives
+from waste_management.models import WasteRequest
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates thumbnail and medium renditions for request/completion images that do not have them yet "
+        "(e.g. uploads made before the derivative pipeline existed)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Regenerate renditions that already exist.")
+
+    def handle(self, *args, **options):
+        in_flight = set()
+        max_in_flight = max(1, settings.CLEANIFY_IMAGE_WORKERS) * 4
+        submitted = missing = 0
+
+        for field_name in IMAGE_FIELDS:
+            queryset = WasteRequest.objects.exclude(**{field_name: ''}).exclude(**{f"{field_name}__isnull": True})
+            if not options['force']:
+                thumb = f"{field_name}_thumb"
+                queryset = queryset.filter(Q(**{thumb: ''}) | Q(**{f"{thumb}__isnull": True}))
+            for request_id, source_name in queryset.values_list('id', field_name).iterator(chunk_size=500):
+                if not default_storage.exists(source_name):
+                    missing += 1
+                    self.stderr.write(f"Request {request_id}: {source_name} is missing on disk, skipped.")
+                    continue
+                future = submit_derivatives(request_id, field_name, source_name, force=options['force'])
+                submitted += 1
+                if future is not None:
+                    in_flight.add(future)
+                    if len(in_flight) >= max_in_flight:
+                        _done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+
+        wait(in_flight)
+        if settings.CLEANIFY_IMAGE_WORKERS:
+            # Also waits for the done-callbacks that record the rendition paths.
+            shutdown_executor()
+        self.stdout.write(self.style.SUCCESS(f"Rendered derivatives for {submitted} images ({missing} sources missing)."))
@@ -0,0 +1,170 @@
+
+import asyncio
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import ModuleType
+
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import URLResolver, include, path
+
+import cleanify.urls
+import waste_management.urls
+from waste_management import async_views, views
+from waste_management.benchmarking import throwaway_database, temporary_media_root, seed_dataset, summarize
+from waste_management.models import WasteRequest
+from waste_management.worker_pool import get_worker_pool
+
+
+DASHBOARDS = ('requestee_dashboard', 'worker_dashboard', 'admin_dashboard')
+
+
+def dashboards_urlconf(dashboards):
+    """ The project URLconf with the three dashboards taken from `dashboards` (views or async_views). """
+    app_patterns = [
+        path(str(pattern.pattern), getattr(dashboards, pattern.name), name=pattern.name)
+        if pattern.name in DASHBOARDS else pattern
+        for pattern in waste_management.urls.urlpatterns
+    ]
+    urlconf = ModuleType(f"cleanify_bench_urls_{dashboards.__name__.rsplit('.', 1)[-1]}")
+    urlconf.urlpatterns = [
+        path('app/', include(app_patterns))
+        if isinstance(pattern, URLResolver) and pattern.urlconf_name is waste_management.urls else pattern
+        for pattern in cleanify.urls.urlpatterns
+    ]
+    return urlconf
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares dashboard throughput under concurrent load: sync views behind WSGI (a threaded server) "
+        "against sync and async views behind ASGI (an event loop, as uvicorn runs it). Both handlers are "
+        "driven in-process on a seeded throwaway database, so only the Django side is measured."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requestees', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=80)
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--concurrency', type=int, default=16, help="Threads (WSGI) or tasks (ASGI) issuing requests.")
+        parser.add_argument('--total', type=int, default=300, help="Requests per dashboard and mode.")
+
+    def handle(self, *args, **options):
+        with throwaway_database(on_disk=True), temporary_media_root():
+            seed_dataset(options['requestees'], options['workers'], options['requests'])
+            get_worker_pool().invalidate()
+            cookies = self._sessions()
+            modes = (
+                ('WSGI + sync views', views, self._run_wsgi),
+                ('ASGI + sync views', views, self._run_asgi),
+                ('ASGI + async views', async_views, self._run_asgi),
+            )
+            for name in DASHBOARDS:
+                self.stdout.write(self.style.MIGRATE_HEADING(f"{name} ({options['concurrency']} concurrent)"))
+                url = f"/app/{name.split('_')[0]}/dashboard/"
+                for label, dashboards, run in modes:
+                    with override_settings(ROOT_URLCONF=dashboards_urlconf(dashboards)):
+                        elapsed, samples, failures = run(url, cookies[name], options['concurrency'], options['total'])
+                    stats = summarize(samples)
+                    self.stdout.write(
+                        f"  {label:<20} {len(samples) / elapsed:8.1f} req/s  p50 {stats['p50_ms']:8.2f} ms  "
+                        f"p95 {stats['p95_ms']:8.2f} ms  {failures} failed"
+                    )
+
+    def _sessions(self):
+        """ Session cookies for the heaviest requestee, the busiest worker and a staff user. """
+        requestee_id = WasteRequest.objects.values('requestee').annotate(n=Count('id')).order_by('-n')[0]['requestee']
+        worker_id = (
+            WasteRequest.objects.filter(status='Completed').values('assigned_worker')
+            .annotate(n=Count('id')).order_by('-n')[0]['assigned_worker']
+        )
+        admin = User.objects.create_user(username='bench_admin', is_staff=True)
+        cookies = {}
+        for name, user in zip(DASHBOARDS, (User.objects.get(pk=requestee_id), User.objects.get(pk=worker_id), admin)):
+            client = Client()
+            client.force_login(user)
+            cookies[name] = f"sessionid={client.cookies['sessionid'].value}"
+        return cookies
+
+    def _run_wsgi(self, url, cookie, concurrency, total):
+        handler = WSGIHandler()
+
+        def one():
+            statuses = []
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': url, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+                'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'REMOTE_ADDR': '127.0.0.1', 'HTTP_HOST': 'testserver', 'HTTP_COOKIE': cookie,
+                'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+                'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False, 'wsgi.version': (1, 0),
+            }
+            started = time.perf_counter()
+            response = handler(environ, lambda status, headers, exc_info=None: statuses.append(status))
+            try:
+                for _chunk in response:
+                    pass
+            finally:
+                response.close()
+            return time.perf_counter() - started, statuses[0].startswith('200')
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda _i: one(), range(total)))
+        elapsed = time.perf_counter() - started
+        return elapsed, [r[0] for r in results], sum(1 for r in results if not r[1])
+
+    def _run_asgi(self, url, cookie, concurrency, total):
+        handler = ASGIHandler()
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': url, 'raw_path': url.encode(), 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+            'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+        }
+
+        async def one():
+            body_sent = False
+            disconnected = asyncio.Event()
+            status = []
+
+            async def receive():
+                nonlocal body_sent
+                if not body_sent:
+                    body_sent = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await disconnected.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            started = time.perf_counter()
+            await handler(dict(scope), receive, send)
+            disconnected.set()
+            return time.perf_counter() - started, status[0] == 200
+
+        async def run():
+            queue = asyncio.Queue()
+            for i in range(total):
+                queue.put_nowait(i)
+            results = []
+
+            async def client():
+                while not queue.empty():
+                    queue.get_nowait()
+                    results.append(await one())
+
+            await asyncio.gather(*(client() for _ in range(concurrency)))
+            return results
+
+        started = time.perf_counter()
+        results = asyncio.run(run())
+        elapsed = time.perf_counter() - started
+        return elapsed, [r[0] for r in results], sum(1 for r in results if not r[1])
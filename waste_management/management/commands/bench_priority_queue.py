@@ -0,0 +1,113 @@
+import heapq
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.utils import timezone
+
+from waste_management.assignment import assign_next_pending
+from waste_management.benchmarking import throwaway_database, create_workers, percentile, PRIORITY_MIX
+from waste_management.models import UserProfile, WasteRequest, CATEGORY_CHOICES, PRIORITY_CHOICES, queue_head_start
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulates the Pending queue of one category in virtual time and reports the wait "
+        "(arrival to assignment) per priority class under FIFO, the configured priority aging "
+        "and strict priority. Every assignment goes through assign_next_pending on a throwaway "
+        "database, so the order is exactly what the index-backed lookup produces."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=10)
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--load', type=float, default=0.95, help="Arrival rate as a fraction of the workers' capacity.")
+        parser.add_argument('--service-minutes', type=float, default=30.0, help="Mean time a worker spends on a task.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        policies = (
+            ('fifo', {priority: 0 for priority, _label in PRIORITY_CHOICES}),
+            ('aging', settings.CLEANIFY_PRIORITY_HEAD_START_HOURS),
+            # Head starts of years: a higher priority always goes first.
+            ('strict', {priority: (priority - 1) * 100000 for priority, _label in PRIORITY_CHOICES}),
+        )
+        arrivals = self._arrivals(options)
+        span = arrivals[-1][0] / 3600
+        self.stdout.write(
+            f"{len(arrivals)} requests over {span:.1f} virtual hours, {options['workers']} workers, "
+            f"load {options['load']:.0%}, mean service {options['service_minutes']:.0f} min"
+        )
+        labels = dict(PRIORITY_CHOICES)
+        with throwaway_database():
+            requestee = User.objects.create_user(username='sim-requestee')
+            create_workers(options['workers'], prefix='sim_worker')
+            category = CATEGORY_CHOICES[0][0]
+            UserProfile.objects.filter(role='Worker').update(category=category)
+            workers = list(User.objects.filter(profile__role='Worker').select_related('profile'))
+            for name, head_starts in policies:
+                WasteRequest.objects.all().delete()
+                with override_settings(CLEANIFY_PRIORITY_HEAD_START_HOURS=head_starts):
+                    started = time.perf_counter()
+                    waits = self._simulate(arrivals, options, requestee, workers)
+                    elapsed = time.perf_counter() - started
+                self.stdout.write(self.style.MIGRATE_HEADING(f"{name} ({elapsed:.1f}s wall)"))
+                for priority, samples in sorted(waits.items()):
+                    hours = [wait / 3600 for wait in samples]
+                    self.stdout.write(
+                        f"  {labels[priority]:<7} n={len(hours):<5} wait p50 {percentile(hours, 50):6.2f} h  "
+                        f"p90 {percentile(hours, 90):6.2f} h  p99 {percentile(hours, 99):6.2f} h  max {max(hours):6.2f} h"
+                    )
+
+    def _arrivals(self, options):
+        """ (virtual second, priority) pairs: Poisson arrivals with priorities drawn from PRIORITY_MIX. """
+        rng = random.Random(options['seed'])
+        rate = options['load'] * options['workers'] / (options['service_minutes'] * 60)
+        priorities, weights = zip(*PRIORITY_MIX)
+        clock, arrivals = 0.0, []
+        for _ in range(options['requests']):
+            clock += rng.expovariate(rate)
+            arrivals.append((clock, rng.choices(priorities, weights)[0]))
+        return arrivals
+
+    def _simulate(self, arrivals, options, requestee, workers):
+        """ Runs the queue once on an empty request table; returns {priority: [wait seconds]}. """
+        rng = random.Random(options['seed'] + 1)
+        category = workers[0].profile.category
+        waits = {}
+        # Virtual second 0 is this far in the past, so queue_at values look like real history.
+        origin = timezone.now() - timedelta(seconds=arrivals[-1][0] + 86400)
+        arrived_at = {}
+        next_arrival = 0
+        # (virtual second the worker is free, worker index)
+        free = [(0.0, i) for i in range(len(workers))]
+        heapq.heapify(free)
+        while free:
+            clock, i = heapq.heappop(free)
+            # Everything that has arrived by now joins the queue before the worker looks.
+            batch, batch_times = [], []
+            while next_arrival < len(arrivals) and arrivals[next_arrival][0] <= clock:
+                at, priority = arrivals[next_arrival]
+                batch_times.append(at)
+                batch.append(WasteRequest(
+                    requestee=requestee, category=category, location='Simulation',
+                    request_image='request_images/simulation.jpg', priority=priority,
+                    queue_at=origin + timedelta(seconds=at) - queue_head_start(priority),
+                ))
+                next_arrival += 1
+            for request, at in zip(WasteRequest.objects.bulk_create(batch), batch_times):
+                arrived_at[request.pk] = (at, request.priority)
+            worker = workers[i]
+            UserProfile.objects.filter(pk=worker.profile.pk).update(current_task=None)
+            result = assign_next_pending(worker)
+            if result:
+                at, priority = arrived_at.pop(result.request_id)
+                waits.setdefault(priority, []).append(clock - at)
+                heapq.heappush(free, (clock + rng.expovariate(1 / (options['service_minutes'] * 60)), i))
+            elif next_arrival < len(arrivals):
+                heapq.heappush(free, (arrivals[next_arrival][0], i))
+        return waits
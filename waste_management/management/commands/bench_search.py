@@ -0,0 +1,72 @@
+import time
+
+from django.contrib import admin
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from waste_management.admin import WasteRequestAdmin
+from waste_management.benchmarking import throwaway_database, temporary_media_root, seed_dataset, summarize, time_calls
+from waste_management.models import WasteRequest
+from waste_management.search import FTS_TABLE, ranked_matches, search_requests
+
+
+QUERIES = (
+    ('rare word', 'sparking'),
+    ('common word', 'library'),
+    ('three words', 'pipe leaking hostel'),
+    ('prefix', 'flick'),
+    ('username', 'bench_0_requestee_17'),
+    ('no match', 'zebra'),
+)
+PAGE_SIZE = 25
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the admin's icontains search with the FTS5 index on a throwaway database "
+        "of seeded requests: changelist page + count, and the staff endpoint's top matches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1_000_000)
+        parser.add_argument('--chunk', type=int, default=100_000, help="Requests seeded per pass.")
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        model_admin = WasteRequestAdmin(WasteRequest, admin.site)
+        with temporary_media_root(), throwaway_database(on_disk=True):
+            started = time.perf_counter()
+            for i, offset in enumerate(range(0, options['requests'], options['chunk'])):
+                count = min(options['chunk'], options['requests'] - offset)
+                seed_dataset(requestees=200, workers=40, requests=count, images=2, seed=i, prefix=f"bench_{i}")
+            self.stdout.write(f"Seeded {WasteRequest.objects.count()} requests in {time.perf_counter() - started:.0f}s (index kept by triggers).")
+            started = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            self.stdout.write(f"Full index rebuild: {time.perf_counter() - started:.1f}s, {self._index_megabytes():.0f} MB on disk")
+
+            queryset = WasteRequest.objects.select_related('requestee', 'assigned_worker')
+            for label, term in QUERIES:
+                def icontains():
+                    results, _duplicates = admin.ModelAdmin.get_search_results(model_admin, None, queryset, term)
+                    return results.count(), list(results.order_by('-created_at', '-pk')[:PAGE_SIZE])
+
+                def fts():
+                    results = search_requests(queryset, term, usernames=True)
+                    return results.count(), list(results[:PAGE_SIZE])
+
+                hits = icontains()[0]
+                self.stdout.write(self.style.MIGRATE_HEADING(f"{label} {term!r}: {hits} matches by icontains, {fts()[0]} by the index"))
+                self._report('admin icontains page+count', time_calls(icontains, options['repeat']))
+                self._report('admin FTS5 ranked page+count', time_calls(fts, options['repeat']))
+                self._report('endpoint FTS5 top 20', time_calls(lambda: ranked_matches(term, 20), options['repeat']))
+
+    def _index_megabytes(self):
+        """ Size of the FTS5 shadow tables: the index itself, as the text stays in the request table. """
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT SUM(pgsize) FROM dbstat WHERE name LIKE %s", [f"{FTS_TABLE}_%"])
+            return (cursor.fetchone()[0] or 0) / 1e6
+
+    def _report(self, label, samples):
+        stats = summarize(samples)
+        self.stdout.write(f"  {label:<32} p50 {stats['p50_ms']:9.1f} ms  p95 {stats['p95_ms']:9.1f} ms")
@@ -0,0 +1,78 @@
+import gzip
+import re
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.test import Client, RequestFactory, override_settings
+from django.views.static import serve as django_serve
+
+from waste_management.benchmarking import summarize, time_calls
+from waste_management.staticfiles import StaticFileIndex, brotli, serve
+
+
+class Command(BaseCommand):
+    help = (
+        "Collects static files into a temporary STATIC_ROOT with the production storage and reports what a "
+        "page's render-blocking stylesheet costs: bytes on the wire, and the time to serve it with "
+        "StaticFilesMiddleware's handler compared with django.views.static.serve, and a revalidation. First "
+        "paint itself needs a browser and is not measured here."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=500)
+
+    def handle(self, *args, **options):
+        root = tempfile.mkdtemp(prefix='cleanify-static-')
+        production = override_settings(
+            DEBUG=False,
+            STATIC_ROOT=root,
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'waste_management.staticfiles.CompressedManifestStaticFilesStorage'},
+            },
+            CLEANIFY_SERVE_STATIC=True,
+        )
+        try:
+            with production:
+                call_command('collectstatic', interactive=False, verbosity=0)
+                client = Client()
+                page = client.get('/').content.decode()
+                url = re.search(r'href="(/static/css/[^"]+\.css)"', page).group(1)
+                path = f"{root}/{url[len('/static/'):]}"
+                with open(path, 'rb') as f:
+                    css = f.read()
+                self.stdout.write(self.style.MIGRATE_HEADING(f"Stylesheet {url}"))
+                self.stdout.write(f"  identity {len(css):7d} bytes")
+                self.stdout.write(f"  gzip     {len(gzip.compress(css, 9)):7d} bytes")
+                if brotli is not None:
+                    self.stdout.write(f"  brotli   {len(brotli.compress(css, quality=11)):7d} bytes")
+                else:
+                    self.stdout.write("  brotli   (Brotli package not installed; no .br variants written)")
+                self.stdout.write(
+                    "  Before: the Play CDN script, fetched from cdn.tailwindcss.com and compiling every "
+                    "page's styles in the browser before first paint."
+                )
+
+                index = StaticFileIndex(root, '/static/')
+                factory = RequestFactory()
+                compressed = factory.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+                first = serve(compressed, index.match(compressed))
+                revalidation = factory.get(url, HTTP_ACCEPT_ENCODING='gzip, br', HTTP_IF_NONE_MATCH=first['ETag'])
+                plain = factory.get(url)
+                repeat = options['repeat']
+                self.stdout.write(self.style.MIGRATE_HEADING(f"Serving it, handler only ({repeat} requests each)"))
+                self._report('StaticFilesMiddleware, gzip', time_calls(
+                    lambda: b''.join(serve(compressed, index.match(compressed)).streaming_content), repeat))
+                self._report('StaticFilesMiddleware, 304', time_calls(
+                    lambda: serve(revalidation, index.match(revalidation)), repeat))
+                self._report('django.views.static.serve', time_calls(
+                    lambda: b''.join(django_serve(plain, url[len('/static/'):], document_root=root).streaming_content), repeat))
+                self.stdout.write(f"  Cache-Control: {first['Cache-Control']} (a repeat view makes no request at all)")
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+    def _report(self, label, samples):
+        stats = summarize(samples)
+        self.stdout.write(f"  {label:<32} p50 {stats['p50_ms']:7.3f} ms  p95 {stats['p95_ms']:7.3f} ms")
@@ -0,0 +1,123 @@
+import heapq
+import logging
+import math
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from waste_management.benchmarking import throwaway_database, create_workers, percentile
+from waste_management.models import Building, UserProfile, WasteRequest, CATEGORY_CHOICES
+from waste_management.views import find_and_assign_worker, try_assign_pending_task_to_worker
+from waste_management.worker_pool import get_worker_pool
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulates a working day of one category on a throwaway database: requests arrive at "
+        "random buildings, are auto-assigned by find_and_assign_worker, and a worker who finishes "
+        "takes the head of the queue. Reports how far workers walked to reach their tasks with "
+        "CLEANIFY_NEAREST_WORKER off and on."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buildings', type=int, default=80)
+        parser.add_argument('--campus-metres', type=float, default=2000.0, help="Side of the square campus.")
+        parser.add_argument('--workers', type=int, default=12)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--hours', type=float, default=10.0, help="Length of the working day.")
+        parser.add_argument('--service-minutes', type=float, default=15.0, help="Mean time spent on a task once there.")
+        parser.add_argument('--walk-speed', type=float, default=80.0, help="Metres per minute.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        side = options['campus_metres']
+        day = options['hours'] * 3600
+        arrivals = sorted(rng.uniform(0, day) for _ in range(options['requests']))
+        self.stdout.write(
+            f"{options['requests']} requests over {options['hours']:.0f} h, {options['workers']} workers, "
+            f"{options['buildings']} buildings on a {side:.0f} m campus"
+        )
+        # The per-assignment INFO lines would drown the report.
+        logging.disable(logging.INFO)
+        try:
+            with throwaway_database():
+                self.buildings = Building.objects.bulk_create([
+                    Building(name=f"Building {i}", x=rng.uniform(0, side), y=rng.uniform(0, side))
+                    for i in range(options['buildings'])
+                ])
+                self.requestee = User.objects.create_user(username='sim-requestee')
+                create_workers(options['workers'], prefix='sim_worker')
+                self.category = CATEGORY_CHOICES[0][0]
+                UserProfile.objects.filter(role='Worker').update(category=self.category)
+                sites = [rng.choice(self.buildings) for _ in arrivals]
+                starts = [rng.choice(self.buildings) for _ in range(options['workers'])]
+                for nearest in (False, True):
+                    with override_settings(CLEANIFY_NEAREST_WORKER=nearest):
+                        started = time.perf_counter()
+                        walks, waits = self._simulate(list(zip(arrivals, sites)), starts, options)
+                        elapsed = time.perf_counter() - started
+                    label = 'nearest free worker' if nearest else 'pool policy only'
+                    self.stdout.write(self.style.MIGRATE_HEADING(f"{label} ({elapsed:.1f}s wall)"))
+                    self.stdout.write(
+                        f"  travel total {sum(walks) / 1000:8.1f} km  mean {sum(walks) / len(walks):6.0f} m  "
+                        f"p95 {percentile(walks, 95):6.0f} m  ({len(walks)} tasks)"
+                    )
+                    self.stdout.write(
+                        f"  wait for assignment p50 {percentile(waits, 50) / 60:6.1f} min  "
+                        f"p95 {percentile(waits, 95) / 60:6.1f} min"
+                    )
+        finally:
+            logging.disable(logging.NOTSET)
+
+    def _simulate(self, arrivals, starts, options):
+        """ Runs the day once from the given start buildings; returns ([metres walked], [seconds waited]). """
+        rng = random.Random(options['seed'] + 1)
+        WasteRequest.objects.all().delete()
+        workers = list(User.objects.filter(profile__role='Worker').select_related('profile').order_by('id'))
+        position = {}
+        for worker, building in zip(workers, starts):
+            profile = worker.profile
+            profile.current_task = None
+            profile.save(update_fields=['current_task'] + profile.move_to(building))
+            position[worker.pk] = (building.x, building.y)
+        get_worker_pool().invalidate()
+        by_id = {worker.pk: worker for worker in workers}
+        walks, waits, arrived_at, events = [], [], {}, []
+
+        def start(clock, waste_request):
+            x, y = position[waste_request.assigned_worker_id]
+            walk = math.hypot(waste_request.building.x - x, waste_request.building.y - y)
+            walks.append(walk)
+            waits.append(clock - arrived_at.pop(waste_request.pk))
+            done = clock + walk / options['walk_speed'] * 60 + rng.expovariate(1 / (options['service_minutes'] * 60))
+            heapq.heappush(events, (done, 1, waste_request.pk))
+
+        for at, building in arrivals:
+            heapq.heappush(events, (at, 0, building))
+        while events:
+            clock, kind, payload = heapq.heappop(events)
+            if kind == 0:
+                waste_request = WasteRequest.objects.create(
+                    requestee=self.requestee, category=self.category, location=payload.name, building=payload,
+                    request_image='request_images/simulation.jpg',
+                )
+                arrived_at[waste_request.pk] = clock
+                if find_and_assign_worker(waste_request):
+                    start(clock, waste_request)
+                continue
+            waste_request = WasteRequest.objects.select_related('building').get(pk=payload)
+            worker = by_id[waste_request.assigned_worker_id]
+            waste_request.status = 'Pending Approval'
+            waste_request.save(update_fields=['status', 'updated_at'])
+            worker.profile.current_task = None
+            worker.profile.save(update_fields=['current_task'] + worker.profile.move_to(waste_request.building))
+            position[worker.pk] = (waste_request.building.x, waste_request.building.y)
+            try_assign_pending_task_to_worker(worker)
+            worker.profile.refresh_from_db(fields=['current_task'])
+            if worker.profile.current_task_id:
+                start(clock, WasteRequest.objects.select_related('building').get(pk=worker.profile.current_task_id))
+        return walks, waits
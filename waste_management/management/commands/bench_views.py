@@ -0,0 +1,242 @@
+
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from waste_management.benchmarking import (
+    throwaway_database,
+    temporary_media_root,
+    placeholder_image_bytes,
+    seed_dataset,
+    summarize,
+)
+from waste_management.derivatives import shutdown_executor
+from waste_management.fragment_cache import get_fragment_cache
+from waste_management.models import UserProfile, WasteRequest
+from waste_management.worker_pool import get_worker_pool
+
+
+# A common word, a rare one, a prefix and two words, against the seeded locations and descriptions.
+SEARCH_TERMS = ('library', 'sparking', 'flick', 'pipe hostel')
+
+
+def check_budgets(results, budgets):
+    """ Returns a message for every scenario whose max query count or p95 latency is over its budget. """
+    problems = []
+    for name, result in results.items():
+        if name not in budgets:
+            continue
+        max_queries, p95_budget_ms = budgets[name]
+        if result['queries'] > max_queries:
+            problems.append(f"{name}: {result['queries']} queries (budget {max_queries})")
+        if result['p95_ms'] > p95_budget_ms:
+            problems.append(f"{name}: p95 {result['p95_ms']:.1f} ms (budget {p95_budget_ms} ms)")
+    return problems
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a throwaway database and drives every view in waste_management/urls.py with the test client, "
+        "reporting latency percentiles and SQL query counts per view. Dashboards are measured with an empty "
+        "fragment cache and again served from it. Fails if a view is over the budget configured in "
+        "CLEANIFY_VIEW_BUDGETS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requestees', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=80)
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--iterations', type=int, default=30, help="Timed requests per view.")
+        parser.add_argument('--warmup', type=int, default=3, help="Untimed requests per view before measuring.")
+        parser.add_argument('--no-budgets', action='store_true', help="Report only; never fail.")
+
+    def handle(self, *args, **options):
+        runs = options['warmup'] + options['iterations']
+        # On disk, so the image pipeline's callback threads can write while the client holds the connection.
+        with throwaway_database(on_disk=True), temporary_media_root():
+            seeded = seed_dataset(options['requestees'], options['workers'], options['requests'])
+            self.stdout.write(f"Seeded {sum(seeded.values())} requests: {seeded}")
+            get_worker_pool().invalidate()
+            self._prepare()
+            results = {}
+            try:
+                for name, step in self._scenarios():
+                    samples, queries = [], 0
+                    for i in range(runs):
+                        client, method, url, data = step(i)
+                        with CaptureQueriesContext(connection) as captured:
+                            started = time.perf_counter()
+                            response = getattr(client, method)(url, data) if data is not None else getattr(client, method)(url)
+                            if response.streaming:
+                                # Streamed rows are read from the database as the body is consumed.
+                                for _chunk in response.streaming_content:
+                                    pass
+                            elapsed = time.perf_counter() - started
+                        if response.status_code not in (200, 204, 302):
+                            raise CommandError(f"{name} returned HTTP {response.status_code} for {url}")
+                        if i >= options['warmup']:
+                            samples.append(elapsed)
+                            queries = max(queries, len(captured))
+                    results[name] = dict(summarize(samples), queries=queries)
+                    self._report(name, results[name])
+            finally:
+                shutdown_executor()
+
+        if options['no_budgets']:
+            return
+        problems = check_budgets(results, settings.CLEANIFY_VIEW_BUDGETS)
+        if problems:
+            raise CommandError("Views over budget:\n  " + "\n  ".join(problems))
+        self.stdout.write(self.style.SUCCESS("All views within budget."))
+
+    def _prepare(self):
+        """ Picks the heaviest users and the rows each state-changing scenario will consume. """
+        self.admin = User.objects.create_user(username='bench_admin', is_staff=True)
+        self.heavy_requestee = User.objects.get(pk=(
+            WasteRequest.objects.values('requestee').annotate(n=Count('id')).order_by('-n')[0]['requestee']
+        ))
+        self.heavy_worker = User.objects.get(pk=(
+            WasteRequest.objects.filter(status='Completed').values('assigned_worker')
+            .annotate(n=Count('id')).order_by('-n')[0]['assigned_worker']
+        ))
+        self.awaiting_approval = list(
+            WasteRequest.objects.filter(status='Pending Approval').values_list('id', 'requestee_id')
+        )
+        self.assigned = list(WasteRequest.objects.filter(status='Assigned').values_list('id', 'assigned_worker_id'))
+        self.pending = list(WasteRequest.objects.filter(status='Pending').values_list('id', flat=True))
+        self.heavy_worker_task = str(
+            UserProfile.objects.filter(user=self.heavy_worker).values_list('current_task_id', flat=True).first() or ''
+        )
+        self.requestee_image = (
+            WasteRequest.objects.filter(requestee=self.heavy_requestee).values_list('request_image', flat=True).first()
+        )
+        self.requestee_ids = list(UserProfile.objects.filter(role='Requestee').values_list('user_id', flat=True))
+        self._clients = {}
+
+    def _client(self, user_id):
+        client = self._clients.get(user_id)
+        if client is None:
+            client = self._clients[user_id] = Client()
+            client.force_login(User.objects.get(pk=user_id))
+        return client
+
+    def _take(self, rows, name):
+        if not rows:
+            raise CommandError(f"Seeded data ran out of rows for {name}; seed more requests or run fewer iterations.")
+        return rows.pop()
+
+    def _scenarios(self):
+        """ (name, step) pairs; step(i) returns (client, method, url, data) for the i-th request. """
+        image = placeholder_image_bytes(size=(800, 600), image_format='JPEG')
+
+        def requestee_dashboard(i):
+            return self._client(self.heavy_requestee.pk), 'get', reverse('requestee_dashboard'), None
+
+        def create_request_get(i):
+            return self._client(self.heavy_requestee.pk), 'get', reverse('create_request'), None
+
+        def create_request_post(i):
+            requestee_id = self.requestee_ids[i % len(self.requestee_ids)]
+            return self._client(requestee_id), 'post', reverse('create_request'), {
+                'category': 'Garbage Collection',
+                'location': f"Bench block {i}",
+                'description': 'benchmark',
+                'request_image': SimpleUploadedFile(
+                    'bench.jpg', placeholder_image_bytes(color=(i % 256, 80, 120), image_format='JPEG'),
+                    content_type='image/jpeg'
+                ),
+            }
+
+        def approve_request_get(i):
+            request_id, requestee_id = self.awaiting_approval[-1 - (i % len(self.awaiting_approval))]
+            return self._client(requestee_id), 'get', reverse('approve_request', args=[request_id]), None
+
+        def approve_request_post(i):
+            request_id, requestee_id = self._take(self.awaiting_approval, 'approve_request POST')
+            return self._client(requestee_id), 'post', reverse('approve_request', args=[request_id]), {
+                'approve': 'on', 'worker_rating': 4,
+            }
+
+        def worker_dashboard(i):
+            return self._client(self.heavy_worker.pk), 'get', reverse('worker_dashboard'), None
+
+        def complete_task_get(i):
+            request_id, worker_id = self.assigned[-1 - (i % len(self.assigned))]
+            return self._client(worker_id), 'get', reverse('complete_task', args=[request_id]), None
+
+        def complete_task_post(i):
+            request_id, worker_id = self._take(self.assigned, 'complete_task POST')
+            return self._client(worker_id), 'post', reverse('complete_task', args=[request_id]), {
+                'completion_image': SimpleUploadedFile('done.jpg', image, content_type='image/jpeg'),
+            }
+
+        def admin_dashboard(i):
+            return self._client(self.admin.pk), 'get', reverse('admin_dashboard'), None
+
+        def admin_sla(i):
+            return self._client(self.admin.pk), 'get', reverse('admin_sla'), {'days': 365}
+
+        def admin_manual_assign_get(i):
+            return self._client(self.admin.pk), 'get', reverse('admin_manual_assign', args=[self.pending[-1]]), None
+
+        def admin_manual_assign_post(i):
+            request_id = self._take(self.pending, 'admin_manual_assign POST')
+            worker_id = UserProfile.objects.filter(role='Worker', current_task__isnull=True).values_list('user_id', flat=True).first()
+            return self._client(self.admin.pk), 'post', reverse('admin_manual_assign', args=[request_id]), {
+                'assigned_worker': worker_id,
+            }
+
+        def media(i):
+            return self._client(self.heavy_requestee.pk), 'get', settings.MEDIA_URL + self.requestee_image, None
+
+        def admin_export(i):
+            return self._client(self.admin.pk), 'get', reverse('admin_export'), {'worker': self.heavy_worker.username}
+
+        def admin_search(i):
+            return self._client(self.admin.pk), 'get', reverse('admin_search'), {'q': SEARCH_TERMS[i % len(SEARCH_TERMS)]}
+
+        def worker_assignment_poll(i):
+            # Under the test client (WSGI) the poll answers at once rather than waiting.
+            return self._client(self.heavy_worker.pk), 'get', reverse('worker_assignment_poll'), {'task': self.heavy_worker_task}
+
+        def cold(step):
+            def uncached(i):
+                get_fragment_cache().clear()
+                return step(i)
+            return uncached
+
+        return [
+            ('requestee_dashboard GET', cold(requestee_dashboard)),
+            ('requestee_dashboard GET cached', requestee_dashboard),
+            ('create_request GET', create_request_get),
+            ('approve_request GET', approve_request_get),
+            ('approve_request POST', approve_request_post),
+            ('worker_dashboard GET', cold(worker_dashboard)),
+            ('worker_dashboard GET cached', worker_dashboard),
+            ('complete_task GET', complete_task_get),
+            ('complete_task POST', complete_task_post),
+            ('admin_dashboard GET', cold(admin_dashboard)),
+            ('admin_dashboard GET cached', admin_dashboard),
+            ('admin_sla GET', admin_sla),
+            ('admin_manual_assign GET', admin_manual_assign_get),
+            ('admin_manual_assign POST', admin_manual_assign_post),
+            ('media GET', media),
+            ('admin_export GET', admin_export),
+            ('admin_search GET', admin_search),
+            ('worker_assignment_poll GET', worker_assignment_poll),
+            ('create_request POST', create_request_post),
+        ]
+
+    def _report(self, name, result):
+        self.stdout.write(
+            f"  {name:<33} p50 {result['p50_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms  "
+            f"p99 {result['p99_ms']:8.2f} ms  {result['queries']:3d} queries"
+        )
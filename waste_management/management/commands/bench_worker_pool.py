@@ -0,0 +1,76 @@
+
+import random
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from waste_management.benchmarking import throwaway_database, create_workers, summarize, time_calls
+from waste_management.models import UserProfile, CATEGORY_CHOICES
+from waste_management.worker_pool import FreeWorkerPool, POLICY_CHOICES
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the free-worker pool against the ORDER BY RANDOM() query it replaced, "
+        "at several workforce sizes, on a throwaway database. With every worker placed at a "
+        "random point on the campus, also times picking the nearest free worker to a random point."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+        parser.add_argument('--repeat', type=int, default=200, help="Picks timed per size and method.")
+        parser.add_argument('--busy-ratio', type=float, default=0.5, help="Fraction of workers marked busy.")
+        parser.add_argument('--campus-metres', type=float, default=2000.0, help="Side of the square campus workers are placed on.")
+
+    def handle(self, *args, **options):
+        category = CATEGORY_CHOICES[0][0]
+        with throwaway_database():
+            for size in options['sizes']:
+                UserProfile.objects.all().delete()
+                User.objects.all().delete()
+                create_workers(size, busy_ratio=options['busy_ratio'])
+                self.stdout.write(self.style.MIGRATE_HEADING(f"{size} workers ({options['busy_ratio']:.0%} busy)"))
+
+                def random_query():
+                    User.objects.filter(
+                        profile__role='Worker',
+                        profile__category=category,
+                        profile__current_task__isnull=True,
+                        is_active=True
+                    ).order_by('?').first()
+
+                self._report('ORDER BY RANDOM() query', time_calls(random_query, options['repeat']))
+
+                for policy in POLICY_CHOICES:
+                    pool = FreeWorkerPool(policy=policy)
+                    rebuild_samples = time_calls(pool.rebuild, 1)
+
+                    def pick_and_return():
+                        worker_id = pool.pick(category)
+                        pool.release(worker_id, category)
+
+                    self._report(f"pool[{policy}] pick+return", time_calls(pick_and_return, options['repeat']))
+                    self.stdout.write(f"    pool[{policy}] rebuild: {rebuild_samples[0] * 1000:.2f} ms")
+
+                rng = random.Random(size)
+                side = options['campus_metres']
+                profiles = list(UserProfile.objects.filter(role='Worker'))
+                for profile in profiles:
+                    profile.location_x, profile.location_y = rng.uniform(0, side), rng.uniform(0, side)
+                UserProfile.objects.bulk_update(profiles, ['location_x', 'location_y'], batch_size=1000)
+                locations = {profile.user_id: (profile.location_x, profile.location_y) for profile in profiles}
+                pool = FreeWorkerPool()
+                pool.rebuild()
+
+                def pick_nearest_and_return():
+                    worker_id = pool.pick(category, near=(rng.uniform(0, side), rng.uniform(0, side)))
+                    pool.release(worker_id, category, location=locations[worker_id])
+
+                self._report("pool nearest pick+return", time_calls(pick_nearest_and_return, options['repeat']))
+
+    def _report(self, label, samples):
+        stats = summarize(samples)
+        self.stdout.write(
+            f"  {label:<32} mean {stats['mean_ms']:8.4f} ms  p50 {stats['p50_ms']:8.4f} ms  "
+            f"p95 {stats['p95_ms']:8.4f} ms  p99 {stats['p99_ms']:8.4f} ms"
+        )
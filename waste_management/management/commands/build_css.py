@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from waste_management.css_build import StylesheetBuildError, build_stylesheet
+
+
+class Command(BaseCommand):
+    help = (
+        "Compiles static/css/cleanify.css with the Tailwind compiler in node_modules, for the class names "
+        "used in templates/, static/js/ and the form widgets, and minifies it. Run collectstatic afterwards "
+        "to publish it under a hashed name."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Write nothing; fail if the committed stylesheet is out of date.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            result = build_stylesheet(write=not options['check'])
+        except StylesheetBuildError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+        minifier = 'lightningcss' if result['optimized'] else 'built-in minifier (lightningcss unavailable on this platform)'
+        self.stdout.write(
+            f"{result['candidates']} candidate class names scanned; {result['raw_bytes']} bytes from Tailwind, "
+            f"{result['bytes']} minified by {minifier}, {result['gzip_bytes']} gzipped ({elapsed:.1f}s)"
+        )
+        if options['check']:
+            if result['changed']:
+                raise CommandError(f"{result['path']} is out of date; run build_css.")
+            self.stdout.write(self.style.SUCCESS(f"{result['path']} is up to date."))
+        elif result['changed']:
+            self.stdout.write(self.style.SUCCESS(f"Wrote {result['path']}."))
+        else:
+            self.stdout.write(f"{result['path']} unchanged.")
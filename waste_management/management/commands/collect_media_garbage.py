@@ -0,0 +1,80 @@
+
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from waste_management.derivatives import purge_derivatives
+from waste_management.models import StoredBlob
+from waste_management.storage import CAS_PREFIX, media_storage
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes content-addressed images (and their renditions) that have been unreferenced for longer "
+        "than CLEANIFY_MEDIA_GC_GRACE seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=int, default=None, help="Override CLEANIFY_MEDIA_GC_GRACE (seconds).")
+        parser.add_argument('--orphans', action='store_true', help="Also delete stored files that have no blob row (uploads whose transaction rolled back).")
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        grace = options['grace'] if options['grace'] is not None else settings.CLEANIFY_MEDIA_GC_GRACE
+        cutoff = timezone.now() - timedelta(seconds=grace)
+        storage = media_storage()
+        purged = freed = 0
+
+        candidates = StoredBlob.objects.filter(refcount=0, released_at__lte=cutoff).values_list('pk', 'name', 'size')
+        for pk, name, size in list(candidates.iterator(chunk_size=500)):
+            if options['dry_run']:
+                purged += 1
+                freed += size
+                continue
+            # The file goes before the row is committed: a concurrent upload of the same content blocks on
+            # the row until then, finds it gone and writes the file again.
+            with transaction.atomic():
+                if not StoredBlob.objects.filter(pk=pk, refcount=0).delete()[0]:
+                    continue
+                if storage.exists(name):
+                    storage.purge(name)
+                purge_derivatives(name)
+            purged += 1
+            freed += size
+
+        orphans = 0
+        if options['orphans']:
+            orphans, orphan_bytes = self._collect_orphans(storage, time.time() - grace, options['dry_run'])
+            freed += orphan_bytes
+
+        verb = "Would purge" if options['dry_run'] else "Purged"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {purged} unreferenced blobs and {orphans} orphaned files, {freed / 1024 / 1024:.2f} MB."
+        ))
+
+    def _collect_orphans(self, storage, mtime_cutoff, dry_run):
+        root = storage.path(CAS_PREFIX)
+        count = size = 0
+        for directory, _dirs, files in os.walk(root):
+            names = {
+                os.path.relpath(os.path.join(directory, f), storage.location).replace(os.sep, '/'): f
+                for f in files if not f.startswith('.')
+            }
+            if not names:
+                continue
+            known = set(StoredBlob.objects.filter(name__in=list(names)).values_list('name', flat=True))
+            for name in set(names) - known:
+                path = storage.path(name)
+                if os.path.getmtime(path) > mtime_cutoff:
+                    continue
+                count += 1
+                size += os.path.getsize(path)
+                if not dry_run:
+                    storage.purge(name)
+                    purge_derivatives(name)
+        return count, size
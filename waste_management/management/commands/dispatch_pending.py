@@ -0,0 +1,23 @@
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from waste_management.dispatcher import dispatch_pending
+
+
+class Command(BaseCommand):
+    help = "Assigns Pending requests to free workers in bulk, across all categories."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help="Maximum pending requests considered per pass.")
+        parser.add_argument('--loop', action='store_true', help="Keep running a pass every --interval seconds.")
+        parser.add_argument('--interval', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        while True:
+            report = dispatch_pending(limit=options['limit'])
+            self.stdout.write(str(report))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,95 @@
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from waste_management.dispatcher import dispatch_pending
+from waste_management.importing import FORMATS, import_users, import_requests, refresh_rating_totals
+from waste_management.models import SlaRollup
+from waste_management.worker_pool import get_worker_pool
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-imports users and historical requests from CSV (with a header row) or JSON-lines files. "
+        "Rows are streamed and validated in batches and written with bulk_create, so memory stays flat "
+        "however large the files are; invalid rows are reported and skipped. Each batch is committed "
+        "separately (a dry run rolls everything back). Pending requests are assigned in one dispatch "
+        "pass at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', help="Users file: username, email, first_name, last_name, role, category.")
+        parser.add_argument(
+            '--requests',
+            help="Requests file: requestee, category, location, description, status, request_image, "
+                 "completion_image, assigned_worker, worker_rating, created_at, approved_at.",
+        )
+        parser.add_argument('--format', choices=FORMATS, help="Input format (default: from the file extension).")
+        parser.add_argument('--image-root', help="Directory image paths are relative to (default: the requests file's directory).")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--no-dispatch', action='store_true', help="Leave imported Pending requests unassigned.")
+        parser.add_argument('--dry-run', action='store_true', help="Validate everything, then roll back. Images are only checked.")
+
+    def handle(self, *args, **options):
+        if not options['users'] and not options['requests']:
+            raise CommandError("Nothing to import: pass --users and/or --requests.")
+        started = time.perf_counter()
+        try:
+            if options['dry_run']:
+                with transaction.atomic():
+                    reports = self._import(options)
+                    raise Rollback
+            else:
+                # Every batch commits on its own, so the site can write between batches.
+                reports = self._import(options)
+        except Rollback:
+            self.stdout.write(self.style.WARNING("Dry run: nothing was saved."))
+        except (OSError, ValueError) as e:
+            raise CommandError(
+                f"{e}\nBatches before the failing one were saved; `collect_media_garbage --orphans` "
+                f"removes the images stored for the failed one."
+            )
+        finally:
+            get_worker_pool().invalidate()
+
+        elapsed = time.perf_counter() - started
+        rows = sum(report.rows for report in reports)
+        for report in reports:
+            style = self.style.WARNING if report.errors else self.style.SUCCESS
+            self.stdout.write(style(str(report)))
+            for line, message in report.error_samples:
+                self.stdout.write(f"  line {line}: {message}")
+            if report.errors > len(report.error_samples):
+                self.stdout.write(f"  ... and {report.errors - len(report.error_samples)} more")
+        if self._dispatch is not None:
+            self.stdout.write(f"Dispatch: {self._dispatch}")
+        self.stdout.write(f"{rows} rows in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:.0f} rows/s overall).")
+        if options['requests'] and not options['dry_run']:
+            self.stdout.write("Run backfill_derivatives to render thumbnails for the imported images.")
+
+    def _import(self, options):
+        reports = []
+        self._dispatch = None
+        batch_size = options['batch_size']
+        if options['users']:
+            reports.append(import_users(options['users'], options['format'], batch_size=batch_size))
+        if options['requests']:
+            report, rated_workers = import_requests(
+                options['requests'], options['format'], image_root=options['image_root'],
+                batch_size=batch_size, dry_run=options['dry_run'],
+            )
+            reports.append(report)
+            refresh_rating_totals(rated_workers, batch_size=batch_size)
+            if report.earliest is not None:
+                # Historical assignments and approvals arrive without transitions; count them from the rows.
+                SlaRollup.rebuild(since=timezone.localdate(report.earliest))
+        if not options['no_dispatch']:
+            self._dispatch = dispatch_pending(batch_size=batch_size)
+        return reports
@@ -0,0 +1,17 @@
+
+from django.core.management.base import BaseCommand
+
+from waste_management.models import RequestStatusCount
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the per-status/per-category request counters from the WasteRequest table."
+
+    def handle(self, *args, **options):
+        changed = RequestStatusCount.rebuild()
+        for (status, category), (old, new) in sorted(changed.items()):
+            self.stdout.write(f"{status} / {category}: {old if old is not None else '-'} -> {new}")
+        if changed:
+            self.stdout.write(self.style.WARNING(f"Corrected {len(changed)} counters."))
+        else:
+            self.stdout.write(self.style.SUCCESS("All counters already matched."))
@@ -0,0 +1,101 @@
+
+import os
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from waste_management.derivatives import IMAGE_FIELDS, derivative_name
+from waste_management.image_ops import RENDITIONS
+from waste_management.models import StoredBlob, WasteRequest
+from waste_management.storage import content_name, hash_file, is_content_addressed, media_storage
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves images uploaded before content-addressed storage into it, merging duplicates, "
+        "and reports the disk space saved."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only hash and report; move nothing.")
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        storage = media_storage()
+        moved = {}
+        seen_blobs = set()
+        files = missing = 0
+        bytes_before = bytes_after = 0
+
+        for field_name in IMAGE_FIELDS:
+            renditions = [f"{field_name}_{rendition}" for rendition in RENDITIONS]
+            rows = (
+                WasteRequest.objects.exclude(**{field_name: ''}).exclude(**{f"{field_name}__isnull": True})
+                .values_list('id', field_name, *renditions)
+            )
+            for request_id, name, *rendition_names in rows.iterator(chunk_size=500):
+                if is_content_addressed(name):
+                    continue
+                if name in moved:
+                    stored_name = moved[name]
+                else:
+                    if not storage.exists(name):
+                        missing += 1
+                        self.stderr.write(f"Request {request_id}: {name} is missing on disk, skipped.")
+                        continue
+                    with storage.open(name, 'rb') as source:
+                        digest, size = hash_file(File(source))
+                    stored_name = content_name(digest, os.path.splitext(name)[1][:10])
+                    files += 1
+                    bytes_before += size
+                    duplicate = stored_name in seen_blobs or storage.exists(stored_name)
+                    if not duplicate:
+                        bytes_after += size
+                    seen_blobs.add(stored_name)
+                    moved[name] = stored_name
+                    if not dry_run:
+                        self._move(storage, name, stored_name, duplicate)
+                if dry_run:
+                    continue
+                with transaction.atomic():
+                    StoredBlob.add_reference(stored_name, storage.size(stored_name))
+                    WasteRequest.objects.filter(pk=request_id, **{field_name: name}).update(**{
+                        field_name: stored_name,
+                        **self._move_renditions(field_name, stored_name, rendition_names),
+                    })
+
+        saved = bytes_before - bytes_after
+        ratio = saved / bytes_before * 100 if bytes_before else 0.0
+        verb = "Would move" if dry_run else "Moved"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {files} files ({bytes_before / 1024 / 1024:.2f} MB) into {len(seen_blobs)} blobs "
+            f"({bytes_after / 1024 / 1024:.2f} MB): {saved / 1024 / 1024:.2f} MB saved ({ratio:.1f}%). "
+            f"{missing} sources missing."
+        ))
+
+    def _move(self, storage, name, stored_name, duplicate):
+        if duplicate:
+            storage.purge(name)
+            return
+        target = storage.path(stored_name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(storage.path(name), target)
+
+    def _move_renditions(self, field_name, stored_name, rendition_names):
+        """ Moves existing renditions to the blob's rendition names (or drops them if the blob has its own). """
+        updates = {}
+        for rendition, old in zip(RENDITIONS, rendition_names):
+            if not old:
+                continue
+            new = derivative_name(stored_name, rendition)
+            if default_storage.exists(old):
+                if default_storage.exists(new):
+                    default_storage.delete(old)
+                else:
+                    target = default_storage.path(new)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    os.replace(default_storage.path(old), target)
+            updates[f"{field_name}_{rendition}"] = new if default_storage.exists(new) else None
+        return updates
@@ -0,0 +1,35 @@
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from waste_management.benchmarking import seed_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills the configured database with synthetic requestees, workers (across all categories) and "
+        "requests in a realistic status mix, with placeholder images. Meant for development databases."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requestees', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=80)
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--images', type=int, default=8, help="Distinct placeholder images to share between requests.")
+        parser.add_argument('--busy-ratio', type=float, default=0.5, help="Share of each category's workers holding an Assigned request.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed, for reproducible datasets.")
+        parser.add_argument('--prefix', default='seed', help="Username prefix; must not clash with existing users.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        mix = seed_dataset(
+            options['requestees'], options['workers'], options['requests'],
+            images=options['images'], busy_ratio=options['busy_ratio'], seed=options['seed'], prefix=options['prefix'],
+        )
+        elapsed = time.perf_counter() - started
+        breakdown = ', '.join(f"{status}: {count}" for status, count in sorted(mix.items()))
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['requestees']} requestees, {options['workers']} workers and "
+            f"{sum(mix.values())} requests ({breakdown}) in {elapsed:.2f}s."
+        ))
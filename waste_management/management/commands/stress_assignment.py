@@ -0,0 +1,140 @@
+
+import multiprocessing
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from waste_management.benchmarking import (
+    throwaway_database,
+    temporary_media_root,
+    create_workers,
+    placeholder_image_bytes,
+)
+from waste_management.models import UserProfile, WasteRequest, CATEGORY_CHOICES
+
+
+def _post_requests(requestee_id, count, image_bytes, category, outcomes):
+    """ One thread: logs in as a requestee and submits `count` requests through create_request_view. """
+    ok = failed = 0
+    try:
+        client = Client()
+        client.force_login(User.objects.get(pk=requestee_id))
+        url = reverse('create_request')
+        for i in range(count):
+            response = client.post(url, {
+                'category': category,
+                'location': f"Stress block {requestee_id}-{i}",
+                'description': 'stress test',
+                'request_image': SimpleUploadedFile('issue.png', image_bytes, content_type='image/png'),
+            })
+            if response.status_code == 302:
+                ok += 1
+            else:
+                failed += 1
+    finally:
+        connections.close_all()
+        outcomes.append((ok, failed))
+
+
+def _hammer(requestee_ids, per_thread, image_bytes, category, queue):
+    """ One process: runs a thread per requestee and reports the totals back to the parent. """
+    connections.close_all()
+    outcomes = []
+    threads = [
+        threading.Thread(target=_post_requests, args=(requestee_id, per_thread, image_bytes, category, outcomes))
+        for requestee_id in requestee_ids
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    queue.put((sum(o[0] for o in outcomes), sum(o[1] for o in outcomes)))
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammers create_request_view from many processes and threads against a throwaway database "
+        "and verifies that no worker or request was ever assigned twice."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--threads', type=int, default=4, help="Threads per process.")
+        parser.add_argument('--requests', type=int, default=10, help="Requests submitted per thread.")
+        parser.add_argument('--workers', type=int, default=40, help="Free workers in the target category.")
+
+    def handle(self, *args, **options):
+        category = CATEGORY_CHOICES[0][0]
+        processes, threads, per_thread = options['processes'], options['threads'], options['requests']
+        total = processes * threads * per_thread
+
+        with throwaway_database(on_disk=True), temporary_media_root():
+            create_workers(options['workers'])
+            UserProfile.objects.exclude(category=category).update(category=category)
+            requestee_ids = []
+            for i in range(processes * threads):
+                user = User.objects.create_user(username=f"stress_requestee_{i}")
+                UserProfile.objects.create(user=user, role='Requestee')
+                requestee_ids.append(user.id)
+            connections.close_all()
+
+            image_bytes = placeholder_image_bytes()
+            context = multiprocessing.get_context('fork')
+            queue = context.Queue()
+            children = [
+                context.Process(
+                    target=_hammer,
+                    args=(requestee_ids[p * threads:(p + 1) * threads], per_thread, image_bytes, category, queue)
+                )
+                for p in range(processes)
+            ]
+            started = time.perf_counter()
+            for child in children:
+                child.start()
+            results = [queue.get() for _ in children]
+            for child in children:
+                child.join()
+            elapsed = time.perf_counter() - started
+
+            submitted = sum(r[0] for r in results)
+            failed = sum(r[1] for r in results)
+            problems = self._check_invariants(options['workers'], submitted)
+
+        self.stdout.write(
+            f"{processes} processes x {threads} threads: {submitted}/{total} requests accepted, "
+            f"{failed} failed, {elapsed:.2f}s ({submitted / elapsed:.1f} req/s)"
+        )
+        if failed:
+            problems.append(f"{failed} submissions did not redirect")
+        if problems:
+            raise CommandError("Assignment invariants violated:\n  " + "\n  ".join(problems))
+        self.stdout.write(self.style.SUCCESS("No double assignments detected."))
+
+    def _check_invariants(self, worker_count, submitted):
+        problems = []
+        assigned = WasteRequest.objects.filter(status='Assigned')
+        assigned_count = assigned.count()
+        expected = min(worker_count, submitted)
+        if assigned_count != expected:
+            problems.append(f"{assigned_count} requests assigned, expected {expected}")
+
+        doubled = assigned.values('assigned_worker').annotate(n=Count('id')).filter(n__gt=1)
+        for row in doubled:
+            problems.append(f"worker {row['assigned_worker']} holds {row['n']} assigned requests")
+
+        current = set(UserProfile.objects.filter(current_task__isnull=False).values_list('user_id', 'current_task_id'))
+        assigned_pairs = set(assigned.values_list('assigned_worker_id', 'id'))
+        if current != assigned_pairs:
+            problems.append(f"current tasks out of step: {len(current ^ assigned_pairs)} worker/task pairs differ")
+
+        pending_count = WasteRequest.objects.filter(status='Pending').count()
+        if pending_count + assigned_count != submitted:
+            problems.append(f"{pending_count} pending + {assigned_count} assigned != {submitted} submitted")
+        return problems
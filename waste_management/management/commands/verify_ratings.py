@@ -0,0 +1,37 @@
+
+from django.core.management.base import BaseCommand
+
+from waste_management.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes every worker's rating totals from their Completed requests and reports "
+        "drift against the incrementally maintained counters. Use --fix to repair."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help="Overwrite drifted counters with the recomputed values.")
+
+    def handle(self, *args, **options):
+        totals = UserProfile.rated_requests_totals()
+        drifted = 0
+        workers = UserProfile.objects.filter(role='Worker').select_related('user').order_by('user__username')
+        for profile in workers:
+            total, count = totals.get(profile.user_id, (0, 0))
+            if (profile.rating_sum, profile.rating_count) == (total, count):
+                continue
+            drifted += 1
+            self.stdout.write(
+                f"{profile.user.username}: stored {profile.rating_sum}/{profile.rating_count}, "
+                f"recomputed {total}/{count} (sum drift {profile.rating_sum - total:+d}, count drift {profile.rating_count - count:+d})"
+            )
+            if options['fix']:
+                profile.update_average_rating()
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS(f"All {workers.count()} workers' rating totals match."))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f"Repaired {drifted} workers."))
+        else:
+            self.stdout.write(self.style.WARNING(f"{drifted} workers drifted; re-run with --fix to repair."))
@@ -0,0 +1,209 @@
+"""
+Uploaded images for production, behind the same permissions as the pages that show them.
+
+Every MEDIA_URL request goes through views.media_view: a file is served to staff, and to
+the requestee or assigned worker of a request that uses it as its request or completion
+image or as a rendition of one. Anyone else gets the same 404 as for a missing file, so
+names cannot be probed. Responses carry an ETag and Last-Modified for conditional requests
+and honour a single byte range. With CLEANIFY_MEDIA_OFFLOAD set, Python only checks the
+permission and hands the transfer to the front server (X-Accel-Redirect for nginx,
+X-Sendfile for Apache or lighttpd), which then answers ranges and conditionals itself.
+"""
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, SuspiciousFileOperation
+from django.db.models import Q
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .derivatives import IMAGE_FIELDS, derivative_name
+from .image_ops import RENDITIONS
+from .models import WasteRequest
+from .staticfiles import IMMUTABLE_MAX_AGE
+from .storage import is_content_addressed
+
+
+OFFLOAD_X_ACCEL_REDIRECT = 'x-accel-redirect'
+OFFLOAD_X_SENDFILE = 'x-sendfile'
+OFFLOAD_MODES = (OFFLOAD_X_ACCEL_REDIRECT, OFFLOAD_X_SENDFILE)
+RENDITION_PREFIX = 'derivatives/'
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_BYTE_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def media_path(name):
+    """ Absolute path of `name` under MEDIA_ROOT, or None if it is not a file there. """
+    try:
+        path = safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:
+        return None
+    return path if os.path.isfile(path) else None
+
+
+def _rendition_source_base(name):
+    """ 'derivatives/cas/ab/cd/<digest>_thumb.jpg' -> 'cas/ab/cd/<digest>'; None if not a rendition name. """
+    if not name.startswith(RENDITION_PREFIX):
+        return None
+    for rendition in RENDITIONS:
+        suffix = f"_{rendition}.jpg"
+        if name.endswith(suffix):
+            return name[len(RENDITION_PREFIX):-len(suffix)]
+    return None
+
+
+def _showing(name):
+    """ Q for the requests whose image, or an image it is a rendition of, is named `name`. """
+    condition = Q()
+    for field in IMAGE_FIELDS:
+        condition |= Q(**{field: name})
+    base = _rendition_source_base(name)
+    if base is not None:
+        # The uploads it can be a rendition of are '<base>.<ext>'. '/' sorts right after '.', so
+        # this range is that prefix, answered from the image column indexes (LIKE is not).
+        for field in IMAGE_FIELDS:
+            condition |= Q(**{f"{field}__gte": f"{base}.", f"{field}__lt": f"{base}/"})
+    return condition
+
+
+def can_view(user, name):
+    """ True if `user` may see media file `name`: staff, or a party to a request showing it. """
+    if not user.is_active:
+        return False
+    if user.is_staff or user.is_superuser:
+        return True
+    sources = (
+        WasteRequest.objects.filter(_showing(name))
+        .filter(Q(requestee=user) | Q(assigned_worker=user))
+        .values_list(*IMAGE_FIELDS)
+    )
+    for row in sources:
+        for source in filter(None, row):
+            if source == name or any(derivative_name(source, rendition) == name for rendition in RENDITIONS):
+                return True
+    return False
+
+
+def parse_byte_range(header, size):
+    """
+    The inclusive (first, last) byte positions asked for by a Range header on a `size`-byte
+    file. None means send the whole file: no header, a malformed one, or several ranges,
+    which servers may answer in full. Raises RangeNotSatisfiable if it starts past the end.
+    """
+    match = _BYTE_RANGE.match(header.strip()) if header else None
+    if match is None or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        suffix_length = int(last)
+        if suffix_length == 0 or size == 0:
+            raise RangeNotSatisfiable
+        return max(size - suffix_length, 0), size - 1
+    first = int(first)
+    last = int(last) if last else size - 1
+    if last < first and first < size:
+        return None
+    if first >= size:
+        raise RangeNotSatisfiable
+    return first, min(last, size - 1)
+
+
+def _read_range(path, first, length):
+    with open(path, 'rb') as f:
+        f.seek(first)
+        while length > 0:
+            chunk = f.read(min(STREAM_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _cache_control(name):
+    # Private: whether a copy may be reused depends on who asks. A content-addressed name
+    # never gets a different body, so the browser may keep it without revalidating.
+    if is_content_addressed(name):
+        return f'private, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return 'private, no-cache'
+
+
+def _content_type(name):
+    return mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+
+def _offloaded(name, path):
+    """ An empty response telling the front server which file to send. """
+    response = HttpResponse(content_type=_content_type(name))
+    mode = settings.CLEANIFY_MEDIA_OFFLOAD
+    if mode == OFFLOAD_X_ACCEL_REDIRECT:
+        response['X-Accel-Redirect'] = settings.CLEANIFY_MEDIA_ACCEL_PREFIX + quote(name)
+    elif mode == OFFLOAD_X_SENDFILE:
+        response['X-Sendfile'] = path
+    else:
+        raise ImproperlyConfigured(f"CLEANIFY_MEDIA_OFFLOAD must be None or one of {OFFLOAD_MODES}, not {mode!r}")
+    response['Cache-Control'] = _cache_control(name)
+    return response
+
+
+def serve_media(request, name, path):
+    """ The response for media file `name` at `path`, whose permission has been checked. """
+    if settings.CLEANIFY_MEDIA_OFFLOAD:
+        return _offloaded(name, path)
+
+    stat = os.stat(path)
+    size, mtime = stat.st_size, int(stat.st_mtime)
+    etag = f'"{size:x}-{stat.st_mtime_ns:x}"'
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(mtime),
+        'Cache-Control': _cache_control(name),
+        'Accept-Ranges': 'bytes',
+    }
+    response = get_conditional_response(request, etag=etag, last_modified=mtime)
+    if response is not None:
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    content_type = _content_type(name)
+    if_range = request.META.get('HTTP_IF_RANGE')
+    byte_range = None
+    if if_range is None or if_range.strip() in (etag, headers['Last-Modified']):
+        try:
+            byte_range = parse_byte_range(request.META.get('HTTP_RANGE'), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416, content_type=content_type)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        status, length = 200, size
+    else:
+        first, last = byte_range
+        status, length = 206, last - first + 1
+
+    if request.method == 'HEAD':
+        response = HttpResponse(status=status, content_type=content_type)
+    elif byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+        # FileResponse would offer it as a download named after the storage file.
+        del response['Content-Disposition']
+    else:
+        response = StreamingHttpResponse(_read_range(path, first, length), status=status, content_type=content_type)
+    if byte_range is not None:
+        response['Content-Range'] = f'bytes {first}-{last}/{size}'
+    response['Content-Length'] = str(length)
+    for header, value in headers.items():
+        response[header] = value
+    return response
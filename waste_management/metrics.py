@@ -0,0 +1,248 @@
+
+import json
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# name: (type, help, buckets)
+METRICS = {
+    'cleanify_http_requests_total': ('counter', 'HTTP requests by view, method and status.', None),
+    'cleanify_http_request_duration_seconds': ('histogram', 'Wall time spent handling a request.', LATENCY_BUCKETS),
+    'cleanify_db_queries_per_request': ('histogram', 'SQL queries executed per request.', QUERY_COUNT_BUCKETS),
+    'cleanify_db_duration_seconds': ('histogram', 'Time spent in SQL per request.', LATENCY_BUCKETS),
+    'cleanify_fragment_cache_total': ('counter', 'Dashboard fragment cache lookups by fragment and result (hit/miss).', None),
+}
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms for this process.
+
+    With CLEANIFY_METRICS_DIR set, every process periodically writes a snapshot to
+    its own file there and render() merges all files, so /metrics shows the same
+    totals whichever worker process answers the scrape. The file of a process that
+    has exited is absorbed by the next process to render: its totals are added to
+    that process's own, so they stay in the cumulative totals, and the file is
+    deleted, so the directory holds one file per live process. The PID check needs
+    every process sharing the directory to run on the same host (and PID namespace).
+    """
+
+    def __init__(self, directory=None, flush_interval=1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._last_flush = 0.0
+        self._filename = f"{os.getpid()}-{uuid.uuid4().hex[:8]}.json"
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(buckets), 0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[0][i] += 1
+                    break
+            histogram[1] += value
+            histogram[2] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': [[name, dict(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [
+                    [name, dict(labels), list(buckets), total, count]
+                    for (name, labels), (buckets, total, count) in self._histograms.items()
+                ],
+            }
+
+    def maybe_flush(self):
+        if self.directory and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """ Atomically replaces this process's snapshot file. """
+        if not self.directory:
+            return
+        self._last_flush = time.monotonic()
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, self._filename)
+        temporary_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temporary_path, 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(temporary_path, path)
+        except OSError as e:
+            logger.error(f"Could not write metrics snapshot {path}: {e}")
+
+    def _absorb(self, snapshot):
+        with self._lock:
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(sorted(labels.items())))
+                self._counters[key] = self._counters.get(key, 0) + value
+            for name, labels, buckets, total, count in snapshot['histograms']:
+                key = (name, tuple(sorted(labels.items())))
+                histogram = self._histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+                histogram[0] = [a + b for a, b in zip(histogram[0], buckets)]
+                histogram[1] += total
+                histogram[2] += count
+
+    def _absorb_exited(self, filenames):
+        """
+        Adds the snapshots of exited processes to this one's and deletes them. Renaming
+        a file first claims it, so two processes rendering at once cannot both add it.
+        """
+        absorbed = []
+        for filename in filenames:
+            if not _exited(filename) or filename == self._filename:
+                continue
+            path = os.path.join(self.directory, filename)
+            claimed_path = f"{path}.{os.getpid()}.absorbing"
+            try:
+                os.rename(path, claimed_path)
+            except OSError:
+                continue  # Another process claimed it first.
+            try:
+                with open(claimed_path) as f:
+                    self._absorb(json.load(f))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Dropping unreadable metrics snapshot {filename} of an exited process: {e}")
+            absorbed.append(claimed_path)
+        if absorbed:
+            self.flush()
+            for claimed_path in absorbed:
+                os.remove(claimed_path)
+            logger.info(f"Absorbed {len(absorbed)} metrics snapshot(s) of exited processes.")
+
+    def _snapshots(self):
+        if not self.directory:
+            return [self.snapshot()]
+        self.flush()
+        self._absorb_exited(os.listdir(self.directory))
+        snapshots = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable metrics snapshot {filename}: {e}")
+        return snapshots
+
+    def collect(self):
+        """ Merged {(name, labels): value} counters and {(name, labels): [buckets, sum, count]} histograms. """
+        counters, histograms = {}, {}
+        for snapshot in self._snapshots():
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(sorted(labels.items())))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, buckets, total, count in snapshot['histograms']:
+                key = (name, tuple(sorted(labels.items())))
+                merged = histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+                merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+                merged[1] += total
+                merged[2] += count
+        return counters, histograms
+
+    def render(self):
+        """ All metrics in the Prometheus text exposition format (version 0.0.4). """
+        counters, histograms = self.collect()
+        lines = []
+        for name, (kind, help_text, bounds) in METRICS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == 'counter':
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                continue
+            for (metric, labels), (buckets, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket in zip(bounds, buckets):
+                    cumulative += bucket
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', _number(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+                lines.append(f"{name}_count{_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _exited(filename):
+    """ Whether the process that wrote snapshot `filename` ("<pid>-<id>.json") has exited. """
+    pid = filename.split('-', 1)[0]
+    if os.name != 'posix' or not filename.endswith('.json') or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass  # Alive, but owned by another user.
+    return False
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """ Returns this process's MetricsRegistry, configured from settings. """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = MetricsRegistry(
+                    directory=getattr(settings, 'CLEANIFY_METRICS_DIR', None),
+                    flush_interval=getattr(settings, 'CLEANIFY_METRICS_FLUSH_INTERVAL', 1.0),
+                )
+    return _registry
+
+
+def record_request(view, method, status, duration, queries, sql_duration):
+    registry = get_registry()
+    registry.inc('cleanify_http_requests_total', {'view': view, 'method': method, 'status': str(status)})
+    registry.observe('cleanify_http_request_duration_seconds', {'view': view}, duration)
+    registry.observe('cleanify_db_queries_per_request', {'view': view}, queries)
+    registry.observe('cleanify_db_duration_seconds', {'view': view}, sql_duration)
+    registry.maybe_flush()
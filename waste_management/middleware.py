@@ -0,0 +1,132 @@
+
+import os
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .metrics import record_request
+from .staticfiles import StaticFileIndex, serve
+
+
+class QueryTimer:
+    """ Counts SQL statements and sums their time for one request. """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+# The timer of the request being handled. A ContextVar rather than a per-connection
+# wrapper because async views run their queries on asgiref's sync thread, which
+# inherits the request's context but not its connection objects.
+_current_timer = ContextVar('cleanify_query_timer', default=None)
+
+
+def _timed_execute(execute, sql, params, many, context):
+    timer = _current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timer.duration += time.perf_counter() - started
+        timer.count += 1
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    if _timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_timed_execute)
+
+
+class RequestMetricsMiddleware:
+    """
+    Times every request and its SQL, adds a Server-Timing header and feeds the
+    per-view histograms published on /metrics. Put it first in MIDDLEWARE so the
+    session/auth queries of the other middleware are counted too. Works under
+    both WSGI and ASGI without forcing async views onto a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Connections opened before this module was imported missed connection_created.
+        for connection in connections.all(initialized_only=True):
+            install_query_timer(sender=None, connection=connection)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timer = QueryTimer()
+        token = _current_timer.set(timer)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+        return self._finish(request, response, timer, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        timer = QueryTimer()
+        token = _current_timer.set(timer)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+        return self._finish(request, response, timer, time.perf_counter() - started)
+
+    def _finish(self, request, response, timer, duration):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None and match.view_name else 'unresolved'
+        response['Server-Timing'] = (
+            f'app;dur={duration * 1000:.1f}, db;dur={timer.duration * 1000:.1f};desc="{timer.count} queries"'
+        )
+        record_request(view, request.method, response.status_code, duration, timer.count, timer.duration)
+        return response
+
+
+class StaticFilesMiddleware:
+    """
+    Serves collected static files from STATIC_ROOT in-process (see staticfiles.py), so a
+    deployment needs no separate file server. Put it first in MIDDLEWARE: a static hit
+    then skips sessions, auth and the metrics. Off unless CLEANIFY_SERVE_STATIC is set
+    and collectstatic has run; the index is read at startup, so restart after collecting.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.CLEANIFY_SERVE_STATIC or not settings.STATIC_ROOT or not os.path.isdir(settings.STATIC_ROOT):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.index = StaticFileIndex(settings.STATIC_ROOT, settings.STATIC_URL)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        static_file = self.index.match(request)
+        if static_file is not None:
+            return serve(request, static_file)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        static_file = self.index.match(request)
+        if static_file is not None:
+            return serve(request, static_file)
+        return await self.get_response(request)
+
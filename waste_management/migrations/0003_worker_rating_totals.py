@@ -0,0 +1,50 @@
+# Generated by Django 5.2 on 2026-10-18 15:35
+
+from django.db import migrations, models
+
+
+def backfill_rating_totals(apps, schema_editor):
+    UserProfile = apps.get_model('waste_management', 'UserProfile')
+    WasteRequest = apps.get_model('waste_management', 'WasteRequest')
+    ratings = {}
+    rated = WasteRequest.objects.filter(
+        status='Completed', assigned_worker__isnull=False, worker_rating__isnull=False
+    ).order_by('approved_at', 'id').values_list('assigned_worker_id', 'worker_rating')
+    for worker_id, rating in rated.iterator():
+        ratings.setdefault(worker_id, []).append(rating)
+    for profile in UserProfile.objects.filter(role='Worker'):
+        worker_ratings = ratings.get(profile.user_id, [])
+        recent = None
+        for rating in worker_ratings:
+            recent = rating if recent is None else recent * 0.8 + rating * 0.2
+        profile.rating_sum = sum(worker_ratings)
+        profile.rating_count = len(worker_ratings)
+        profile.average_rating = round(profile.rating_sum / profile.rating_count, 2) if worker_ratings else None
+        profile.recent_rating = recent
+        profile.save(update_fields=['rating_sum', 'rating_count', 'average_rating', 'recent_rating'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('waste_management', '0002_alter_wasterequest_assigned_worker_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='recent_rating',
+            field=models.FloatField(blank=True, default=None, null=True),
+        ),
+        migrations.RunPython(backfill_rating_totals, migrations.RunPython.noop),
+    ]
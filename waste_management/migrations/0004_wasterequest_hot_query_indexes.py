@@ -0,0 +1,54 @@
+# Generated by Django 5.2 on 2026-10-18 15:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('waste_management', '0003_worker_rating_totals'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='wasterequest',
+            name='assigned_worker',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='assigned_tasks', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='wasterequest',
+            name='requestee',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='created_requests', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='wasterequest',
+            index=models.Index(condition=models.Q(('status', 'Pending')), fields=['category', 'created_at'], name='wr_pending_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wasterequest',
+            index=models.Index(fields=['status', 'created_at'], name='wr_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wasterequest',
+            index=models.Index(condition=models.Q(('status', 'Assigned')), fields=['assigned_at'], name='wr_assigned_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wasterequest',
+            index=models.Index(condition=models.Q(('status', 'Pending Approval')), fields=['updated_at'], name='wr_approval_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wasterequest',
+            index=models.Index(fields=['status', 'approved_at'], name='wr_status_approved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wasterequest',
+            index=models.Index(fields=['assigned_worker', 'status', 'approved_at'], name='wr_worker_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wasterequest',
+            index=models.Index(fields=['requestee', 'updated_at'], name='wr_requestee_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2 on 2026-10-18 15:37
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_status_counts(apps, schema_editor):
+    WasteRequest = apps.get_model('waste_management', 'WasteRequest')
+    RequestStatusCount = apps.get_model('waste_management', 'RequestStatusCount')
+    counts = {
+        (row['status'], row['category']): row['n']
+        for row in WasteRequest.objects.values('status', 'category').annotate(n=Count('id')).order_by()
+    }
+    statuses = ['Pending', 'Assigned', 'Pending Approval', 'Completed']
+    categories = ['Garbage Collection', 'Water Leakage', 'Washroom Cleaning', 'Electricity Issue']
+    for status in statuses:
+        for category in categories:
+            counts.setdefault((status, category), 0)
+    # One row per combination up front, so transitions only ever need an UPDATE.
+    RequestStatusCount.objects.bulk_create([
+        RequestStatusCount(status=status, category=category, count=n) for (status, category), n in counts.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('waste_management', '0004_wasterequest_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestStatusCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Assigned', 'Assigned'), ('Pending Approval', 'Pending Approval'), ('Completed', 'Completed')], max_length=20)),
+                ('category', models.CharField(choices=[('Garbage Collection', 'Garbage Collection'), ('Water Leakage', 'Water Leakage'), ('Washroom Cleaning', 'Washroom Cleaning'), ('Electricity Issue', 'Electricity Issue')], max_length=50)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('status', 'category'), name='unique_status_category_count')],
+            },
+        ),
+        migrations.RunPython(populate_status_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-18 15:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('waste_management', '0005_request_status_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wasterequest',
+            name='completion_image_medium',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='derivatives/'),
+        ),
+        migrations.AddField(
+            model_name='wasterequest',
+            name='completion_image_thumb',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='derivatives/'),
+        ),
+        migrations.AddField(
+            model_name='wasterequest',
+            name='request_image_medium',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='derivatives/'),
+        ),
+        migrations.AddField(
+            model_name='wasterequest',
+            name='request_image_thumb',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='derivatives/'),
+        ),
+    ]
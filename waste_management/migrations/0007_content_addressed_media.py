@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-18 15:43
+
+import waste_management.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('waste_management', '0006_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='wasterequest',
+            name='completion_image',
+            field=models.ImageField(blank=True, null=True, storage=waste_management.storage.media_storage, upload_to='completion_images/'),
+        ),
+        migrations.AlterField(
+            model_name='wasterequest',
+            name='request_image',
+            field=models.ImageField(storage=waste_management.storage.media_storage, upload_to='request_images/'),
+        ),
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('released_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('refcount', 0)), fields=['released_at'], name='blob_unreferenced_idx')],
+            },
+        ),
+    ]
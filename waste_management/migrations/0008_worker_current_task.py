@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-18 15:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_current_task(apps, schema_editor):
+    UserProfile = apps.get_model('waste_management', 'UserProfile')
+    WasteRequest = apps.get_model('waste_management', 'WasteRequest')
+    current = {}
+    assigned = WasteRequest.objects.filter(
+        status='Assigned', assigned_worker__isnull=False
+    ).order_by('assigned_at', 'id').values_list('assigned_worker_id', 'id')
+    for worker_id, request_id in assigned.iterator():
+        current.setdefault(worker_id, request_id)
+    for profile in UserProfile.objects.filter(role='Worker', user_id__in=list(current)):
+        profile.current_task_id = current[profile.user_id]
+        profile.save(update_fields=['current_task'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('waste_management', '0007_content_addressed_media'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='current_task',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='waste_management.wasterequest'),
+        ),
+        migrations.RunPython(backfill_current_task, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='userprofile',
+            name='is_busy',
+        ),
+    ]
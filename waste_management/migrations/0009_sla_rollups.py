@@ -0,0 +1,55 @@
+# Generated by Django 5.2 on 2026-10-18 16:10
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def populate_sla_rollups(apps, schema_editor):
+    WasteRequest = apps.get_model('waste_management', 'WasteRequest')
+    SlaRollup = apps.get_model('waste_management', 'SlaRollup')
+    rollups = {}
+
+    def add(moment, category, **deltas):
+        values = rollups.setdefault((timezone.localdate(moment), category), {})
+        for field, delta in deltas.items():
+            values[field] = values.get(field, 0) + delta
+
+    # Same rules as SlaRollup.recompute(); rejections before this migration were never recorded.
+    rows = WasteRequest.objects.values_list('category', 'status', 'created_at', 'assigned_at', 'approved_at')
+    for category, status, created_at, assigned_at, approved_at in rows.iterator(chunk_size=2000):
+        add(created_at, category, created=1)
+        if assigned_at:
+            add(assigned_at, category, assigned=1, assign_seconds=(assigned_at - created_at).total_seconds())
+        if approved_at and status == 'Completed':
+            add(approved_at, category, approved=1, complete_seconds=(approved_at - created_at).total_seconds())
+    SlaRollup.objects.bulk_create([
+        SlaRollup(day=day, category=category, **values) for (day, category), values in rollups.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('waste_management', '0008_worker_current_task'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlaRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('category', models.CharField(choices=[('Garbage Collection', 'Garbage Collection'), ('Water Leakage', 'Water Leakage'), ('Washroom Cleaning', 'Washroom Cleaning'), ('Electricity Issue', 'Electricity Issue')], max_length=50)),
+                ('created', models.IntegerField(default=0)),
+                ('assigned', models.IntegerField(default=0)),
+                ('assign_seconds', models.FloatField(default=0)),
+                ('approved', models.IntegerField(default=0)),
+                ('complete_seconds', models.FloatField(default=0)),
+                ('rejected', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'category'), name='unique_sla_day_category')],
+            },
+        ),
+        migrations.RunPython(populate_sla_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2 on 2026-10-18 16:23
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+# Normal priority's head start when this migration was written (CLEANIFY_PRIORITY_HEAD_START_HOURS[2]).
+# Frozen so the backfill does not depend on the settings of whichever deployment runs it.
+NORMAL_HEAD_START = timedelta(hours=2)
+
+
+def backfill_queue_at(apps, schema_editor):
+    # Existing requests are all Normal priority, so they keep their order relative to each other.
+    WasteRequest = apps.get_model('waste_management', 'WasteRequest')
+    WasteRequest.objects.update(queue_at=F('created_at') - NORMAL_HEAD_START)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('waste_management', '0009_sla_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='wasterequest',
+            name='wr_pending_queue_idx',
+        ),
+        migrations.AddField(
+            model_name='wasterequest',
+            name='priority',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Low'), (2, 'Normal'), (3, 'High'), (4, 'Urgent')], default=2),
+        ),
+        migrations.AddField(
+            model_name='wasterequest',
+            name='queue_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_queue_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='wasterequest',
+            name='queue_at',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='wasterequest',
+            index=models.Index(condition=models.Q(('status', 'Pending')), fields=['category', 'queue_at'], name='wr_pending_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wasterequest',
+            index=models.Index(condition=models.Q(('status', 'Pending')), fields=['queue_at'], name='wr_pending_order_idx'),
+        ),
+    ]
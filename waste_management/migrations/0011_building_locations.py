@@ -0,0 +1,47 @@
+# Generated by Django 5.2 on 2026-10-18 16:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('waste_management', '0010_request_priority'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Building',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('zone', models.CharField(blank=True, max_length=50)),
+                ('x', models.FloatField(help_text='Metres east of the campus origin.')),
+                ('y', models.FloatField(help_text='Metres north of the campus origin.')),
+            ],
+            options={
+                'ordering': ('zone', 'name'),
+            },
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='location_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='location_x',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='location_y',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='wasterequest',
+            name='building',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='requests', to='waste_management.building'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2 on 2026-10-18 17:05
+
+from django.db import migrations
+
+
+# FTS5 table and triggers over WasteRequest.location/description, as search.py defined them
+# when this migration was written. Frozen here so later edits to search.py cannot change it.
+CREATE_SEARCH_INDEX = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS waste_request_fts USING fts5("
+    "location, description, content='waste_management_wasterequest', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS waste_request_fts_ai AFTER INSERT ON waste_management_wasterequest BEGIN "
+    "INSERT INTO waste_request_fts(rowid, location, description) VALUES (new.id, new.location, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS waste_request_fts_ad AFTER DELETE ON waste_management_wasterequest BEGIN "
+    "INSERT INTO waste_request_fts(waste_request_fts, rowid, location, description) "
+    "VALUES ('delete', old.id, old.location, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS waste_request_fts_au AFTER UPDATE OF location, description ON waste_management_wasterequest BEGIN "
+    "INSERT INTO waste_request_fts(waste_request_fts, rowid, location, description) "
+    "VALUES ('delete', old.id, old.location, old.description); "
+    "INSERT INTO waste_request_fts(rowid, location, description) VALUES (new.id, new.location, new.description); END",
+    "INSERT INTO waste_request_fts(waste_request_fts, rank) VALUES ('rank', 'bm25(2.0, 1.0)')",
+    "INSERT INTO waste_request_fts(waste_request_fts) VALUES ('rebuild')",
+]
+
+DROP_SEARCH_INDEX = [
+    "DROP TRIGGER IF EXISTS waste_request_fts_ai",
+    "DROP TRIGGER IF EXISTS waste_request_fts_ad",
+    "DROP TRIGGER IF EXISTS waste_request_fts_au",
+    "DROP TABLE IF EXISTS waste_request_fts",
+]
+
+
+class SQLiteRunSQL(migrations.RunSQL):
+    """ RunSQL that only runs on SQLite; other databases search with icontains. """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'sqlite':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'sqlite':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('waste_management', '0011_building_locations'),
+    ]
+
+    operations = [
+        SQLiteRunSQL(CREATE_SEARCH_INDEX, DROP_SEARCH_INDEX),
+    ]
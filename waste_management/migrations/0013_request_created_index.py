@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 17:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('waste_management', '0012_request_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='wasterequest',
+            index=models.Index(fields=['created_at'], name='wr_created_idx'),
+        ),
+    ]
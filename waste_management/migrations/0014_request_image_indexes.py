@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 17:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('waste_management', '0013_request_created_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='wasterequest',
+            index=models.Index(fields=['request_image'], name='wr_request_image_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wasterequest',
+            index=models.Index(fields=['completion_image'], name='wr_completion_image_idx'),
+        ),
+    ]
@@ -1,9 +1,18 @@
 
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db.models import Avg
+from django.utils import timezone
+from django.db.models import Count, DurationField, ExpressionWrapper, F, FloatField, Sum, Value
+from django.db.models.expressions import Col
+from django.db.models.functions import Cast, Coalesce, Round, TruncDate
+from django.db.models.sql.where import AND
+from datetime import datetime, time, timedelta
 import logging
 
+from .storage import media_storage
+from .transitions import Transition, notify_transitions
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,6 +36,23 @@ STATUS_CHOICES = (
     ('Completed', 'Completed'),
 )
 
+PRIORITY_CHOICES = (
+    (1, 'Low'),
+    (2, 'Normal'),
+    (3, 'High'),
+    (4, 'Urgent'),
+)
+DEFAULT_PRIORITY = 2
+
+
+def queue_head_start(priority):
+    """ How much earlier than its arrival a request of this priority joins the Pending queue. """
+    return timedelta(hours=settings.CLEANIFY_PRIORITY_HEAD_START_HOURS.get(priority, 0))
+
+
+# Weight of the newest rating in the exponentially-decayed recent_rating score.
+RECENT_RATING_WEIGHT = 0.2
+
 RATING_CHOICES = (
     (1, '1 - Poor'),
     (2, '2 - Fair'),
@@ -36,107 +62,590 @@ RATING_CHOICES = (
 )
 
 
+class Building(models.Model):
+    """ A campus building or zone. Coordinates are planar metres from a fixed campus origin. """
+    name = models.CharField(max_length=100, unique=True)
+    zone = models.CharField(max_length=50, blank=True)
+    x = models.FloatField(help_text="Metres east of the campus origin.")
+    y = models.FloatField(help_text="Metres north of the campus origin.")
+
+    class Meta:
+        ordering = ('zone', 'name')
+
+    def __str__(self):
+        return f"{self.name} ({self.zone})" if self.zone else self.name
+
+
 class UserProfile(models.Model):
     """ Extends User: Role, Worker Category, Avg Rating, Busy Status """
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, blank=False, null=False)
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES, null=True, blank=True)
     average_rating = models.FloatField(null=True, blank=True, default=None)
-    is_busy = models.BooleanField(default=False)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    recent_rating = models.FloatField(null=True, blank=True, default=None)
+    # The worker's Assigned request. Set and cleared in the same transaction as the request's
+    # status changes (assignment.py, dispatcher.py, complete_task_view); busy means it is set.
+    current_task = models.ForeignKey('WasteRequest', on_delete=models.SET_NULL, related_name='+', null=True, blank=True)
+    # Worker's last known position (Building coordinates), updated when they complete a task.
+    location_x = models.FloatField(null=True, blank=True)
+    location_y = models.FloatField(null=True, blank=True)
+    location_updated_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"{self.user.username} ({self.role})"
 
+    @property
+    def is_busy(self):
+        return self.current_task_id is not None
+
+    @property
+    def location(self):
+        """ (x, y) in campus metres, or None if unknown. """
+        if self.location_x is None or self.location_y is None:
+            return None
+        return (self.location_x, self.location_y)
+
+    def move_to(self, building):
+        """ Sets the last known location to the building's; returns the fields to save. """
+        self.location_x, self.location_y = building.x, building.y
+        self.location_updated_at = timezone.now()
+        return ['location_x', 'location_y', 'location_updated_at']
+
     def save(self, *args, **kwargs):
         if self.role != 'Worker':
             self.category = None
             self.average_rating = None
-            self.is_busy = False
+            self.rating_sum = 0
+            self.rating_count = 0
+            self.recent_rating = None
+            self.current_task = None
+            self.location_x = self.location_y = self.location_updated_at = None
         elif self.role == 'Worker' and not self.category:
             logger.warning(f"Worker profile saved without category for user: {self.user.username}")
         super().save(*args, **kwargs)
 
+    def record_rating(self, rating):
+        """
+        Adds one approved rating to the running totals in a single UPDATE.
+        F-expressions read the current row values, so concurrent ratings never overwrite each other.
+        """
+        if self.role != 'Worker':
+            logger.warning(f"Attempted to record rating for non-worker: {self.user.username}")
+            return
+        rating = int(rating)
+        UserProfile.objects.filter(pk=self.pk).update(
+            rating_sum=F('rating_sum') + rating,
+            rating_count=F('rating_count') + 1,
+            average_rating=Round(
+                Cast(F('rating_sum') + rating, FloatField()) / (F('rating_count') + 1), 2
+            ),
+            recent_rating=Coalesce(
+                F('recent_rating') * (1 - RECENT_RATING_WEIGHT) + rating * RECENT_RATING_WEIGHT,
+                Value(float(rating)),
+            ),
+        )
+        self.refresh_from_db(fields=['rating_sum', 'rating_count', 'average_rating', 'recent_rating'])
+        logger.info(f"Recorded rating {rating} for worker {self.user.username}; average now {self.average_rating}")
+
+    @staticmethod
+    def rated_requests_totals():
+        """ Per-worker {user_id: (sum, count)} of ratings on Completed requests, computed from scratch. """
+        rows = WasteRequest.objects.filter(
+            status='Completed',
+            assigned_worker__isnull=False,
+            worker_rating__isnull=False
+        ).values('assigned_worker').annotate(total=Sum('worker_rating'), count=Count('id'))
+        return {row['assigned_worker']: (row['total'], row['count']) for row in rows}
+
     def update_average_rating(self):
-        """ Calculates and updates the worker's average rating based on ALL submitted ratings. """
+        """
+        Recomputes the rating totals from scratch from the worker's Completed requests.
+        This is the slow verification/repair path; normal ratings go through record_rating().
+        Returns the drift as (sum_delta, count_delta) between the stored and recomputed totals.
+        """
         if self.role != 'Worker':
             logger.warning(f"Attempted to update rating for non-worker: {self.user.username}")
-            return 
-            return 
+            return (0, 0)
 
         try:
-            
-            requests_rated = WasteRequest.objects.filter(
+            ratings = WasteRequest.objects.filter(
                 assigned_worker=self.user,
+                status='Completed',
                 worker_rating__isnull=False
-            )
-            count = requests_rated.count()
-            logger.debug(f"Found {count} rated requests for worker {self.user.username}")
-
-            if count > 0:
-                aggregation_result = requests_rated.aggregate(Avg('worker_rating'))
-                avg_rating_value = aggregation_result.get('worker_rating__avg')
-                logger.debug(f"Calculated avg rating value for {self.user.username}: {avg_rating_value}")
-
-                if avg_rating_value is not None:
-                    self.average_rating = round(avg_rating_value, 2)
-                else:
-                    logger.warning(f"Avg calculation returned None despite {count} rated requests for {self.user.username}.")
-                    self.average_rating = None
-            else:
-                self.average_rating = None
-                logger.debug(f"No rated requests found for {self.user.username}, setting average rating to None.")
-
-            self.save(update_fields=['average_rating'])
+            ).order_by('approved_at', 'id').values_list('worker_rating', flat=True)
+            ratings = list(ratings)
+            total, count = sum(ratings), len(ratings)
+            drift = (self.rating_sum - total, self.rating_count - count)
+            if drift != (0, 0):
+                logger.warning(f"Rating drift for worker {self.user.username}: stored {self.rating_sum}/{self.rating_count}, recomputed {total}/{count}")
+
+            recent = None
+            for rating in ratings:
+                recent = rating if recent is None else recent * (1 - RECENT_RATING_WEIGHT) + rating * RECENT_RATING_WEIGHT
+
+            self.rating_sum = total
+            self.rating_count = count
+            self.average_rating = round(total / count, 2) if count else None
+            self.recent_rating = recent
+            self.save(update_fields=['rating_sum', 'rating_count', 'average_rating', 'recent_rating'])
             logger.info(f"Successfully updated average rating for worker {self.user.username} to {self.average_rating}")
+            return drift
 
         except Exception as e:
             logger.error(f"CRITICAL error updating average rating for worker {self.user.username}: {e}", exc_info=True)
+            return (0, 0)
 
 
     def update_busy_status(self):
-        """ Checks if the worker has any 'Assigned' tasks and updates is_busy flag. """
-        if self.role != 'Worker':
-            # if self.is_busy: 
-            if self.is_busy: 
-                 self.is_busy = False
-                 self.save(update_fields=['is_busy'])
-            return
-
-        try:
-            is_currently_assigned = WasteRequest.objects.filter(
-                assigned_worker=self.user,
+        """
+        Repair path: re-derives current_task from the worker's Assigned request.
+        Only needed after hand edits; the normal transitions keep it in step.
+        """
+        task_id = None
+        if self.role == 'Worker':
+            task_id = WasteRequest.objects.filter(
+                assigned_worker_id=self.user_id,
                 status='Assigned'
-            ).exists()
-
-            if self.is_busy != is_currently_assigned:
-                self.is_busy = is_currently_assigned
-                self.save(update_fields=['is_busy'])
-                logger.debug(f"Updated busy status for worker {self.user.username} to {self.is_busy}")
-            else:
-                 logger.debug(f"Busy status for worker {self.user.username} unchanged ({self.is_busy}).")
-        except Exception as e:
-             logger.error(f"Error updating busy status for worker {self.user.username}: {e}", exc_info=True)
+            ).order_by('assigned_at', 'id').values_list('id', flat=True).first()
+        if self.current_task_id != task_id:
+            logger.warning(f"Repaired current task of {self.user.username}: {self.current_task_id} -> {task_id}")
+            self.current_task_id = task_id
+            self.save(update_fields=['current_task'])
 
 
 class WasteRequest(models.Model):
     """ Represents a waste management or service request. """
-    requestee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_requests')
+    # The FK indexes are covered by the composite indexes in Meta, which lead with these columns.
+    requestee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_requests', db_index=False)
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES, blank=False, null=False)
     location = models.CharField(max_length=255, blank=False, null=False)
     description = models.TextField(blank=True, null=True)
-    request_image = models.ImageField(upload_to='request_images/', blank=False, null=False)
-    completion_image = models.ImageField(upload_to='completion_images/', null=True, blank=True)
+    # Structured location used to match the nearest worker; `location` stays the free-text detail.
+    building = models.ForeignKey(Building, on_delete=models.SET_NULL, related_name='requests', null=True, blank=True)
+    # Uploads are stored by content hash (storage.py); upload_to only contributes the file extension.
+    request_image = models.ImageField(upload_to='request_images/', storage=media_storage, blank=False, null=False)
+    completion_image = models.ImageField(upload_to='completion_images/', storage=media_storage, null=True, blank=True)
+    # Renditions written by the derivative pipeline (derivatives.py); empty until they are ready.
+    request_image_thumb = models.ImageField(upload_to='derivatives/', null=True, blank=True, editable=False)
+    request_image_medium = models.ImageField(upload_to='derivatives/', null=True, blank=True, editable=False)
+    completion_image_thumb = models.ImageField(upload_to='derivatives/', null=True, blank=True, editable=False)
+    completion_image_medium = models.ImageField(upload_to='derivatives/', null=True, blank=True, editable=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    assigned_worker = models.ForeignKey(User, on_delete=models.SET_NULL, related_name='assigned_tasks', null=True, blank=True)
+    assigned_worker = models.ForeignKey(User, on_delete=models.SET_NULL, related_name='assigned_tasks', null=True, blank=True, db_index=False)
     assigned_at = models.DateTimeField(null=True, blank=True)
     is_approved_by_student = models.BooleanField(default=False) 
     worker_rating = models.IntegerField(choices=RATING_CHOICES, null=True, blank=True)
     approved_at = models.DateTimeField(null=True, blank=True)
+    priority = models.PositiveSmallIntegerField(choices=PRIORITY_CHOICES, default=DEFAULT_PRIORITY)
+    # Place in the Pending queue, lowest first: the arrival time moved earlier by the priority's head start
+    # (and again by CLEANIFY_REJECTION_HEAD_START_HOURS for each rejection). Aging is implicit: a request is
+    # only ever overtaken by requests that arrived less than the difference in head starts after it.
+    queue_at = models.DateTimeField(editable=False)
+
+    class Meta:
+        indexes = [
+            # Pending queue per category in queue order (assignment engine), and across categories (dispatcher).
+            models.Index(fields=['category', 'queue_at'], name='wr_pending_queue_idx', condition=models.Q(status='Pending')),
+            models.Index(fields=['queue_at'], name='wr_pending_order_idx', condition=models.Q(status='Pending')),
+            # Admin dashboard: counts per status and the recent lists of each status.
+            models.Index(fields=['status', 'created_at'], name='wr_status_created_idx'),
+            models.Index(fields=['assigned_at'], name='wr_assigned_recent_idx', condition=models.Q(status='Assigned')),
+            models.Index(fields=['updated_at'], name='wr_approval_recent_idx', condition=models.Q(status='Pending Approval')),
+            models.Index(fields=['status', 'approved_at'], name='wr_status_approved_idx'),
+            # Worker dashboard: current task and completed history.
+            models.Index(fields=['assigned_worker', 'status', 'approved_at'], name='wr_worker_status_idx'),
+            # Requestee dashboard: own requests, most recently updated first.
+            models.Index(fields=['requestee', 'updated_at'], name='wr_requestee_updated_idx'),
+            # Admin changelist: default newest-first ordering and the created_at date hierarchy.
+            models.Index(fields=['created_at'], name='wr_created_idx'),
+            # Media view: the requests an image file belongs to, for the permission check.
+            models.Index(fields=['request_image'], name='wr_request_image_idx'),
+            models.Index(fields=['completion_image'], name='wr_completion_image_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._tracked_state = (instance.__dict__.get('status'), instance.__dict__.get('category'))
+        instance._loaded_priority = instance.__dict__.get('priority')
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._tracked_state = (self.__dict__.get('status'), self.__dict__.get('category'))
+        self._loaded_priority = self.__dict__.get('priority')
+
+    def save(self, *args, **kwargs):
+        """ Saves and, in the same transaction, announces any status/category change via request_status_changed. """
+        update_fields = kwargs.get('update_fields')
+        tracks_state = update_fields is None or {'status', 'category'}.intersection(update_fields)
+        if self._state.adding:
+            if self.queue_at is None:
+                self.queue_at = timezone.now() - queue_head_start(self.priority)
+        elif (update_fields is None or 'priority' in update_fields) and self._requeue_for_priority():
+            if update_fields is not None:
+                kwargs['update_fields'] = update_fields = [*update_fields, 'queue_at']
+        if self._state.adding:
+            previous = (None, None)
+        else:
+            previous = getattr(self, '_tracked_state', (None, None))
+            if tracks_state and None in previous:
+                previous = WasteRequest.objects.filter(pk=self.pk).values_list('status', 'category').first() or (None, None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            current = (self.status, self.category)
+            if tracks_state and previous != current:
+                notify_transitions(WasteRequest, [self.transition(previous[0], self.status, old_category=previous[1])])
+        if tracks_state:
+            self._tracked_state = current
+        self._loaded_priority = self.priority
+
+    def claim(self, expected_status):
+        """
+        Moves the row from `expected_status` to self.status with one conditional UPDATE and returns
+        whether it did: of two writers that loaded the same state only the first gets it. Call it in
+        the transaction of the save() that follows, which then announces the transition from the
+        state the row was claimed in, not from the one loaded earlier.
+        """
+        if not WasteRequest.objects.filter(pk=self.pk, status=expected_status).update(status=self.status):
+            return False
+        category = getattr(self, '_tracked_state', (None, None))[1]
+        if category is None:
+            category = WasteRequest.objects.filter(pk=self.pk).values_list('category', flat=True).first()
+        self._tracked_state = (expected_status, category)
+        return True
+
+    def _requeue_for_priority(self):
+        """ Moves the request in the queue by the change in head start since its priority was loaded. """
+        old = getattr(self, '_loaded_priority', None)
+        if old is None or old == self.priority or 'queue_at' not in self.__dict__:
+            return False
+        self.queue_at += queue_head_start(old) - queue_head_start(self.priority)
+        return True
+
+    def requeue_after_rejection(self):
+        """ Rejected work goes back to the Pending queue ahead of where it stood. """
+        self.queue_at -= timedelta(hours=settings.CLEANIFY_REJECTION_HEAD_START_HOURS)
+
+    def transition(self, old_status, new_status, old_category=None):
+        return Transition(
+            request_id=self.pk,
+            category=self.category,
+            old_status=old_status,
+            new_status=new_status,
+            worker_id=self.assigned_worker_id,
+            created_at=self.created_at,
+            at=timezone.now(),
+            old_category=old_category or self.category,
+            requestee_id=self.requestee_id,
+        )
+
+    @property
+    def coordinates(self):
+        """ (x, y) of the request's building, or None. """
+        return (self.building.x, self.building.y) if self.building_id else None
+
+    def _rendition_url(self, field_name, rendition):
+        """ URL of a rendition, falling back to the original upload until the rendition exists. """
+        derivative = getattr(self, f"{field_name}_{rendition}")
+        if derivative:
+            return derivative.url
+        original = getattr(self, field_name)
+        return original.url if original else ''
+
+    @property
+    def request_image_thumb_url(self):
+        return self._rendition_url('request_image', 'thumb')
+
+    @property
+    def request_image_medium_url(self):
+        return self._rendition_url('request_image', 'medium')
+
+    @property
+    def completion_image_thumb_url(self):
+        return self._rendition_url('completion_image', 'thumb')
+
+    @property
+    def completion_image_medium_url(self):
+        return self._rendition_url('completion_image', 'medium')
 
     def __str__(self):
         rating_info = f", Rated: {self.get_worker_rating_display()}" if self.worker_rating else ""
         worker_info = f", Worker: {self.assigned_worker.username}" if self.assigned_worker else ""
         approval_info = f", Approved: {self.is_approved_by_student}" if self.status == 'Completed' else ""
         return f"ID:{self.id} Req by {self.requestee.username} ({self.status}{worker_info}{rating_info}{approval_info})"
+
+
+class RequestStatusCount(models.Model):
+    """ Number of WasteRequests per (status, category), kept current by every status transition. """
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    category = models.CharField(max_length=50, choices=CATEGORY_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['status', 'category'], name='unique_status_category_count'),
+        ]
+
+    def __str__(self):
+        return f"{self.status} / {self.category}: {self.count}"
+
+    @classmethod
+    def apply_transitions(cls, transitions):
+        """ Applies the +1/-1 deltas of a batch of transitions, one UPDATE per affected counter. """
+        deltas = {}
+        for t in transitions:
+            if t.old_status is not None:
+                key = (t.old_status, t.old_category)
+                deltas[key] = deltas.get(key, 0) - 1
+            if t.new_status is not None:
+                key = (t.new_status, t.category)
+                deltas[key] = deltas.get(key, 0) + 1
+        for (status, category), delta in deltas.items():
+            if not delta:
+                continue
+            updated = cls.objects.filter(status=status, category=category).update(count=F('count') + delta)
+            if not updated:
+                counter, created = cls.objects.get_or_create(status=status, category=category, defaults={'count': delta})
+                if not created:
+                    cls.objects.filter(pk=counter.pk).update(count=F('count') + delta)
+
+    @classmethod
+    def total_for(cls, queryset):
+        """
+        The number of rows in a WasteRequest queryset, read off the counters, if it is
+        filtered by nothing but status and/or category (exact or in); None otherwise.
+        """
+        query = queryset.query
+        if (query.model is not WasteRequest or query.is_sliced or query.distinct or query.combinator
+                or query.extra_tables or query.where.negated or query.where.connector != AND):
+            return None
+        counters = cls.objects.all()
+        for lookup in query.where.children:
+            lhs = getattr(lookup, 'lhs', None)
+            if (getattr(lookup, 'lookup_name', None) not in ('exact', 'in') or not isinstance(lhs, Col)
+                    or lhs.alias != query.base_table or lhs.target.name not in ('status', 'category')):
+                return None
+            counters = counters.filter(**{f"{lhs.target.name}__{lookup.lookup_name}": lookup.rhs})
+        return counters.aggregate(total=Sum('count'))['total'] or 0
+
+    @classmethod
+    def totals_by_status(cls):
+        """ {status: total} over all categories, in one small query. """
+        totals = {status: 0 for status, _label in STATUS_CHOICES}
+        for row in cls.objects.values('status').annotate(total=Sum('count')):
+            totals[row['status']] = row['total']
+        return totals
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recomputes every counter from WasteRequest and makes sure a row exists for every combination.
+        Returns {(status, category): (old, new)} for the counters whose value was wrong.
+        """
+        with transaction.atomic():
+            actual = {
+                (row['status'], row['category']): row['n']
+                for row in WasteRequest.objects.values('status', 'category').annotate(n=Count('id')).order_by()
+            }
+            for status, _label in STATUS_CHOICES:
+                for category, _label in CATEGORY_CHOICES:
+                    actual.setdefault((status, category), 0)
+            stored = {(c.status, c.category): c.count for c in cls.objects.all()}
+            changed = {}
+            for (status, category), value in actual.items():
+                if stored.get((status, category)) == value:
+                    continue
+                if stored.get((status, category), 0) != value:
+                    changed[(status, category)] = (stored.get((status, category)), value)
+                cls.objects.update_or_create(status=status, category=category, defaults={'count': value})
+            for status, category in set(stored) - set(actual):
+                changed[(status, category)] = (stored[(status, category)], 0)
+                cls.objects.filter(status=status, category=category).delete()
+        return changed
+
+
+class SlaRollup(models.Model):
+    """
+    Service-level totals per (day, category), kept current by every status transition.
+    Events are counted on the day they happen: creation, assignment (Pending -> Assigned),
+    approval (Pending Approval -> Completed) and rejection (Pending Approval -> Pending).
+    Averages and rates are derived from the sums, so a report over any range is a few
+    hundred small rows however large WasteRequest grows.
+    """
+    day = models.DateField()
+    category = models.CharField(max_length=50, choices=CATEGORY_CHOICES)
+    created = models.IntegerField(default=0)
+    assigned = models.IntegerField(default=0)
+    # Sum of (assigned_at - created_at) over the day's assignments.
+    assign_seconds = models.FloatField(default=0)
+    approved = models.IntegerField(default=0)
+    # Sum of (approved_at - created_at) over the day's approvals.
+    complete_seconds = models.FloatField(default=0)
+    rejected = models.IntegerField(default=0)
+
+    COUNTERS = ('created', 'assigned', 'assign_seconds', 'approved', 'complete_seconds', 'rejected')
+
+    class Meta:
+        constraints = [
+            # Also the index the SLA page's day-range reads use.
+            models.UniqueConstraint(fields=['day', 'category'], name='unique_sla_day_category'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} / {self.category}: {self.created} created, {self.assigned} assigned, {self.approved} approved, {self.rejected} rejected"
+
+    @staticmethod
+    def deltas_for(t):
+        """ The counters a single transition moves, as {field: delta}. """
+        if t.old_status is None and t.new_status is not None:
+            return {'created': 1}
+        if t.old_status == 'Pending' and t.new_status == 'Assigned':
+            return {'assigned': 1, 'assign_seconds': (t.at - t.created_at).total_seconds()}
+        if t.old_status == 'Pending Approval' and t.new_status == 'Completed':
+            return {'approved': 1, 'complete_seconds': (t.at - t.created_at).total_seconds()}
+        if t.old_status == 'Pending Approval' and t.new_status == 'Pending':
+            return {'rejected': 1}
+        return {}
+
+    @classmethod
+    def apply_transitions(cls, transitions):
+        """ Adds a batch of transitions to the rollups, one UPDATE per affected (day, category). """
+        deltas = {}
+        for t in transitions:
+            changes = cls.deltas_for(t)
+            if not changes:
+                continue
+            # Requests arriving in bulk (import_data) are counted on the day they were created.
+            moment = t.created_at if 'created' in changes else t.at
+            totals = deltas.setdefault((timezone.localdate(moment), t.category), {})
+            for field, delta in changes.items():
+                totals[field] = totals.get(field, 0) + delta
+        for (day, category), totals in deltas.items():
+            increments = {field: F(field) + delta for field, delta in totals.items()}
+            if cls.objects.filter(day=day, category=category).update(**increments):
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(day=day, category=category, **totals)
+            except IntegrityError:
+                # Created concurrently by another transition on the same day.
+                cls.objects.filter(day=day, category=category).update(**increments)
+
+    @classmethod
+    def recompute(cls, since=None):
+        """
+        {(day, category): {field: value}} from WasteRequest for days on or after `since` (all days if None).
+        Rejections leave no trace on WasteRequest, and a rejected request's earlier assignment is
+        overwritten by the next one, so only the latest assignment of each request is counted here.
+        """
+        def moments(field):
+            queryset = WasteRequest.objects.filter(**{f"{field}__isnull": False})
+            if since is not None:
+                queryset = queryset.filter(**{f"{field}__gte": datetime.combine(since, time.min, tzinfo=timezone.get_current_timezone())})
+            return queryset.values('category', day=TruncDate(field)).order_by()
+
+        def elapsed(field):
+            return Sum(ExpressionWrapper(F(field) - F('created_at'), output_field=DurationField()))
+
+        rollups = {}
+
+        def add(rows, count_field, seconds_field=None):
+            for row in rows:
+                values = rollups.setdefault((row['day'], row['category']), dict.fromkeys(cls.COUNTERS, 0))
+                values[count_field] = row['n']
+                if seconds_field:
+                    values[seconds_field] = row['elapsed'].total_seconds() if row['elapsed'] else 0
+
+        add(moments('created_at').annotate(n=Count('id')), 'created')
+        add(moments('assigned_at').annotate(n=Count('id'), elapsed=elapsed('assigned_at')), 'assigned', 'assign_seconds')
+        add(moments('approved_at').filter(status='Completed').annotate(n=Count('id'), elapsed=elapsed('approved_at')), 'approved', 'complete_seconds')
+        return rollups
+
+    @classmethod
+    def rebuild(cls, since=None):
+        """
+        Recomputes the rollups for days on or after `since` (every day if None) from WasteRequest,
+        keeping the stored rejection counts, which cannot be recomputed. Returns the number of rows written.
+        """
+        with transaction.atomic():
+            rollups = cls.recompute(since)
+            stored = cls.objects.all() if since is None else cls.objects.filter(day__gte=since)
+            rejected = {(day, category): n for day, category, n in stored.filter(rejected__gt=0).values_list('day', 'category', 'rejected')}
+            for key, n in rejected.items():
+                rollups.setdefault(key, dict.fromkeys(cls.COUNTERS, 0))['rejected'] = n
+            stored.delete()
+            cls.objects.bulk_create(
+                [cls(day=day, category=category, **values) for (day, category), values in rollups.items()],
+                batch_size=1000,
+            )
+        return len(rollups)
+
+    @classmethod
+    def report(cls, since, until):
+        """
+        Totals per category and per day for since <= day <= until, read from the rollups only.
+        Returns (by_category, by_day); each row has the summed counters plus the derived
+        avg_assign_seconds, avg_complete_seconds and approval_rate (None when undefined).
+        """
+        sums = {field: Sum(field) for field in cls.COUNTERS}
+        rows = cls.objects.filter(day__gte=since, day__lte=until)
+        by_category = {row['category']: row for row in rows.values('category').annotate(**sums).order_by()}
+        by_category = [
+            _with_sla_rates({**dict.fromkeys(cls.COUNTERS, 0), **by_category.get(category, {}), 'category': category})
+            for category, _label in CATEGORY_CHOICES
+        ]
+        by_day = [_with_sla_rates(row) for row in rows.values('day').annotate(**sums).order_by('-day')]
+        return by_category, by_day
+
+
+def _with_sla_rates(row):
+    row['avg_assign_seconds'] = row['assign_seconds'] / row['assigned'] if row['assigned'] else None
+    row['avg_complete_seconds'] = row['complete_seconds'] / row['approved'] if row['approved'] else None
+    reviewed = row['approved'] + row['rejected']
+    row['approval_rate'] = row['approved'] / reviewed if reviewed else None
+    return row
+
+
+class StoredBlob(models.Model):
+    """ One file in the content-addressed media store and the number of image fields referencing it. """
+    name = models.CharField(max_length=100, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # When the last reference was dropped; unreferenced blobs are purged by collect_media_garbage after a grace period.
+    released_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['released_at'], name='blob_unreferenced_idx', condition=models.Q(refcount=0)),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs, {self.size} bytes)"
+
+    @classmethod
+    def add_reference(cls, name, size):
+        """ Counts one more reference to `name`, creating the blob row on first use. Returns True if the row is new. """
+        if cls.objects.filter(name=name).update(refcount=F('refcount') + 1, released_at=None):
+            return False
+        try:
+            with transaction.atomic():
+                cls.objects.create(name=name, size=size, refcount=1)
+            return True
+        except IntegrityError:
+            # Created concurrently by another upload of the same content.
+            cls.objects.filter(name=name).update(refcount=F('refcount') + 1, released_at=None)
+            return False
+
+    @classmethod
+    def drop_reference(cls, name):
+        """ Counts one reference less. Returns False if `name` is not a known blob. """
+        if not cls.objects.filter(name=name, refcount__gt=0).update(refcount=F('refcount') - 1):
+            return cls.objects.filter(name=name).exists()
+        cls.objects.filter(name=name, refcount=0, released_at__isnull=True).update(released_at=timezone.now())
+        return True
@@ -0,0 +1,84 @@
+
+import asyncio
+import threading
+
+from django.db import transaction
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AssignmentNotifier:
+    """
+    Per-process wake-up calls for workers waiting on the assignment long-poll.
+
+    Each worker has a version that is bumped whenever one of their tasks changes
+    status. A waiter reads the version, checks the database, then waits for the
+    version to move on, so a change committed between the check and the wait is
+    never missed. Only changes made by this process are seen; the long-poll view
+    re-checks the database every CLEANIFY_ASSIGNMENT_POLL_INTERVAL seconds to
+    pick up assignments made by other processes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._waiters = {}
+
+    def version(self, worker_id):
+        with self._lock:
+            return self._versions.get(worker_id, 0)
+
+    def notify(self, worker_ids):
+        """ Wakes everyone waiting on any of `worker_ids`. Safe to call from any thread. """
+        woken = []
+        with self._lock:
+            for worker_id in set(worker_ids):
+                self._versions[worker_id] = self._versions.get(worker_id, 0) + 1
+                woken.extend(self._waiters.pop(worker_id, ()))
+        for wake in woken:
+            wake()
+
+    async def wait(self, worker_id, version, timeout):
+        """ Returns True once the worker's version differs from `version`, False after `timeout` seconds. """
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+
+        def wake():
+            loop.call_soon_threadsafe(event.set)
+
+        with self._lock:
+            if self._versions.get(worker_id, 0) != version:
+                return True
+            self._waiters.setdefault(worker_id, set()).add(wake)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(worker_id)
+                if waiters is not None:
+                    waiters.discard(wake)
+                    if not waiters:
+                        del self._waiters[worker_id]
+
+    def waiting(self):
+        """ Number of open waits, for tests and diagnostics. """
+        with self._lock:
+            return sum(len(waiters) for waiters in self._waiters.values())
+
+
+_notifier = AssignmentNotifier()
+
+
+def get_notifier():
+    return _notifier
+
+
+def notify_workers_on_commit(worker_ids):
+    """ Wakes the workers' long-polls once the current transaction has committed (immediately outside one). """
+    worker_ids = {worker_id for worker_id in worker_ids if worker_id is not None}
+    if worker_ids:
+        transaction.on_commit(lambda: _notifier.notify(worker_ids))
@@ -0,0 +1,150 @@
+
+from django.conf import settings
+from django.core import signing
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.dateparse import parse_datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+_SALT = 'waste_management.pagination'
+
+
+class KeysetPage:
+    """ One page of a keyset-paginated list, with opaque tokens for the neighbouring pages. """
+
+    def __init__(self, items, next_token=None, previous_token=None):
+        self.items = items
+        self.next_token = next_token
+        self.previous_token = previous_token
+
+    @property
+    def has_next(self):
+        return self.next_token is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_token is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+
+def make_token(direction, key_value, pk):
+    return signing.dumps([direction, key_value.isoformat(), pk], salt=_SALT, compress=True)
+
+
+def read_token(token):
+    """ (direction, key_value, pk) from a token, or None if it is missing or invalid. """
+    if not token:
+        return None
+    try:
+        direction, key_value, pk = signing.loads(token, salt=_SALT)
+        key_value = parse_datetime(key_value)
+        if direction not in (NEXT, PREVIOUS) or key_value is None:
+            raise ValueError(direction)
+        return direction, key_value, int(pk)
+    except (signing.BadSignature, ValueError, TypeError) as e:
+        logger.warning(f"Ignoring invalid pagination token: {e}")
+        return None
+
+
+def seek(queryset, key, cursor=None):
+    """
+    Orders `queryset` for the page after (or before) `cursor`.
+
+    Seeks with `key <= k AND (key < k OR id < pk)` rather than an OFFSET, so the
+    database range-scans an index on `key` and page 1000 costs the same as page 1.
+    """
+    if cursor is None:
+        return queryset.order_by(f"-{key}", '-id')
+    direction, key_value, pk = cursor
+    if direction == NEXT:
+        condition = Q(**{f"{key}__lte": key_value}) & (Q(**{f"{key}__lt": key_value}) | Q(id__lt=pk))
+        return queryset.filter(condition).order_by(f"-{key}", '-id')
+    condition = Q(**{f"{key}__gte": key_value}) & (Q(**{f"{key}__gt": key_value}) | Q(id__gt=pk))
+    return queryset.filter(condition).order_by(key, 'id')
+
+
+def keyset_page(queryset, key, token=None, page_size=20):
+    """
+    Returns a KeysetPage of `queryset` ordered newest first by (key, id), in one
+    LIMIT page_size+1 query. Rows with a NULL key are not paginated; callers exclude them.
+    """
+    cursor = read_token(token)
+    rows = list(seek(queryset, key, cursor)[:page_size + 1])
+    page = _build_page(rows, key, cursor, page_size)
+    return page if page is not None else keyset_page(queryset, key, None, page_size)
+
+
+async def akeyset_page(queryset, key, token=None, page_size=20):
+    """ keyset_page() for async views. """
+    cursor = read_token(token)
+    rows = [row async for row in seek(queryset, key, cursor)[:page_size + 1]]
+    page = _build_page(rows, key, cursor, page_size)
+    return page if page is not None else await akeyset_page(queryset, key, None, page_size)
+
+
+def _build_page(rows, key, cursor, page_size):
+    """ The page for rows fetched after `cursor`, or None when the caller should start over from the top. """
+    has_more, rows = len(rows) > page_size, rows[:page_size]
+    if cursor is None:
+        return _page(rows, key, has_next=has_more, has_previous=False)
+    if cursor[0] == NEXT:
+        return _page(rows, key, has_next=has_more, has_previous=True)
+    if not rows:
+        # Everything newer is gone.
+        return None
+    rows.reverse()
+    return _page(rows, key, has_next=True, has_previous=has_more)
+
+
+def _page(rows, key, has_next, has_previous):
+    if not rows:
+        return KeysetPage(rows)
+    first, last = rows[0], rows[-1]
+    return KeysetPage(
+        rows,
+        next_token=make_token(NEXT, getattr(last, key), last.pk) if has_next else None,
+        previous_token=make_token(PREVIOUS, getattr(first, key), first.pk) if has_previous else None,
+    )
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    A Paginator that never counts a large table in full. Subclasses can supply the
+    size of querysets they know it for (known_count). Anything else is counted up to
+    CLEANIFY_ADMIN_COUNT_CAP rows, or to the end of the page after `page` when that is
+    further, and count_capped says whether more rows follow. The page after the one
+    shown is therefore always reachable, so paging goes on to the last row.
+    """
+    count_capped = False
+
+    def __init__(self, object_list, per_page, *args, page=1, **kwargs):
+        super().__init__(object_list, per_page, *args, **kwargs)
+        self.requested_page = page
+
+    def known_count(self):
+        return None
+
+    @cached_property
+    def count(self):
+        known = self.known_count()
+        if known is not None:
+            return known
+        limit = max(settings.CLEANIFY_ADMIN_COUNT_CAP, (self.requested_page + 1) * self.per_page)
+        counted = self.object_list.order_by()[:limit + 1].count()
+        self.count_capped = counted > limit
+        return min(counted, limit)
@@ -0,0 +1,66 @@
+
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import UserProfile
+
+
+RoleInfo = namedtuple('RoleInfo', 'role category profile_id')
+
+_NO_PROFILE = ()
+
+
+def _cache_key(user_id):
+    return f"cleanify:role:{user_id}"
+
+
+def get_role_cache():
+    return caches[settings.CLEANIFY_ROLE_CACHE]
+
+
+def get_role_info(user):
+    """
+    The user's RoleInfo (role, category, profile id), or None for anonymous users and
+    users without a profile. Read from the cache, so authorisation checks cost no
+    query; memoised on the user object for the rest of the request.
+    """
+    if not user.is_authenticated:
+        return None
+    try:
+        return user._role_info
+    except AttributeError:
+        pass
+    role_cache = get_role_cache()
+    key = _cache_key(user.pk)
+    data = role_cache.get(key)
+    if data is None:
+        data = UserProfile.objects.filter(user_id=user.pk).values_list('role', 'category', 'id').first() or _NO_PROFILE
+        role_cache.set(key, tuple(data), settings.CLEANIFY_ROLE_CACHE_TTL)
+    user._role_info = RoleInfo(*data) if data else None
+    return user._role_info
+
+
+def has_role(user, role):
+    info = get_role_info(user)
+    return info is not None and info.role == role
+
+
+def invalidate_role(user_id):
+    """ Drops the cached role now and again after commit, so a concurrent request cannot re-cache the old row. """
+    invalidate_roles([user_id])
+
+
+def invalidate_roles(user_ids):
+    """
+    invalidate_role() for many users at once, for code that writes users or profiles
+    with bulk_create()/update(), which send no signals.
+    """
+    keys = [_cache_key(user_id) for user_id in user_ids]
+    if not keys:
+        return
+    role_cache = get_role_cache()
+    role_cache.delete_many(keys)
+    transaction.on_commit(lambda: role_cache.delete_many(keys))
@@ -0,0 +1,169 @@
+"""
+Full-text search over WasteRequest.location and description.
+
+On SQLite the text lives in an FTS5 index, waste_request_fts, an external-content
+table over the request table: it stores only the index, not a second copy of the
+text. Triggers keep it in step with every INSERT, UPDATE of location/description
+and DELETE, however the row is written (save(), bulk_create(), update(), the
+import command or the admin). Other databases fall back to icontains.
+"""
+
+import logging
+import re
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import F, Q, Value, FloatField
+from django.db.models.expressions import RawSQL
+
+from .models import CATEGORY_CHOICES, WasteRequest
+
+logger = logging.getLogger(__name__)
+
+
+FTS_TABLE = 'waste_request_fts'
+# bm25 weights for (location, description): a word in the location counts double.
+RANK_FUNCTION = 'bm25(2.0, 1.0)'
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 200
+
+
+def search_available():
+    return connection.vendor == 'sqlite'
+
+
+def _statements(table):
+    columns = 'location, description'
+    new_row = 'new.id, new.location, new.description'
+    old_row = 'old.id, old.location, old.description'
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"location, description, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES ({new_row}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', {old_row}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF location, description ON {table} BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', {old_row}); "
+        f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES ({new_row}); END",
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', '{RANK_FUNCTION}')",
+    ]
+
+
+def ensure_search_index(db=connection, create=True):
+    """
+    Creates the FTS5 table and its triggers if either is missing, and refills the
+    index if any trigger was. SQLite drops triggers with the table whenever a
+    migration rebuilds the request table, so this also runs (with create=False:
+    only where the index exists) after every migrate. Returns True if it rebuilt.
+    """
+    if db.vendor != 'sqlite':
+        return False
+    table = WasteRequest._meta.db_table
+    existing = db.introspection.table_names()
+    if table not in existing or (not create and FTS_TABLE not in existing):
+        return False
+    with db.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s AND name LIKE %s",
+            [table, f"{FTS_TABLE}_%"],
+        )
+        stale = cursor.fetchone()[0] < 3
+        for statement in _statements(table):
+            cursor.execute(statement)
+        if stale:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            logger.info(f"Rebuilt search index {FTS_TABLE}.")
+    return stale
+
+
+def match_expression(query):
+    """
+    The FTS5 MATCH string for free text typed by a user: every word must appear,
+    as a word or the start of one. Returns None if there is no word to look for.
+    Quoting each word keeps FTS5 syntax (AND, NEAR, column:, "...") inert.
+    """
+    words = re.findall(r'\w+', query.lower())
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_requests(queryset, query, usernames=False):
+    """
+    Narrows a WasteRequest queryset to the requests matching `query`, annotated with
+    search_rank (lower is better) and ordered by it. With usernames=True, as in the
+    admin, a query that is exactly a username lists that user's requests (as requestee
+    or worker) instead, newest first, with a NULL search_rank; otherwise each word may
+    also match the start of the requestee's or worker's username or of a word of the
+    category, and requests found only that way come after the ranked ones.
+    """
+    unranked = Value(None, output_field=FloatField())
+    if usernames:
+        users = list(User.objects.filter(username=query.strip()).values_list('id', flat=True))
+        if users:
+            return queryset.filter(
+                Q(requestee_id__in=users) | Q(assigned_worker_id__in=users)
+            ).annotate(search_rank=unranked).order_by('-created_at', '-id')
+    if not search_available():
+        condition = Q()
+        for word in query.split():
+            condition &= Q(location__icontains=word) | Q(description__icontains=word)
+        return queryset.filter(condition).annotate(search_rank=unranked).order_by('-created_at', '-id')
+    match = match_expression(query)
+    if match is None:
+        return queryset.none().annotate(search_rank=unranked)
+
+    # bm25 needs the whole MATCH, so a rank looked up row by row would re-run the query for
+    # every row. OFFSET 0 keeps SQLite from flattening the ranked subquery into the outer
+    # one: it is materialized once and joined to the matching ids through an automatic index.
+    table = connection.ops.quote_name(WasteRequest._meta.db_table)
+    matches = f"SELECT rowid AS id, rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s LIMIT -1 OFFSET 0"
+    if usernames:
+        condition = Q()
+        for term in query.split():
+            condition &= _term_condition(term)
+    else:
+        condition = Q(pk__in=_matching_ids(match))
+    return queryset.filter(condition).annotate(
+        search_rank=RawSQL(
+            f"SELECT ranked.rank FROM ({matches}) AS ranked WHERE ranked.id = {table}.id",
+            (match,), output_field=FloatField(),
+        ),
+    ).order_by(F('search_rank').asc(nulls_last=True), 'id')
+
+
+def _matching_ids(match):
+    return RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (match,))
+
+
+def _term_condition(term):
+    """ One admin search term: in the index, or the start of a username or of a category word. """
+    users = User.objects.filter(username__istartswith=term).values('id')
+    categories = [
+        value for value, _label in CATEGORY_CHOICES
+        if any(word.startswith(term.lower()) for word in value.lower().split())
+    ]
+    condition = Q(requestee__in=users) | Q(assigned_worker__in=users) | Q(category__in=categories)
+    match = match_expression(term)
+    if match is not None:
+        condition |= Q(pk__in=_matching_ids(match))
+    return condition
+
+
+def ranked_matches(query, limit=DEFAULT_LIMIT):
+    """
+    [(request ID, rank, snippet)] of the best `limit` matches, best first, straight
+    from the index. The snippet marks matched words with [ and ].
+    """
+    match = match_expression(query)
+    if match is None:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, rank, snippet({FTS_TABLE}, -1, '[', ']', '...', 12) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s",
+            [match, limit],
+        )
+        return cursor.fetchall()
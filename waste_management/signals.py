@@ -0,0 +1,116 @@
+
+from django.contrib.auth.models import User
+from django.db import connections
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+import logging
+
+from .derivatives import IMAGE_FIELDS
+from .fragment_cache import invalidate_scopes, request_scopes, user_scope
+from .models import UserProfile, WasteRequest, RequestStatusCount, SlaRollup
+from .notifications import notify_workers_on_commit
+from .roles import invalidate_role
+from .search import ensure_search_index
+from .storage import is_content_addressed
+from .transitions import request_status_changed, notify_transitions
+from .worker_pool import get_worker_pool
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=UserProfile)
+def sync_worker_pool_on_profile_save(sender, instance, **kwargs):
+    """ Keeps the free-worker pool in step with is_busy / category / role changes. """
+    get_worker_pool().sync_profile(instance, is_active=instance.user.is_active)
+
+
+@receiver(post_delete, sender=UserProfile)
+def discard_worker_on_profile_delete(sender, instance, **kwargs):
+    get_worker_pool().discard(instance.user_id)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_cached_role(sender, instance, **kwargs):
+    """ Role/category changes take effect on the user's next request. """
+    invalidate_role(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_cached_role_on_new_user(sender, instance, created=False, **kwargs):
+    # A reused primary key must not inherit a deleted user's cached role.
+    if created:
+        invalidate_role(instance.pk)
+        invalidate_scopes([user_scope(instance.pk)])
+
+
+@receiver(post_save, sender=User)
+def sync_worker_pool_on_user_save(sender, instance, update_fields=None, **kwargs):
+    """ Activating/deactivating a worker account adds/removes them from the pool. """
+    if update_fields is not None and 'is_active' not in update_fields:
+        return
+    try:
+        profile = instance.profile
+    except UserProfile.DoesNotExist:
+        return
+    get_worker_pool().sync_profile(profile, is_active=instance.is_active)
+
+
+@receiver(post_delete, sender=WasteRequest)
+def announce_request_deleted(sender, instance, **kwargs):
+    notify_transitions(WasteRequest, [instance.transition(instance.status, None)])
+
+
+@receiver(post_delete, sender=WasteRequest)
+def release_images_on_request_delete(sender, instance, **kwargs):
+    """ Drops the request's references to its stored images, in the deleting transaction. """
+    for field_name in IMAGE_FIELDS:
+        image = getattr(instance, field_name)
+        if image and is_content_addressed(image.name):
+            image.storage.delete(image.name)
+
+
+@receiver(request_status_changed)
+def update_status_counters(sender, transitions, **kwargs):
+    RequestStatusCount.apply_transitions(transitions)
+
+
+@receiver(request_status_changed)
+def update_sla_rollups(sender, transitions, **kwargs):
+    SlaRollup.apply_transitions(transitions)
+
+
+@receiver(post_save, sender=WasteRequest)
+@receiver(post_delete, sender=WasteRequest)
+def invalidate_dashboards_on_request_change(sender, instance, **kwargs):
+    invalidate_scopes(request_scopes(instance.requestee_id, instance.assigned_worker_id))
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_dashboard_on_profile_change(sender, instance, **kwargs):
+    """ A worker's dashboard shows their current task and rating. """
+    invalidate_scopes([user_scope(instance.user_id)])
+
+
+@receiver(request_status_changed)
+def invalidate_dashboards_on_transitions(sender, transitions, **kwargs):
+    """ Covers the bulk paths (assignment engine, dispatcher, import), which write without post_save. """
+    scopes = set()
+    for t in transitions:
+        scopes |= request_scopes(t.requestee_id, t.worker_id)
+    invalidate_scopes(scopes)
+
+
+@receiver(request_status_changed)
+def wake_assignment_long_polls(sender, transitions, **kwargs):
+    """ A task given to or taken off a worker ends their pending long-poll once committed. """
+    notify_workers_on_commit(
+        t.worker_id for t in transitions if 'Assigned' in (t.old_status, t.new_status)
+    )
+
+
+def restore_search_index_after_migrate(sender, using, **kwargs):
+    """ Connected to post_migrate in apps.py: SQLite drops the index triggers whenever a migration remakes the request table. """
+    if ensure_search_index(connections[using], create=False):
+        logger.warning(f"Search index triggers were missing on database '{using}'; recreated them and rebuilt the index.")
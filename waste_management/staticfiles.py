@@ -0,0 +1,172 @@
+"""
+Static files for production: hashed names, precompressed variants and an in-process server.
+
+collectstatic with CompressedManifestStaticFilesStorage copies every file to STATIC_ROOT
+under a content-hashed name (css/cleanify.3f2a1b9c0d4e.css) and writes .gz (and .br when
+the Brotli package is installed) next to each compressible one. StaticFileIndex maps URLs
+to those files once at startup; StaticFilesMiddleware answers from it before any other
+middleware runs, with the smallest variant the client accepts and, for hashed names, a
+one-year immutable Cache-Control: a changed file gets a new name, never a new body.
+"""
+
+import gzip
+import json
+import mimetypes
+import os
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_http_date_safe
+import logging
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip variants are written.
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.mjs', '.map', '.svg', '.txt', '.html', '.json', '.xml', '.ico')
+# Files smaller than this are not worth a variant.
+MIN_COMPRESS_BYTES = 256
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# Encodings in order of preference, with the suffix of their variant files.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _compress(path):
+    """ Writes path.gz (and path.br) when they come out smaller than the original. """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < MIN_COMPRESS_BYTES:
+        return
+    variants = {'.gz': gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    for suffix, compressed in variants.items():
+        if len(compressed) < len(data) * 0.95:
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ ManifestStaticFilesStorage that also precompresses every compressible file it writes. """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS) and self.exists(name):
+                _compress(self.path(name))
+
+
+StaticFile = namedtuple('StaticFile', 'content_type immutable representations')
+# One file on disk that can answer for a StaticFile: the original or a compressed variant.
+Representation = namedtuple('Representation', 'path size mtime etag encoding')
+
+
+def _representation(path, encoding=None):
+    stat = os.stat(path)
+    return Representation(path, stat.st_size, int(stat.st_mtime), f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"', encoding)
+
+
+def _content_type(name):
+    content_type, _encoding = mimetypes.guess_type(name)
+    content_type = content_type or 'application/octet-stream'
+    if content_type.startswith('text/') or content_type in ('application/javascript', 'application/json'):
+        content_type += '; charset=utf-8'
+    return content_type
+
+
+class StaticFileIndex:
+    """ {URL path: StaticFile} for everything under STATIC_ROOT, read once. """
+
+    def __init__(self, root, url_prefix):
+        self.root = root
+        self.url_prefix = url_prefix
+        self.files = {}
+        hashed = self._hashed_names()
+        variant_suffixes = tuple(suffix for _encoding, suffix in ENCODINGS)
+        for directory, _dirs, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, root).replace(os.sep, '/')
+                if name == ManifestStaticFilesStorage.manifest_name:
+                    continue
+                if filename.endswith(variant_suffixes) and os.path.exists(path.rsplit('.', 1)[0]):
+                    continue
+                representations = [
+                    _representation(path + suffix, encoding)
+                    for encoding, suffix in ENCODINGS if os.path.exists(path + suffix)
+                ]
+                representations.append(_representation(path))
+                self.files[url_prefix + name] = StaticFile(_content_type(filename), name in hashed, representations)
+        logger.info(f"Indexed {len(self.files)} static files under {root} ({len(hashed)} with hashed names)")
+
+    def _hashed_names(self):
+        try:
+            with open(os.path.join(self.root, ManifestStaticFilesStorage.manifest_name)) as f:
+                return set(json.load(f).get('paths', {}).values())
+        except (OSError, ValueError):
+            return set()
+
+    def match(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        return self.files.get(request.path_info)
+
+
+def _accepted_encodings(header):
+    accepted = set()
+    for part in header.split(','):
+        coding, _semicolon, params = part.strip().partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def serve(request, static_file):
+    """ The response for one StaticFile: the best accepted representation, or 304 if the client's copy is current. """
+    accepted = _accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    representation = next(r for r in static_file.representations if r.encoding is None or r.encoding in accepted)
+    headers = {
+        'ETag': representation.etag,
+        'Last-Modified': http_date(representation.mtime),
+        'Cache-Control': (
+            f'public, max-age={IMMUTABLE_MAX_AGE}, immutable' if static_file.immutable
+            else f'public, max-age={settings.CLEANIFY_STATIC_MAX_AGE}'
+        ),
+    }
+    if len(static_file.representations) > 1:
+        headers['Vary'] = 'Accept-Encoding'
+
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        not_modified = if_none_match.strip() == '*' or representation.etag in [tag.strip() for tag in if_none_match.split(',')]
+    else:
+        since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        not_modified = since is not None and representation.mtime <= since
+    if not_modified:
+        response = HttpResponseNotModified()
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=static_file.content_type)
+    else:
+        response = FileResponse(open(representation.path, 'rb'), content_type=static_file.content_type)
+        # FileResponse would name it after the file on disk (cleanify.css.gz), as if it were a download.
+        del response['Content-Disposition']
+    response['Content-Length'] = str(representation.size)
+    if representation.encoding:
+        response['Content-Encoding'] = representation.encoding
+    for header, value in headers.items():
+        response[header] = value
+    return response
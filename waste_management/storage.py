@@ -0,0 +1,112 @@
+
+import hashlib
+import os
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+CAS_PREFIX = 'cas'
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def is_content_addressed(name):
+    """ True for names produced by ContentAddressedStorage, e.g. 'cas/ab/cd/abcd....png'. """
+    return bool(name) and name.replace('\\', '/').startswith(f"{CAS_PREFIX}/")
+
+
+def content_name(digest, extension=''):
+    """ Sharded storage name for a SHA-256 hex digest: 'cas/<2>/<2>/<digest><ext>'. """
+    return f"{CAS_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension.lower()}"
+
+
+def hash_file(file_obj):
+    """ (sha256 hex digest, size in bytes) of a Django File, read in chunks. """
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in file_obj.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Media storage that names every file after the SHA-256 of its content.
+
+    Saving content that is already stored only adds a reference (StoredBlob) and
+    writes nothing; deleting drops a reference. Files are never removed here:
+    collect_media_garbage purges blobs that stayed unreferenced past a grace
+    period, so a rejected photo that is re-submitted costs nothing. Names that
+    are not content-addressed (uploads made before this storage existed) keep
+    the plain FileSystemStorage behaviour.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The final name depends on the content, which _save() has not seen yet.
+        return name
+
+    def _save(self, name, content):
+        from .models import StoredBlob
+
+        _base, extension = os.path.splitext(name)
+        digest, size = hash_file(content)
+        stored_name = content_name(digest, extension[:10])
+        # The reference is counted only once the file is on disk, and in one transaction
+        # with the caller's row: a failed write or a rolled-back save leaves no reference,
+        # at worst an orphaned file for collect_media_garbage --orphans.
+        with transaction.atomic():
+            if self.exists(stored_name):
+                logger.debug(f"Deduplicated upload {name} -> {stored_name}")
+            else:
+                self._write(stored_name, content)
+            StoredBlob.add_reference(stored_name, size)
+            # The blob may have been purged between the check and the reference, which waits for the
+            # purge to commit; the file is now referenced, so it cannot be purged again.
+            if not self.exists(stored_name):
+                self._write(stored_name, content)
+        return stored_name
+
+    def _write(self, name, content):
+        """ Writes to a temporary file and renames it into place; concurrent writers of the same content are harmless. """
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        temporary_path = os.path.join(directory, f".{uuid.uuid4().hex}.tmp")
+        try:
+            with open(temporary_path, 'wb') as destination:
+                for chunk in content.chunks():
+                    destination.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary_path, self.file_permissions_mode)
+            os.replace(temporary_path, full_path)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+    def delete(self, name):
+        from .models import StoredBlob
+
+        if not name:
+            raise ValueError("The name must be given to delete().")
+        if is_content_addressed(name):
+            if not StoredBlob.drop_reference(name):
+                logger.warning(f"Dropped a reference to unknown blob {name}")
+            return
+        super().delete(name)
+
+    def purge(self, name):
+        """ Removes a blob's file from disk. Only collect_media_garbage calls this. """
+        super().delete(name)
+
+
+_media_storage = ContentAddressedStorage()
+
+
+def media_storage():
+    """ Storage for uploaded request/completion images (a callable so migrations do not serialise the instance). """
+    return _media_storage
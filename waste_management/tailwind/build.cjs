@@ -0,0 +1,43 @@
+// Compiles input.css for the candidate class names read from stdin (one per line) and
+// writes the CSS to stdout. Run by `python manage.py build_css`, not directly.
+//
+// With a working lightningcss (its native binary must match this platform) the output is
+// also minified and lowered for older browsers; otherwise it is printed as Tailwind emits
+// it and build_css minifies it. The first line of stdout says which: "optimized" or "raw".
+const fs = require('fs');
+const path = require('path');
+
+const root = path.resolve(__dirname, '..', '..', 'node_modules');
+const { compile } = require(path.join(root, 'tailwindcss', 'dist', 'lib.js'));
+
+async function loadStylesheet(id, base) {
+  const file = id === 'tailwindcss'
+    ? path.join(root, 'tailwindcss', 'index.css')
+    : id.startsWith('tailwindcss/')
+      ? path.join(root, 'tailwindcss', id.slice('tailwindcss/'.length))
+      : path.resolve(base, id);
+  return { path: file, base: path.dirname(file), content: fs.readFileSync(file, 'utf8') };
+}
+
+function optimize(css) {
+  // @tailwindcss/node's optimize is what the Tailwind CLI runs; it loads lightningcss on import.
+  let node;
+  try {
+    node = require(path.join(root, '@tailwindcss', 'node'));
+  } catch (e) {
+    return null;
+  }
+  return node.optimize(css, { file: 'cleanify.css', minify: true });
+}
+
+(async () => {
+  const input = path.join(__dirname, 'input.css');
+  const candidates = fs.readFileSync(0, 'utf8').split('\n').filter(Boolean);
+  const compiler = await compile(fs.readFileSync(input, 'utf8'), { base: __dirname, loadStylesheet });
+  const css = compiler.build(candidates);
+  const optimized = optimize(css);
+  process.stdout.write(optimized === null ? `raw\n${css}` : `optimized\n${optimized}`);
+})().catch((error) => {
+  process.stderr.write(`${error.stack || error}\n`);
+  process.exit(1);
+});
@@ -0,0 +1,42 @@
+from django import template
+
+from ..fragment_cache import cached_fragment
+
+register = template.Library()
+
+
+class DashboardFragmentNode(template.Node):
+    def __init__(self, nodelist, name, scopes, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.scopes = scopes
+        self.vary_on = vary_on
+
+    def render(self, context):
+        return cached_fragment(
+            self.name.resolve(context),
+            self.scopes.resolve(context),
+            [var.resolve(context) for var in self.vary_on],
+            lambda: self.nodelist.render(context),
+        )
+
+
+@register.tag
+def dashboard_fragment(parser, token):
+    """
+    {% dashboard_fragment "name" scopes [vary_on ...] %} ... {% enddashboard_fragment %}
+
+    Caches the enclosed block until a version of one of `scopes` (see fragment_cache.py)
+    changes, separately for each combination of the vary_on values.
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires a fragment name and its scopes.")
+    nodelist = parser.parse(('enddashboard_fragment',))
+    parser.delete_first_token()
+    return DashboardFragmentNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+        [parser.compile_filter(bit) for bit in bits[3:]],
+    )
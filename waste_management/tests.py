@@ -1,3 +1,1571 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.admin import site as admin_site
+from django.contrib.auth.models import User, Group
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F, QuerySet
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from .admin import WasteRequestAdmin
+from .assignment import AssignmentResult, assign_request, claim_assignment, assign_next_pending, CLAIMED, LOST_WORKER, LOST_REQUEST
+from .benchmarking import create_workers, placeholder_image_bytes, seed_dataset
+from .css_build import minify_css, scan_candidates
+from .derivatives import derivative_name, submit_derivatives
+from .dispatcher import dispatch_pending
+from .fragment_cache import get_fragment_cache
+from .management.commands.bench_asgi import dashboards_urlconf
+from .management.commands.bench_views import check_budgets
+from . import async_views
+from .metrics import MetricsRegistry, get_registry
+from .notifications import AssignmentNotifier, get_notifier
+from .roles import get_role_cache, get_role_info
+from .search import ranked_matches, search_requests
+from .pagination import EstimatedCountPaginator, keyset_page, seek, NEXT, PREVIOUS
+from .models import Building, UserProfile, WasteRequest, RequestStatusCount, SlaRollup, StoredBlob
+from .storage import media_storage
+from .views import find_and_assign_worker
+from .worker_pool import FreeWorkerPool, get_worker_pool, POLICY_CHOICES, POLICY_LEAST_RECENT, POLICY_RATING
+
+
+TEST_MEDIA_ROOT = tempfile.mkdtemp(prefix='cleanify-test-media-')
+# Shared file caches for fragments and roles, as several server processes would use, kept out of the
+# project's cache directory. Enabled on import rather than in setUpModule, as creating the test database
+# already saves rows that bump versions.
+_test_caches = override_settings(CACHES={
+    **settings.CACHES,
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(TEST_MEDIA_ROOT, 'fragment-cache'),
+    },
+    'roles': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(TEST_MEDIA_ROOT, 'role-cache'),
+    },
+})
+_test_caches.enable()
+
+
+def tearDownModule():
+    _test_caches.disable()
+    shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
+
+
+def make_user(username, role, category=None, **profile_fields):
+    user = User.objects.create_user(username=username)
+    UserProfile.objects.create(user=user, role=role, category=category, **profile_fields)
+    return user
+
+
+def make_request(requestee, category='Garbage Collection', **fields):
+    image = SimpleUploadedFile('issue.png', b'fake-image-bytes', content_type='image/png')
+    fields.setdefault('location', 'Library')
+    return WasteRequest.objects.create(requestee=requestee, category=category, request_image=image, **fields)
+
+
+def occupy(worker):
+    """ Makes the worker busy with a fresh Assigned request, behind the worker pool's back. """
+    requestee = User.objects.get_or_create(username='occupier')[0]
+    task = make_request(requestee, worker.profile.category, status='Assigned', assigned_worker=worker)
+    UserProfile.objects.filter(user=worker).update(current_task=task)
+    return task
+
+
+def set_free(worker):
+    UserProfile.objects.filter(user=worker).update(current_task=None)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class FreeWorkerPoolTests(TestCase):
+
+    def setUp(self):
+        get_worker_pool().invalidate()
+
+    def test_rebuild_loads_only_free_active_workers(self):
+        free = make_user('free', 'Worker', 'Garbage Collection')
+        occupy(make_user('busy', 'Worker', 'Garbage Collection'))
+        inactive = make_user('inactive', 'Worker', 'Garbage Collection')
+        inactive.is_active = False
+        inactive.save()
+        make_user('student', 'Requestee')
+
+        pool = FreeWorkerPool()
+        pool.rebuild()
+        self.assertEqual(pool.size('Garbage Collection'), 1)
+        self.assertEqual(pool.pick('Garbage Collection'), free.id)
+        self.assertEqual(pool.size(), 0)
+
+    def test_pool_follows_profile_changes(self):
+        pool = get_worker_pool()
+        pool.rebuild()
+        worker = make_user('w1', 'Worker', 'Water Leakage')
+        self.assertIn(worker.id, pool)
+
+        worker.profile.current_task = make_request(
+            make_user('student', 'Requestee'), 'Water Leakage', status='Assigned', assigned_worker=worker
+        )
+        worker.profile.save(update_fields=['current_task'])
+        self.assertNotIn(worker.id, pool)
+
+        worker.profile.current_task = None
+        worker.profile.category = 'Electricity Issue'
+        worker.profile.save()
+        self.assertEqual(pool.size('Water Leakage'), 0)
+        self.assertEqual(pool.size('Electricity Issue'), 1)
+
+        worker.is_active = False
+        worker.save()
+        self.assertNotIn(worker.id, pool)
+
+    def test_least_recent_policy_is_fifo(self):
+        pool = FreeWorkerPool(policy=POLICY_LEAST_RECENT)
+        pool._loaded = True
+        for worker_id in (3, 1, 2):
+            pool.release(worker_id, 'Garbage Collection')
+        self.assertEqual([pool.pick('Garbage Collection') for _ in range(3)], [3, 1, 2])
+
+    def test_rating_policy_prefers_highest_rated(self):
+        pool = FreeWorkerPool(policy=POLICY_RATING)
+        pool._loaded = True
+        pool.release(1, 'Garbage Collection', rating=3.5)
+        pool.release(2, 'Garbage Collection', rating=None)
+        pool.release(3, 'Garbage Collection', rating=4.9)
+        pool.discard(3)
+        self.assertEqual(pool.pick('Garbage Collection'), 1)
+        self.assertEqual(pool.pick('Garbage Collection'), 2)
+
+    def test_unpicked_worker_keeps_their_place(self):
+        pool = FreeWorkerPool(policy=POLICY_RATING)
+        pool._loaded = True
+        pool.release(1, 'Garbage Collection', rating=4.5, location=(0, 0))
+        pool.release(2, 'Garbage Collection', rating=3.0)
+        self.assertEqual(pool.pick('Garbage Collection'), 1)
+        pool.unpick(1)
+        self.assertEqual(pool.pick('Garbage Collection', near=(10, 10)), 1)
+
+        pool = FreeWorkerPool(policy=POLICY_LEAST_RECENT)
+        pool._loaded = True
+        for worker_id in (3, 1, 2):
+            pool.release(worker_id, 'Garbage Collection', location=(worker_id * 100, 0))
+        self.assertEqual(pool.pick('Garbage Collection', near=(100, 0)), 1)
+        pool.unpick(1)
+        self.assertEqual([pool.pick('Garbage Collection') for _ in range(3)], [3, 1, 2])
+
+    def test_lost_request_returns_the_worker_to_the_pool_unchanged(self):
+        requestee = make_user('student', 'Requestee')
+        best = make_user('w1', 'Worker', 'Garbage Collection', average_rating=4.8)
+        make_user('w2', 'Worker', 'Garbage Collection', average_rating=3.0)
+        with self.settings(CLEANIFY_NEAREST_WORKER=False):
+            pool = FreeWorkerPool(policy=POLICY_RATING)
+            pool.rebuild()
+            lost = AssignmentResult(LOST_REQUEST, None, best.pk)
+            with mock.patch('waste_management.assignment.get_worker_pool', return_value=pool), \
+                    mock.patch('waste_management.assignment.claim_assignment', return_value=lost):
+                self.assertEqual(assign_request(make_request(requestee)).outcome, LOST_REQUEST)
+            self.assertEqual(pool.pick('Garbage Collection'), best.pk)
+
+    def test_nearest_pick_falls_back_to_policy_for_unlocated_workers(self):
+        pool = FreeWorkerPool(policy=POLICY_LEAST_RECENT, cell_size=100)
+        pool._loaded = True
+        pool.release(1, 'Garbage Collection', location=(50, 50))
+        pool.release(2, 'Garbage Collection', location=(1250, 40))
+        pool.release(3, 'Garbage Collection')
+        pool.release(4, 'Garbage Collection', location=(990, 980))
+        self.assertEqual(pool.pick('Garbage Collection', near=(1000, 1000)), 4)
+        # A worker seen somewhere new moves in the grid without losing their place in the queue.
+        pool.release(2, 'Garbage Collection', location=(1010, 1000))
+        self.assertEqual(pool.pick('Garbage Collection', near=(1000, 1000)), 2)
+        self.assertEqual(pool.pick('Garbage Collection', near=(1000, 1000)), 1)
+        self.assertEqual(pool.pick('Garbage Collection', near=(1000, 1000)), 3)
+        self.assertIsNone(pool.pick('Garbage Collection', near=(1000, 1000)))
+
+    def test_completion_moves_worker_and_nearest_free_worker_is_assigned(self):
+        library = Building.objects.create(name='Library', x=0, y=0)
+        gym = Building.objects.create(name='Gym', x=1000, y=1000)
+        requestee = make_user('student', 'Requestee')
+        near_hostel = make_user('w1', 'Worker', 'Garbage Collection', location_x=1400, location_y=300)
+        traveller = make_user('w2', 'Worker', 'Garbage Collection', location_x=800, location_y=800)
+        get_worker_pool().rebuild()
+
+        task = make_request(requestee, building=library)
+        self.assertTrue(find_and_assign_worker(task))
+        self.assertEqual(task.assigned_worker, traveller)
+        self.client.force_login(traveller)
+        proof = SimpleUploadedFile('done.png', placeholder_image_bytes(), content_type='image/png')
+        self.client.post(f'/app/worker/task/{task.pk}/complete/', {'completion_image': proof})
+        self.assertEqual(UserProfile.objects.get(user=traveller).location, (0, 0))
+
+        # From where they used to be the traveller would be closest to the gym; from the library they are not.
+        second = make_request(requestee, building=gym)
+        self.assertTrue(find_and_assign_worker(second))
+        self.assertEqual(second.assigned_worker, near_hostel)
+
+    def test_excluded_worker_is_picked_only_when_alone(self):
+        for policy in POLICY_CHOICES:
+            pool = FreeWorkerPool(policy=policy)
+            pool._loaded = True
+            pool.release(1, 'Garbage Collection', rating=4.0, location=(0, 0))
+            pool.release(2, 'Garbage Collection', rating=3.0, location=(500, 0))
+            self.assertEqual(pool.pick('Garbage Collection', near=(0, 0), exclude=1), 2, policy)
+            self.assertEqual(pool.pick('Garbage Collection', exclude=1), 1, policy)
+            pool.release(1, 'Garbage Collection', rating=4.0)
+            pool.release(3, 'Garbage Collection', rating=1.0)
+            self.assertEqual(pool.pick('Garbage Collection', exclude=1), 3, policy)
+            self.assertEqual(pool.pick('Garbage Collection', exclude=1), 1, policy)
+
+    def test_rejected_request_goes_to_another_worker(self):
+        library = Building.objects.create(name='Library', x=0, y=0)
+        requestee = make_user('student', 'Requestee')
+        workers = [make_user(f'w{i}', 'Worker', 'Garbage Collection', location_x=300 + 100 * i, location_y=0) for i in range(5)]
+        get_worker_pool().rebuild()
+        task = make_request(requestee, building=library)
+        self.assertTrue(find_and_assign_worker(task))
+        first = task.assigned_worker
+        self.assertEqual(first, workers[0])
+
+        self.client.force_login(first)
+        proof = SimpleUploadedFile('done.png', placeholder_image_bytes(), content_type='image/png')
+        self.client.post(f'/app/worker/task/{task.pk}/complete/', {'completion_image': proof})
+        # Finishing the task left them at the library, closer than anyone else.
+        self.assertEqual(UserProfile.objects.get(user=first).location, (0, 0))
+        self.client.force_login(requestee)
+        self.client.post(f'/app/requestee/request/{task.pk}/review/', {'worker_rating': 2})
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'Assigned')
+        self.assertEqual(task.assigned_worker, workers[1])
+
+    def test_find_and_assign_skips_stale_pool_entries(self):
+        worker = make_user('w1', 'Worker', 'Garbage Collection')
+        requestee = make_user('student', 'Requestee')
+        pool = get_worker_pool()
+        pool.rebuild()
+        # Another process made the worker busy behind this pool's back.
+        occupy(worker)
+        pool.release(worker.id, 'Garbage Collection')
+
+        waste_request = make_request(requestee)
+        self.assertFalse(find_and_assign_worker(waste_request))
+        self.assertEqual(waste_request.status, 'Pending')
+
+        set_free(worker)
+        pool.release(worker.id, 'Garbage Collection')
+        self.assertTrue(find_and_assign_worker(waste_request))
+        waste_request.refresh_from_db()
+        self.assertEqual(waste_request.assigned_worker, worker)
+        self.assertEqual(UserProfile.objects.get(user=worker).current_task, waste_request)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class AssignmentEngineTests(TestCase):
+
+    def setUp(self):
+        get_worker_pool().invalidate()
+        self.requestee = make_user('student', 'Requestee')
+        self.worker = make_user('w1', 'Worker', 'Garbage Collection')
+
+    def test_second_claim_on_same_worker_is_lost(self):
+        first = make_request(self.requestee)
+        second = make_request(self.requestee)
+        self.assertEqual(claim_assignment(first.id, self.worker.id).outcome, CLAIMED)
+        self.assertEqual(claim_assignment(second.id, self.worker.id).outcome, LOST_WORKER)
+        second.refresh_from_db()
+        self.assertEqual(second.status, 'Pending')
+        self.assertIsNone(second.assigned_worker)
+
+    def test_lost_request_rolls_back_worker_claim(self):
+        other = make_user('w2', 'Worker', 'Garbage Collection')
+        waste_request = make_request(self.requestee)
+        self.assertTrue(claim_assignment(waste_request.id, other.id))
+        result = claim_assignment(waste_request.id, self.worker.id)
+        self.assertEqual(result.outcome, LOST_REQUEST)
+        self.assertFalse(UserProfile.objects.get(user=self.worker).is_busy)
+        waste_request.refresh_from_db()
+        self.assertEqual(waste_request.assigned_worker, other)
+
+    def test_assign_next_pending_takes_oldest_in_category(self):
+        occupy(self.worker)
+        oldest = make_request(self.requestee)
+        make_request(self.requestee)
+        make_request(self.requestee, category='Water Leakage')
+        self.assertEqual(assign_next_pending(self.worker).outcome, LOST_WORKER)
+
+        set_free(self.worker)
+        result = assign_next_pending(self.worker)
+        self.assertTrue(result)
+        self.assertEqual(result.request_id, oldest.id)
+
+    def test_manual_assign_view_rejects_busy_worker(self):
+        admin = User.objects.create_user(username='admin', is_staff=True)
+        self.worker.groups.add(Group.objects.get_or_create(name='Worker')[0])
+        occupy(self.worker)
+        waste_request = make_request(self.requestee)
+        self.client.force_login(admin)
+        response = self.client.post(f"/app/admin/request/{waste_request.id}/manual_assign/", {'assigned_worker': self.worker.id})
+        self.assertEqual(response.status_code, 200)
+        waste_request.refresh_from_db()
+        self.assertEqual(waste_request.status, 'Pending')
+
+        set_free(self.worker)
+        response = self.client.post(f"/app/admin/request/{waste_request.id}/manual_assign/", {'assigned_worker': self.worker.id})
+        self.assertRedirects(response, '/app/admin/dashboard/', fetch_redirect_response=False)
+        waste_request.refresh_from_db()
+        self.assertEqual(waste_request.status, 'Assigned')
+        self.assertEqual(waste_request.assigned_worker, self.worker)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class DispatcherTests(TestCase):
+
+    def setUp(self):
+        get_worker_pool().invalidate()
+        self.requestee = make_user('student', 'Requestee')
+
+    def test_drains_all_categories_oldest_first(self):
+        garbage_workers = [make_user(f"g{i}", 'Worker', 'Garbage Collection') for i in range(2)]
+        occupy(make_user('busy', 'Worker', 'Garbage Collection'))
+        water_worker = make_user('w1', 'Worker', 'Water Leakage')
+        garbage = [make_request(self.requestee) for _ in range(3)]
+        water = make_request(self.requestee, category='Water Leakage')
+        make_request(self.requestee, category='Electricity Issue')
+
+        report = dispatch_pending()
+
+        self.assertEqual(report.assigned, 3)
+        self.assertEqual(report.assigned_by_category['Garbage Collection'], 2)
+        self.assertEqual(report.assigned_by_category['Water Leakage'], 1)
+        assigned = WasteRequest.objects.filter(status='Assigned', requestee=self.requestee)
+        self.assertEqual(
+            set(assigned.filter(category='Garbage Collection').values_list('id', flat=True)),
+            {garbage[0].id, garbage[1].id}
+        )
+        self.assertEqual(assigned.get(category='Water Leakage').assigned_worker, water_worker)
+        self.assertEqual(
+            set(UserProfile.objects.filter(current_task__isnull=False, category='Garbage Collection').values_list('user_id', flat=True)),
+            {w.id for w in garbage_workers} | {User.objects.get(username='busy').id}
+        )
+        self.assertEqual(WasteRequest.objects.filter(status='Pending').count(), 2)
+        self.assertEqual(water.id, assigned.get(category='Water Leakage').id)
+
+    def test_pass_uses_constant_number_of_queries(self):
+        for i in range(20):
+            make_user(f"g{i}", 'Worker', 'Garbage Collection')
+            make_request(self.requestee)
+        # pending read, worker read, one bulk_update each for requests and current tasks, two counter UPDATEs,
+        # one SLA rollup UPDATE, plus savepoint bookkeeping.
+        with self.assertNumQueries(9):
+            report = dispatch_pending()
+        self.assertEqual(report.assigned, 20)
+        self.assertGreater(report.rate, 0)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class WorkerRatingTests(TestCase):
+
+    def setUp(self):
+        get_worker_pool().invalidate()
+        self.requestee = make_user('student', 'Requestee')
+        self.worker = make_user('w1', 'Worker', 'Garbage Collection')
+
+    def review(self, rating, approve):
+        waste_request = make_request(
+            self.requestee, status='Pending Approval', assigned_worker=self.worker
+        )
+        self.client.force_login(self.requestee)
+        data = {'worker_rating': rating}
+        if approve:
+            data['approve'] = 'on'
+        self.client.post(f"/app/requestee/request/{waste_request.id}/review/", data)
+        return waste_request
+
+    def test_approved_ratings_update_running_totals(self):
+        self.review(5, approve=True)
+        self.review(2, approve=True)
+        self.review(1, approve=False)
+        profile = UserProfile.objects.get(user=self.worker)
+        self.assertEqual((profile.rating_sum, profile.rating_count), (7, 2))
+        self.assertEqual(profile.average_rating, 3.5)
+        self.assertAlmostEqual(profile.recent_rating, 5 * 0.8 + 2 * 0.2)
+
+    def test_repeated_approval_is_counted_once(self):
+        waste_request = make_request(self.requestee, status='Pending Approval', assigned_worker=self.worker)
+        stale = WasteRequest.objects.get(pk=waste_request.pk)
+        self.client.force_login(self.requestee)
+        url = f"/app/requestee/request/{waste_request.id}/review/"
+        self.client.post(url, {'worker_rating': 5, 'approve': 'on'})
+        with mock.patch('waste_management.views.get_object_or_404', return_value=stale):
+            self.client.post(url, {'worker_rating': 1, 'approve': 'on'})
+        profile = UserProfile.objects.get(user=self.worker)
+        self.assertEqual((profile.rating_sum, profile.rating_count), (5, 1))
+        self.assertEqual(RequestStatusCount.totals_by_status()['Completed'], 1)
+        self.assertEqual(RequestStatusCount.totals_by_status()['Pending Approval'], 0)
+
+        # A claim from a state the row has already left changes nothing.
+        stale.status = 'Pending'
+        self.assertFalse(stale.claim('Pending Approval'))
+        self.assertEqual(WasteRequest.objects.get(pk=waste_request.pk).status, 'Completed')
+
+    def test_record_rating_uses_constant_queries(self):
+        profile = self.worker.profile
+        with self.assertNumQueries(2):
+            profile.record_rating(4)
+        self.assertEqual(profile.average_rating, 4.0)
+
+    def test_recompute_reports_and_repairs_drift(self):
+        self.review(4, approve=True)
+        UserProfile.objects.filter(user=self.worker).update(rating_sum=40, rating_count=3)
+        profile = UserProfile.objects.get(user=self.worker)
+        self.assertEqual(profile.update_average_rating(), (36, 2))
+        profile.refresh_from_db()
+        self.assertEqual((profile.rating_sum, profile.rating_count, profile.average_rating), (4, 1, 4.0))
+        self.assertEqual(profile.update_average_rating(), (0, 0))
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN output is SQLite-specific.")
+class HotQueryPlanTests(TestCase):
+    """ Every dashboard/assignment query must be answered from an index, without a full scan or sort. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.requestee = make_user('student', 'Requestee')
+        cls.worker = make_user('w1', 'Worker', 'Garbage Collection')
+        requestees = [cls.requestee] + [make_user(f"r{i}", 'Requestee') for i in range(9)]
+        workers = [cls.worker] + [make_user(f"w{i}", 'Worker', 'Water Leakage') for i in range(2, 10)]
+        statuses = ['Pending', 'Assigned', 'Pending Approval', 'Completed', 'Completed', 'Completed']
+        categories = ['Garbage Collection', 'Water Leakage', 'Washroom Cleaning', 'Electricity Issue']
+        now = timezone.now()
+        rows = []
+        for i in range(600):
+            status = statuses[i % len(statuses)]
+            rows.append(WasteRequest(
+                requestee=requestees[i % len(requestees)],
+                category=categories[i % len(categories)],
+                location=f"Block {i}",
+                request_image='request_images/seed.png',
+                status=status,
+                assigned_worker=None if status == 'Pending' else workers[i % len(workers)],
+                assigned_at=None if status == 'Pending' else now - timedelta(minutes=i),
+                approved_at=now - timedelta(minutes=i // 2) if status == 'Completed' else None,
+                worker_rating=(i % 5) + 1 if status == 'Completed' else None,
+                priority=(i % 4) + 1,
+                queue_at=now - timedelta(minutes=i),
+            ))
+        WasteRequest.objects.bulk_create(rows)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertIndexed(self, queryset):
+        """
+        The request table must be reached by SEARCH on an index, or by walking a partial index,
+        which holds only the rows its condition selects. A SCAN of a full index reads every row.
+        """
+        plan = queryset.explain()
+        table = WasteRequest._meta.db_table
+        partial = {index.name for index in WasteRequest._meta.indexes if index.condition is not None}
+        for line in plan.splitlines():
+            scan = re.search(rf"\bSCAN {table}(?: USING (?:COVERING )?INDEX (\w+))?", line)
+            self.assertFalse(
+                scan and scan.group(1) not in partial,
+                f"Scan of {table} without a search condition:\n{plan}"
+            )
+            self.assertNotIn('TEMP B-TREE', line, f"Sort without index:\n{plan}")
+
+    def test_pending_queue_lookup(self):
+        queue = WasteRequest.objects.filter(status='Pending', category='Garbage Collection').order_by('queue_at', 'id')[:1]
+        self.assertIndexed(queue)
+        self.assertIn('wr_pending_queue_idx', queue.explain())
+        dispatch_order = WasteRequest.objects.filter(status='Pending').order_by('queue_at', 'id')
+        self.assertIndexed(dispatch_order)
+        self.assertIn('wr_pending_order_idx', dispatch_order.explain())
+
+    def test_worker_dashboard_queries(self):
+        self.assertIndexed(WasteRequest.objects.filter(assigned_worker=self.worker, status='Assigned').select_related('requestee')[:1])
+        self.assertIndexed(
+            WasteRequest.objects.filter(assigned_worker=self.worker, status='Completed')
+            .select_related('requestee').order_by('-approved_at')[:10]
+        )
+
+    def test_requestee_dashboard_queries(self):
+        mine = WasteRequest.objects.filter(requestee=self.requestee).select_related('assigned_worker').order_by('-updated_at')
+        self.assertIndexed(mine.filter(status='Pending Approval'))
+        self.assertIndexed(mine.exclude(status='Pending Approval'))
+
+    def test_keyset_pages_seek_through_the_index(self):
+        now = timezone.now()
+        history = WasteRequest.objects.filter(requestee=self.requestee).exclude(status='Pending Approval')
+        completed = WasteRequest.objects.filter(assigned_worker=self.worker, status='Completed', approved_at__isnull=False)
+        for direction in (NEXT, PREVIOUS):
+            self.assertIndexed(seek(history, 'updated_at', (direction, now, 300))[:21])
+            self.assertIndexed(seek(completed, 'approved_at', (direction, now, 300))[:11])
+
+    def test_admin_dashboard_queries(self):
+        for status in ('Pending', 'Assigned', 'Pending Approval', 'Completed'):
+            self.assertIndexed(WasteRequest.objects.filter(status=status).values('pk'))
+        self.assertIndexed(WasteRequest.objects.filter(status='Pending').select_related('requestee').order_by('-created_at')[:15])
+        self.assertIndexed(WasteRequest.objects.filter(status='Assigned').select_related('requestee', 'assigned_worker').order_by('-assigned_at')[:15])
+        self.assertIndexed(WasteRequest.objects.filter(status='Pending Approval').select_related('requestee', 'assigned_worker').order_by('-updated_at')[:15])
+        self.assertIndexed(WasteRequest.objects.filter(status='Completed').select_related('requestee', 'assigned_worker').order_by('-approved_at')[:15])
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.requestee = make_user('student', 'Requestee')
+        same_time = timezone.now()
+        WasteRequest.objects.bulk_create([
+            WasteRequest(requestee=cls.requestee, category='Garbage Collection', location=f"Block {i}",
+                         request_image='request_images/seed.png', status='Pending', queue_at=same_time)
+            for i in range(25)
+        ])
+        # Ties on updated_at must still page deterministically (by id).
+        WasteRequest.objects.filter(requestee=cls.requestee).update(updated_at=same_time)
+        cls.queryset = WasteRequest.objects.filter(requestee=cls.requestee)
+
+    def test_walks_forward_and_back_without_gaps(self):
+        expected = list(self.queryset.order_by('-updated_at', '-id').values_list('id', flat=True))
+        pages, token = [], None
+        while True:
+            page = keyset_page(self.queryset, 'updated_at', token, page_size=10)
+            pages.append([r.id for r in page])
+            if not page.has_next:
+                break
+            token = page.next_token
+        self.assertEqual([len(p) for p in pages], [10, 10, 5])
+        self.assertEqual(sum(pages, []), expected)
+
+        back = keyset_page(self.queryset, 'updated_at', page.previous_token, page_size=10)
+        self.assertEqual([r.id for r in back], pages[1])
+        self.assertTrue(back.has_previous and back.has_next)
+        first = keyset_page(self.queryset, 'updated_at', back.previous_token, page_size=10)
+        self.assertEqual([r.id for r in first], pages[0])
+        self.assertFalse(first.has_previous)
+
+    def test_tampered_token_falls_back_to_first_page(self):
+        page = keyset_page(self.queryset, 'updated_at', 'not-a-token', page_size=10)
+        self.assertFalse(page.has_previous)
+        self.assertEqual(len(page), 10)
+
+    def test_dashboard_page_cost_does_not_grow_with_depth(self):
+        self.client.force_login(self.requestee)
+        self.client.get('/app/requestee/dashboard/')
+        get_fragment_cache().clear()
+        with self.assertNumQueries(4):
+            response = self.client.get('/app/requestee/dashboard/')
+        token = response.context['other_requests'].next_token
+        with self.assertNumQueries(4):
+            response = self.client.get('/app/requestee/dashboard/', {'cursor': token})
+        self.assertEqual(len(response.context['other_requests']), 5)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class StatusCounterTests(TestCase):
+
+    def setUp(self):
+        get_worker_pool().invalidate()
+        self.requestee = make_user('student', 'Requestee')
+
+    def assertCountersMatch(self):
+        self.assertEqual(RequestStatusCount.rebuild(), {})
+
+    def test_counters_follow_every_transition(self):
+        worker = make_user('w1', 'Worker', 'Garbage Collection')
+        first = make_request(self.requestee)
+        second = make_request(self.requestee)
+        self.assertEqual(RequestStatusCount.totals_by_status()['Pending'], 2)
+
+        self.assertTrue(find_and_assign_worker(first))
+        first.status = 'Pending Approval'
+        first.save()
+        set_free(worker)
+        dispatch_pending()
+        first.status = 'Completed'
+        first.save(update_fields=['status'])
+        make_request(self.requestee, category='Water Leakage').delete()
+
+        totals = RequestStatusCount.totals_by_status()
+        self.assertEqual(totals, {'Pending': 0, 'Assigned': 1, 'Pending Approval': 0, 'Completed': 1})
+        second.refresh_from_db()
+        self.assertEqual(second.status, 'Assigned')
+        self.assertCountersMatch()
+
+    def test_rebuild_repairs_drift(self):
+        make_request(self.requestee)
+        RequestStatusCount.objects.filter(status='Pending').update(count=42)
+        changed = RequestStatusCount.rebuild()
+        self.assertEqual(changed[('Pending', 'Garbage Collection')], (42, 1))
+        self.assertCountersMatch()
+
+    def test_admin_dashboard_reads_counters(self):
+        admin = User.objects.create_user(username='admin', is_staff=True)
+        make_request(self.requestee)
+        self.client.force_login(admin)
+        response = self.client.get('/app/admin/dashboard/')
+        self.assertEqual(response.context['total_pending'], 1)
+        self.assertEqual(response.context['total_completed'], 0)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, CLEANIFY_IMAGE_WORKERS=0)
+class ImageDerivativeTests(TestCase):
+
+    def setUp(self):
+        get_worker_pool().invalidate()
+        self.requestee = make_user('student', 'Requestee')
+
+    def upload(self):
+        self.client.force_login(self.requestee)
+        image = SimpleUploadedFile('photo.jpg', placeholder_image_bytes(size=(2400, 1800), image_format='JPEG'), content_type='image/jpeg')
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.client.post('/app/requestee/request/new/', {
+                'category': 'Garbage Collection', 'location': 'Library', 'request_image': image,
+            })
+        return WasteRequest.objects.get(requestee=self.requestee), callbacks
+
+    def test_renditions_are_generated_after_commit(self):
+        waste_request, callbacks = self.upload()
+        # Until the pipeline has run, the previews fall back to the original upload.
+        self.assertEqual(waste_request.request_image_thumb_url, waste_request.request_image.url)
+
+        for callback in callbacks:
+            callback()
+        waste_request.refresh_from_db()
+        self.assertTrue(waste_request.request_image_thumb.name.endswith('_thumb.jpg'))
+        self.assertNotEqual(waste_request.request_image_medium_url, waste_request.request_image.url)
+        with Image.open(waste_request.request_image_thumb.path) as thumb:
+            self.assertLessEqual(max(thumb.size), 160)
+        with Image.open(waste_request.request_image_medium.path) as medium:
+            self.assertEqual(medium.size, (1024, 768))
+
+    def test_rejection_discards_completion_renditions(self):
+        worker = make_user('w1', 'Worker', 'Garbage Collection')
+        waste_request = make_request(self.requestee, status='Pending Approval', assigned_worker=worker)
+        waste_request.completion_image = SimpleUploadedFile('done.png', placeholder_image_bytes(), content_type='image/png')
+        waste_request.save()
+        submit_derivatives(waste_request.id, 'completion_image', waste_request.completion_image.name)
+        waste_request.refresh_from_db()
+        thumb_path = waste_request.completion_image_thumb.path
+        self.assertTrue(os.path.exists(thumb_path))
+
+        self.client.force_login(self.requestee)
+        self.client.post(f"/app/requestee/request/{waste_request.id}/review/", {'worker_rating': 2})
+        waste_request.refresh_from_db()
+        self.assertFalse(waste_request.completion_image_thumb)
+        # Renditions belong to the stored blob and go when it is garbage-collected.
+        call_command('collect_media_garbage', grace=0, stdout=StringIO())
+        self.assertFalse(os.path.exists(thumb_path))
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, CLEANIFY_IMAGE_WORKERS=0)
+class ContentAddressedStorageTests(TestCase):
+
+    def setUp(self):
+        get_worker_pool().invalidate()
+        self.requestee = make_user('student', 'Requestee')
+
+    def test_duplicate_uploads_share_one_file(self):
+        first = make_request(self.requestee)
+        second = make_request(self.requestee)
+        self.assertEqual(first.request_image.name, second.request_image.name)
+        self.assertTrue(first.request_image.name.startswith('cas/'))
+        blob = StoredBlob.objects.get(name=first.request_image.name)
+        self.assertEqual(blob.refcount, 2)
+
+        # A duplicate upload does not touch the stored file.
+        mtime = os.path.getmtime(first.request_image.path)
+        os.utime(first.request_image.path, (mtime - 100, mtime - 100))
+        make_request(self.requestee)
+        self.assertEqual(os.path.getmtime(first.request_image.path), mtime - 100)
+
+    def test_delete_only_drops_a_reference(self):
+        first = make_request(self.requestee)
+        second = make_request(self.requestee)
+        path = first.request_image.path
+        first.delete()
+        self.assertEqual(StoredBlob.objects.get(name=second.request_image.name).refcount, 1)
+        second.delete()
+        blob = StoredBlob.objects.get(name=second.request_image.name)
+        self.assertEqual(blob.refcount, 0)
+        self.assertIsNotNone(blob.released_at)
+        self.assertTrue(os.path.exists(path))
+
+        call_command('collect_media_garbage', stdout=StringIO())
+        self.assertTrue(os.path.exists(path), "still inside the grace period")
+        call_command('collect_media_garbage', grace=0, stdout=StringIO())
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(StoredBlob.objects.exists())
+
+    def test_failed_write_adds_no_reference(self):
+        storage = media_storage()
+        with mock.patch.object(storage, '_write', side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                storage.save('request_images/issue.png', ContentFile(b'new-image-bytes'))
+        self.assertFalse(StoredBlob.objects.exists())
+
+        name = storage.save('request_images/issue.png', ContentFile(b'new-image-bytes'))
+        self.assertTrue(storage.exists(name))
+        self.assertEqual(StoredBlob.objects.get(name=name).refcount, 1)
+
+    def test_repeated_rejection_releases_the_completion_image_once(self):
+        worker = make_user('w1', 'Worker', 'Garbage Collection')
+        rejected, other = (
+            make_request(self.requestee, status='Pending Approval', assigned_worker=worker) for _ in range(2)
+        )
+        for waste_request in (rejected, other):
+            waste_request.completion_image = SimpleUploadedFile('done.png', placeholder_image_bytes(), content_type='image/png')
+            waste_request.save()
+        name = other.completion_image.name
+        # What a second tab loaded before the first rejection went through.
+        stale = WasteRequest.objects.get(pk=rejected.pk)
+
+        self.client.force_login(self.requestee)
+        url = f"/app/requestee/request/{rejected.id}/review/"
+        self.client.post(url, {'worker_rating': 2})
+        with mock.patch('waste_management.views.get_object_or_404', return_value=stale):
+            self.client.post(url, {'worker_rating': 1})
+        self.assertEqual(StoredBlob.objects.get(name=name).refcount, 1)
+        rejected.refresh_from_db()
+        # The rejected request went straight back to the (free) worker; the stale rejection left that alone.
+        self.assertEqual((rejected.status, rejected.assigned_worker_id, rejected.worker_rating), ('Assigned', worker.pk, 2))
+
+    def test_rehash_media_merges_legacy_duplicates(self):
+        content = placeholder_image_bytes()
+        os.makedirs(os.path.join(TEST_MEDIA_ROOT, 'request_images'), exist_ok=True)
+        legacy_names = [f"request_images/legacy_{i}.png" for i in range(3)]
+        for name in legacy_names:
+            with open(media_storage().path(name), 'wb') as f:
+                f.write(content)
+        ids = []
+        for name in legacy_names:
+            waste_request = make_request(self.requestee)
+            WasteRequest.objects.filter(pk=waste_request.pk).update(request_image=name)
+            ids.append(waste_request.pk)
+
+        out = StringIO()
+        call_command('rehash_media', stdout=out)
+        names = set(WasteRequest.objects.filter(pk__in=ids).values_list('request_image', flat=True))
+        self.assertEqual(len(names), 1)
+        stored_name = names.pop()
+        self.assertTrue(stored_name.startswith('cas/'))
+        self.assertEqual(StoredBlob.objects.get(name=stored_name).refcount, 3)
+        for name in legacy_names:
+            self.assertFalse(os.path.exists(os.path.join(TEST_MEDIA_ROOT, name)))
+        self.assertIn("into 1 blobs", out.getvalue())
+        self.assertIn("(66.7%)", out.getvalue())
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class SeedDataTests(TestCase):
+
+    def test_seeded_dataset_is_consistent(self):
+        mix = seed_dataset(requestees=5, workers=8, requests=200, images=3)
+        self.assertEqual(sum(mix.values()), 200)
+        self.assertEqual(set(mix), {'Pending', 'Assigned', 'Pending Approval', 'Completed'})
+        self.assertEqual(RequestStatusCount.totals_by_status(), {
+            status: mix.get(status, 0) for status in ('Pending', 'Assigned', 'Pending Approval', 'Completed')
+        })
+        busy = set(UserProfile.objects.filter(current_task__isnull=False).values_list('user_id', 'current_task_id'))
+        self.assertEqual(busy, set(WasteRequest.objects.filter(status='Assigned').values_list('assigned_worker_id', 'id')))
+        self.assertEqual(len(busy), mix['Assigned'])
+        self.assertLessEqual(len(busy), 4)
+        for worker in UserProfile.objects.filter(role='Worker'):
+            self.assertEqual(worker.update_average_rating(), (0, 0))
+        self.assertEqual(
+            sum(StoredBlob.objects.values_list('refcount', flat=True)),
+            200 + mix['Pending Approval'] + mix['Completed']
+        )
+        self.assertEqual(Group.objects.get(name='Worker').user_set.count(), 8)
+
+    def test_budget_check_reports_queries_and_latency(self):
+        results = {
+            'fast GET': {'queries': 3, 'p95_ms': 10.0},
+            'slow GET': {'queries': 9, 'p95_ms': 250.0},
+            'unbudgeted GET': {'queries': 100, 'p95_ms': 1000.0},
+        }
+        problems = check_budgets(results, {'fast GET': (5, 50), 'slow GET': (5, 200)})
+        self.assertEqual(problems, ['slow GET: 9 queries (budget 5)', 'slow GET: p95 250.0 ms (budget 200 ms)'])
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, CLEANIFY_METRICS_TOKEN='scrape-token')
+class RequestMetricsTests(TestCase):
+
+    def setUp(self):
+        get_registry().reset()
+
+    def test_requests_are_timed_and_counted(self):
+        requestee = make_user('student', 'Requestee')
+        make_request(requestee)
+        self.client.force_login(requestee)
+        response = self.client.get('/app/requestee/dashboard/')
+        self.assertRegex(response['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="5 queries"$')
+
+        metrics = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-token').content.decode()
+        self.assertIn('cleanify_http_requests_total{method="GET",status="200",view="requestee_dashboard"} 1', metrics)
+        self.assertIn('cleanify_db_queries_per_request_bucket{view="requestee_dashboard",le="5"} 1', metrics)
+        self.assertIn('cleanify_db_queries_per_request_sum{view="requestee_dashboard"} 5.0', metrics)
+        self.assertIn('cleanify_http_request_duration_seconds_count{view="requestee_dashboard"} 1', metrics)
+
+    def test_metrics_are_restricted(self):
+        # Loopback is not trusted by default: behind nginx every client arrives from it.
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='127.0.0.1').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong-token').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-token').status_code, 200)
+        with self.settings(CLEANIFY_METRICS_ALLOWED_IPS=['10.0.0.8']):
+            self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.8').status_code, 200)
+        self.client.force_login(User.objects.create_user(username='ops', is_staff=True))
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.8').status_code, 200)
+
+    def test_snapshots_of_all_processes_are_merged(self):
+        directory = tempfile.mkdtemp(dir=TEST_MEDIA_ROOT)
+        first, second = MetricsRegistry(directory), MetricsRegistry(directory)
+        for registry, duration in ((first, 0.02), (second, 0.3)):
+            registry.inc('cleanify_http_requests_total', {'view': 'v', 'method': 'GET', 'status': '200'})
+            registry.observe('cleanify_http_request_duration_seconds', {'view': 'v'}, duration)
+            registry.flush()
+        text = first.render()
+        self.assertIn('cleanify_http_requests_total{method="GET",status="200",view="v"} 2', text)
+        self.assertIn('cleanify_http_request_duration_seconds_bucket{view="v",le="0.025"} 1', text)
+        self.assertIn('cleanify_http_request_duration_seconds_bucket{view="v",le="0.5"} 2', text)
+        self.assertIn('cleanify_http_request_duration_seconds_count{view="v"} 2', text)
+
+    def test_snapshots_of_exited_processes_are_absorbed(self):
+        directory = tempfile.mkdtemp(dir=TEST_MEDIA_ROOT)
+        exited = subprocess.Popen([sys.executable, '-c', ''])
+        exited.wait()
+        registry = MetricsRegistry(directory)
+        registry.inc('cleanify_http_requests_total', {'view': 'v', 'method': 'GET', 'status': '200'})
+        dead = MetricsRegistry(directory)
+        dead._filename = f"{exited.pid}-deadbeef.json"
+        dead.inc('cleanify_http_requests_total', {'view': 'v', 'method': 'GET', 'status': '200'}, 4)
+        dead.flush()
+
+        for _ in range(2):
+            self.assertIn('cleanify_http_requests_total{method="GET",status="200",view="v"} 5', registry.render())
+        self.assertEqual(os.listdir(directory), [registry._filename])
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, ROOT_URLCONF=dashboards_urlconf(async_views))
+class AsyncDashboardTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.requestee = make_user('student', 'Requestee')
+        cls.worker = make_user('w1', 'Worker', 'Garbage Collection')
+        cls.admin = User.objects.create_user(username='ops', is_staff=True)
+        UserProfile.objects.filter(user=cls.worker).update(
+            current_task=make_request(cls.requestee, status='Assigned', assigned_worker=cls.worker)
+        )
+        make_request(cls.requestee, status='Pending Approval', assigned_worker=cls.worker)
+        make_request(cls.requestee, status='Completed', assigned_worker=cls.worker, approved_at=timezone.now(), worker_rating=4)
+
+    def setUp(self):
+        get_worker_pool().invalidate()
+
+    async def test_dashboards_render_the_same_data(self):
+        await self.async_client.aforce_login(self.requestee)
+        response = await self.async_client.get('/app/requestee/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['pending_approval_requests']), 1)
+        self.assertEqual(len(response.context['other_requests']), 2)
+
+        await self.async_client.aforce_login(self.worker)
+        response = await self.async_client.get('/app/worker/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['current_task'].status, 'Assigned')
+        self.assertEqual(len(response.context['completed_tasks']), 1)
+
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get('/app/admin/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_completed'], 1)
+        self.assertEqual(len(response.context['recent_assigned']), 1)
+        # Queries issued from the async ORM are still attributed to the request.
+        self.assertNotIn('desc="0 queries"', response['Server-Timing'])
+
+    async def test_roles_are_still_enforced(self):
+        await self.async_client.aforce_login(self.requestee)
+        response = await self.async_client.get('/app/admin/dashboard/')
+        self.assertEqual(response.status_code, 302)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class RoleCacheTests(TestCase):
+
+    def setUp(self):
+        get_worker_pool().invalidate()
+        self.requestee = make_user('student', 'Requestee')
+        self.client.force_login(self.requestee)
+
+    def test_role_checks_cost_no_queries_once_cached(self):
+        # Session + user are unavoidable; the cold request also reads the profile.
+        with self.assertNumQueries(3):
+            self.client.get('/dashboard-hub/')
+        with self.assertNumQueries(2):
+            response = self.client.get('/dashboard-hub/')
+        self.assertRedirects(response, '/app/requestee/dashboard/', fetch_redirect_response=False)
+        with self.assertNumQueries(2):
+            response = self.client.get('/app/worker/dashboard/')
+        self.assertEqual(response.status_code, 302)
+
+    def test_profile_save_invalidates_the_cached_role(self):
+        self.client.get('/dashboard-hub/')
+        profile = self.requestee.profile
+        profile.role, profile.category = 'Worker', 'Water Leakage'
+        profile.save()
+        response = self.client.get('/dashboard-hub/')
+        self.assertRedirects(response, '/app/worker/dashboard/', fetch_redirect_response=False)
+        self.assertEqual(get_role_info(User.objects.get(pk=self.requestee.pk)).category, 'Water Leakage')
+
+    def test_bulk_created_users_do_not_inherit_a_cached_role(self):
+        # A role cached under the next id, as left behind by a deleted user whose id is reused.
+        next_id = User.objects.order_by('-pk').values_list('pk', flat=True).first() + 1
+        get_role_cache().set(f"cleanify:role:{next_id}", ('Requestee', None, 0))
+        self.assertEqual(create_workers(1, prefix='bulk'), [next_id])
+        self.assertEqual(get_role_info(User.objects.get(pk=next_id)).role, 'Worker')
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, CLEANIFY_ASSIGNMENT_LONGPOLL_TIMEOUT=5, CLEANIFY_ASSIGNMENT_POLL_INTERVAL=5)
+class AssignmentLongPollTests(TestCase):
+
+    def setUp(self):
+        get_worker_pool().invalidate()
+        self.requestee = make_user('student', 'Requestee')
+        self.worker = make_user('w1', 'Worker', 'Garbage Collection')
+
+    def test_answers_at_once_when_the_page_is_out_of_date(self):
+        task = make_request(self.requestee)
+        find_and_assign_worker(task)
+        self.client.force_login(self.worker)
+        response = self.client.get('/app/worker/assignment/poll/', {'task': ''})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['task']['id'], task.pk)
+        self.assertEqual(response.json()['task']['complete_url'], f'/app/worker/task/{task.pk}/complete/')
+
+    @override_settings(CLEANIFY_ASSIGNMENT_LONGPOLL_TIMEOUT=0.05)
+    async def test_times_out_without_a_change(self):
+        await self.async_client.aforce_login(self.worker)
+        response = await self.async_client.get('/app/worker/assignment/poll/', {'task': ''})
+        self.assertEqual(response.status_code, 204)
+        self.assertNotIn('Retry-After', response)
+        self.assertEqual(get_notifier().waiting(), 0)
+
+    def test_wsgi_poll_answers_at_once_with_a_retry_interval(self):
+        self.client.force_login(self.worker)
+        started = time.perf_counter()
+        response = self.client.get('/app/worker/assignment/poll/', {'task': ''})
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertEqual((response.status_code, response['Retry-After']), (204, '15'))
+
+    def test_assignment_wakes_the_worker_after_commit(self):
+        notifier = get_notifier()
+        version = notifier.version(self.worker.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            find_and_assign_worker(make_request(self.requestee))
+        self.assertEqual(notifier.version(self.worker.pk), version + 1)
+
+    async def test_waiters_are_woken_from_another_thread(self):
+        notifier = AssignmentNotifier()
+        waiter = asyncio.create_task(notifier.wait(7, notifier.version(7), timeout=5))
+        await asyncio.sleep(0.01)
+        await asyncio.to_thread(notifier.notify, [7])
+        self.assertTrue(await asyncio.wait_for(waiter, 1))
+        self.assertFalse(await notifier.wait(7, notifier.version(7), timeout=0.01))
+
+    @override_settings(CLEANIFY_ASSIGNMENT_POLL_INTERVAL=0.05)
+    async def test_database_fallback_sees_assignments_from_other_processes(self):
+        task = await sync_to_async(make_request)(self.requestee)
+        await self.async_client.aforce_login(self.worker)
+        poll = asyncio.create_task(self.async_client.get('/app/worker/assignment/poll/', {'task': ''}))
+        await asyncio.sleep(0.1)
+        self.assertFalse(poll.done())
+        # A bare UPDATE sends no signal, like a claim made in another server process.
+        await WasteRequest.objects.filter(pk=task.pk).aupdate(status='Assigned', assigned_worker=self.worker)
+        response = await asyncio.wait_for(poll, 2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['task']['id'], task.pk)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class CurrentTaskTests(TestCase):
+
+    def setUp(self):
+        get_worker_pool().invalidate()
+        self.requestee = make_user('student', 'Requestee')
+        self.worker = make_user('w1', 'Worker', 'Garbage Collection')
+
+    def current_task_id(self, worker):
+        return UserProfile.objects.values_list('current_task_id', flat=True).get(user=worker)
+
+    def test_current_task_follows_assignment_completion_and_rejection(self):
+        task = make_request(self.requestee)
+        self.assertTrue(find_and_assign_worker(task))
+        self.assertEqual(self.current_task_id(self.worker), task.pk)
+
+        self.client.force_login(self.worker)
+        proof = SimpleUploadedFile('done.png', placeholder_image_bytes(), content_type='image/png')
+        self.client.post(f'/app/worker/task/{task.pk}/complete/', {'completion_image': proof})
+        self.assertIsNone(self.current_task_id(self.worker))
+
+        # Rejected work goes back to the queue and straight to the (now free) worker again.
+        self.client.force_login(self.requestee)
+        self.client.post(f'/app/requestee/request/{task.pk}/review/', {'worker_rating': 2})
+        self.assertEqual(self.current_task_id(self.worker), task.pk)
+
+    def test_worker_dashboard_is_one_read_for_profile_and_task(self):
+        task = make_request(self.requestee)
+        find_and_assign_worker(task)
+        self.client.force_login(self.worker)
+        self.client.get('/app/worker/dashboard/')
+        get_fragment_cache().clear()
+        # Session, user, profile joined with task and requestee, completed history.
+        with self.assertNumQueries(4) as queries:
+            response = self.client.get('/app/worker/dashboard/')
+        self.assertFalse([q for q in queries.captured_queries if not q['sql'].startswith('SELECT')])
+        self.assertEqual(response.context['current_task'], task)
+        self.assertEqual(response.context['current_task'].requestee, self.requestee)
+
+    def test_update_busy_status_repairs_hand_edits(self):
+        task = make_request(self.requestee, status='Assigned', assigned_worker=self.worker)
+        profile = UserProfile.objects.get(user=self.worker)
+        profile.update_busy_status()
+        self.assertEqual(self.current_task_id(self.worker), task.pk)
+        WasteRequest.objects.filter(pk=task.pk).update(status='Completed')
+        profile.update_busy_status()
+        self.assertIsNone(self.current_task_id(self.worker))
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class ImportDataTests(TestCase):
+
+    def setUp(self):
+        get_worker_pool().invalidate()
+        self.directory = tempfile.mkdtemp(prefix='cleanify-import-')
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        with open(os.path.join(self.directory, 'issue.png'), 'wb') as f:
+            f.write(placeholder_image_bytes())
+        self.users = self.write('users.csv', (
+            "username,email,first_name,last_name,role,category\n"
+            "ana,ana@campus.edu,Ana,R,Requestee,\n"
+            "ben,ben@campus.edu,Ben,W,Worker,Garbage Collection\n"
+            "cy,,Cy,W,Worker,Garbage Collection\n"
+            "bad worker,,,,Worker,\n"
+            "dup,ana@campus.edu,,,Requestee,\n"
+        ))
+        rows = [
+            {'requestee': 'ana', 'category': 'Garbage Collection', 'location': 'Hall 1', 'request_image': 'issue.png',
+             'status': 'Completed', 'assigned_worker': 'ben', 'worker_rating': 4, 'completion_image': 'issue.png',
+             'created_at': '2025-03-01T09:00:00', 'approved_at': '2025-03-02T09:00:00'},
+            {'requestee': 'ana', 'category': 'Garbage Collection', 'location': 'Hall 2', 'request_image': 'issue.png',
+             'status': 'Assigned', 'assigned_worker': 'ben'},
+            {'requestee': 'ana', 'category': 'Garbage Collection', 'location': 'Hall 3', 'request_image': 'missing.png'},
+            {'requestee': 'ben', 'category': 'Garbage Collection', 'location': 'Hall 4', 'request_image': 'issue.png'},
+        ]
+        self.requests = self.write('requests.jsonl', ''.join(json.dumps(row) + '\n' for row in rows) + 'not json\n')
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_imports_in_batches_and_reports_rejected_rows(self):
+        out = StringIO()
+        call_command('import_data', users=self.users, requests=self.requests, batch_size=2, stdout=out)
+        output = out.getvalue()
+
+        self.assertEqual(set(User.objects.values_list('username', flat=True)), {'ana', 'ben', 'cy'})
+        self.assertFalse(User.objects.get(username='ben').has_usable_password())
+        self.assertEqual(Group.objects.get(name='Worker').user_set.count(), 2)
+        self.assertIn('users (users.csv): 3/5 rows imported, 2 rejected', output)
+        self.assertIn('requests (requests.jsonl): 2/5 rows imported, 3 rejected, 1 Assigned rows requeued', output)
+        self.assertIn("image 'missing.png' not found", output)
+        self.assertIn("requestee 'ben' is not a requestee", output)
+        self.assertIn('rows/s', output)
+
+        completed = WasteRequest.objects.get(location='Hall 1')
+        self.assertEqual(completed.created_at.isoformat()[:10], '2025-03-01')
+        self.assertEqual(completed.approved_at.isoformat()[:10], '2025-03-02')
+        self.assertEqual(UserProfile.objects.get(user__username='ben').average_rating, 4.0)
+        # One stored blob referenced by both images of Hall 1 and the request image of Hall 2.
+        self.assertEqual(list(StoredBlob.objects.values_list('refcount', flat=True)), [3])
+        # The requeued request went to the free worker in the closing dispatch.
+        requeued = WasteRequest.objects.get(location='Hall 2')
+        self.assertEqual(requeued.status, 'Assigned')
+        self.assertEqual(UserProfile.objects.get(user=requeued.assigned_worker).current_task, requeued)
+        self.assertEqual(RequestStatusCount.rebuild(), {})
+
+    def test_dry_run_saves_nothing(self):
+        out = StringIO()
+        call_command('import_data', users=self.users, requests=self.requests, dry_run=True, stdout=out)
+        self.assertIn('Dry run', out.getvalue())
+        self.assertIn('2/5 rows imported', out.getvalue())
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(StoredBlob.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class ExportTests(TestCase):
+
+    def setUp(self):
+        get_worker_pool().invalidate()
+        self.requestee = make_user('student', 'Requestee')
+        self.worker = make_user('w1', 'Worker', 'Garbage Collection')
+        self.old = make_request(self.requestee, description='Bins, "overflowing"')
+        WasteRequest.objects.filter(pk=self.old.pk).update(created_at=timezone.now() - timedelta(days=30))
+        self.assigned = make_request(self.requestee)
+        find_and_assign_worker(self.assigned)
+        self.water = make_request(self.requestee, category='Water Leakage')
+
+    def test_endpoint_streams_filtered_csv_to_staff_only(self):
+        self.client.force_login(self.requestee)
+        self.assertEqual(self.client.get('/app/admin/export/').status_code, 302)
+
+        self.client.force_login(User.objects.create_user(username='ops', is_staff=True))
+        response = self.client.get('/app/admin/export/')
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment; filename="cleanify-requests-', response['Content-Disposition'])
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0][:4], ['id', 'created_at', 'updated_at', 'status'])
+        self.assertEqual([int(row[0]) for row in rows[1:]], [self.old.pk, self.assigned.pk, self.water.pk])
+        self.assertEqual(rows[1][6], 'Bins, "overflowing"')
+
+        response = self.client.get('/app/admin/export/', {'worker': 'w1', 'status': ['Assigned', 'Pending']})
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual([(int(row[0]), row[8]) for row in rows[1:]], [(self.assigned.pk, 'w1')])
+
+        since = (timezone.localdate() - timedelta(days=1)).isoformat()
+        response = self.client.get('/app/admin/export/', {'since': since, 'category': 'Water Leakage', 'format': 'jsonl'})
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([line['id'] for line in lines], [self.water.pk])
+        self.assertEqual(self.client.get('/app/admin/export/', {'status': 'Lost'}).status_code, 400)
+
+    def test_command_writes_the_same_rows(self):
+        out = StringIO()
+        until = (timezone.localdate() - timedelta(days=10)).isoformat()
+        call_command('export_requests', until=until, format='jsonl', stdout=out)
+        self.assertEqual([json.loads(line)['id'] for line in out.getvalue().splitlines()], [self.old.pk])
+
+        path = os.path.join(TEST_MEDIA_ROOT, 'export.csv')
+        call_command('export_requests', output=path, chunk_size=1, stderr=StringIO())
+        with open(path, newline='') as f:
+            self.assertEqual(len(list(csv.reader(f))), 4)
+
+    def test_csv_cells_cannot_start_a_formula(self):
+        WasteRequest.objects.filter(pk=self.water.pk).update(location='=HYPERLINK("http://x")', description='-2+3')
+        out = StringIO()
+        call_command('export_requests', category=['Water Leakage'], stdout=out)
+        row = list(csv.reader(out.getvalue().splitlines()))[1]
+        self.assertEqual(row[5:7], ['\'=HYPERLINK("http://x")', "'-2+3"])
+
+        out = StringIO()
+        call_command('export_requests', category=['Water Leakage'], format='jsonl', stdout=out)
+        self.assertEqual(json.loads(out.getvalue())['description'], '-2+3')
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class SlaRollupTests(TestCase):
+
+    def setUp(self):
+        get_worker_pool().invalidate()
+        self.requestee = make_user('student', 'Requestee')
+        self.worker = make_user('w1', 'Worker', 'Garbage Collection')
+
+    def submit(self, task):
+        self.client.force_login(self.worker)
+        proof = SimpleUploadedFile('done.png', placeholder_image_bytes(), content_type='image/png')
+        self.client.post(f'/app/worker/task/{task.pk}/complete/', {'completion_image': proof})
+        self.client.force_login(self.requestee)
+
+    def rollup(self, category='Garbage Collection'):
+        return SlaRollup.objects.get(day=timezone.localdate(), category=category)
+
+    def test_transitions_update_rollups_and_rebuild_agrees(self):
+        task = make_request(self.requestee)
+        WasteRequest.objects.filter(pk=task.pk).update(created_at=timezone.now() - timedelta(hours=2))
+        task.refresh_from_db()
+        make_request(self.requestee, category='Water Leakage')
+        self.assertTrue(find_and_assign_worker(task))
+        self.submit(task)
+        self.client.post(f'/app/requestee/request/{task.pk}/review/', {'worker_rating': 2})
+        self.submit(task)
+        self.client.post(f'/app/requestee/request/{task.pk}/review/', {'approve': 'on', 'worker_rating': 5})
+
+        rollup = self.rollup()
+        self.assertEqual((rollup.created, rollup.assigned, rollup.approved, rollup.rejected), (1, 2, 1, 1))
+        self.assertAlmostEqual(rollup.assign_seconds / rollup.assigned, 7200, delta=60)
+        self.assertAlmostEqual(rollup.complete_seconds, 7200, delta=60)
+        self.assertEqual(self.rollup('Water Leakage').created, 1)
+
+        # The rebuild only sees the latest assignment, but keeps the recorded rejection.
+        SlaRollup.objects.update(created=0, approved=0)
+        SlaRollup.rebuild()
+        rollup = self.rollup()
+        self.assertEqual((rollup.created, rollup.assigned, rollup.approved, rollup.rejected), (1, 1, 1, 1))
+        self.assertEqual(SlaRollup.objects.count(), 2)
+
+    def test_sla_page_reads_only_rollups(self):
+        task = make_request(self.requestee)
+        find_and_assign_worker(task)
+        self.client.force_login(self.requestee)
+        self.assertEqual(self.client.get('/app/admin/sla/').status_code, 302)
+
+        self.client.force_login(User.objects.create_user(username='ops', is_staff=True))
+        with self.assertNumQueries(4) as queries:
+            response = self.client.get('/app/admin/sla/', {'days': 7})
+        self.assertFalse([q for q in queries.captured_queries if 'waste_management_wasterequest' in q['sql']])
+        garbage = response.context['by_category'][0]
+        self.assertEqual((garbage['category'], garbage['created'], garbage['assigned']), ('Garbage Collection', 1, 1))
+        self.assertEqual(garbage['approval'], '---')
+        self.assertEqual([row['day'] for row in response.context['by_day']], [timezone.localdate()])
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, CLEANIFY_PRIORITY_HEAD_START_HOURS={1: 0, 2: 2, 3: 8, 4: 24}, CLEANIFY_REJECTION_HEAD_START_HOURS=4)
+class PriorityQueueTests(TestCase):
+
+    def setUp(self):
+        get_worker_pool().invalidate()
+        self.requestee = make_user('student', 'Requestee')
+        self.worker = make_user('w1', 'Worker', 'Garbage Collection')
+        occupy(self.worker)
+
+    def age(self, request, hours):
+        WasteRequest.objects.filter(pk=request.pk).update(queue_at=F('queue_at') - timedelta(hours=hours))
+
+    def next_for_worker(self):
+        set_free(self.worker)
+        self.worker.profile.refresh_from_db()
+        return assign_next_pending(self.worker).request_id
+
+    def test_priority_jumps_the_queue_but_old_work_does_not_starve(self):
+        low = make_request(self.requestee, priority=1)
+        self.age(low, 3)
+        urgent = make_request(self.requestee, priority=4)
+        self.assertEqual(self.next_for_worker(), urgent.pk)
+
+        # A Low request that has waited longer than Urgent's head start is served first.
+        starving = make_request(self.requestee, priority=1)
+        self.age(starving, 25)
+        second_urgent = make_request(self.requestee, priority=4)
+        self.assertEqual(self.next_for_worker(), starving.pk)
+        self.assertEqual(self.next_for_worker(), second_urgent.pk)
+        self.assertEqual(self.next_for_worker(), low.pk)
+
+    def test_priority_changes_and_rejections_move_the_request_forward(self):
+        self.client.force_login(self.requestee)
+        image = SimpleUploadedFile('issue.png', placeholder_image_bytes(), content_type='image/png')
+        self.client.post('/app/requestee/request/new/', {
+            'category': 'Garbage Collection', 'priority': 3, 'location': 'Library', 'request_image': image,
+        })
+        task = WasteRequest.objects.get(requestee=self.requestee)
+        self.assertEqual(task.priority, 3)
+        self.assertAlmostEqual((task.created_at - task.queue_at).total_seconds(), 8 * 3600, delta=5)
+
+        queued = task.queue_at
+        task.priority = 2
+        task.save(update_fields=['priority'])
+        task.refresh_from_db()
+        self.assertEqual(queued + timedelta(hours=6), task.queue_at)
+
+        WasteRequest.objects.filter(pk=task.pk).update(status='Pending Approval', assigned_worker=self.worker)
+        self.client.post(f'/app/requestee/request/{task.pk}/review/', {'worker_rating': 2})
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'Pending')
+        self.assertEqual(queued + timedelta(hours=2), task.queue_at)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class SearchTests(TestCase):
+
+    def setUp(self):
+        get_worker_pool().invalidate()
+        self.requestee = make_user('student', 'Requestee')
+
+    def matches(self, query):
+        return [pk for pk, _rank, _snippet in ranked_matches(query)]
+
+    def test_index_follows_saves_updates_and_deletes(self):
+        in_description = make_request(self.requestee, location='Hostel 4', description='Pipe leaking near the library door')
+        in_location = make_request(self.requestee, location='Library, 2nd floor', description='Bins overflowing')
+        WasteRequest.objects.bulk_create([WasteRequest(
+            requestee=self.requestee, category='Water Leakage', location='Canteen', description='Tap dripping',
+            request_image='request_images/x.png', queue_at=timezone.now(),
+        )])
+        # A hit in the location outranks one in the description; prefixes match; FTS syntax is inert.
+        self.assertEqual(self.matches('libr'), [in_location.pk, in_description.pk])
+        self.assertEqual(self.matches('leaking library'), [in_description.pk])
+        self.assertEqual(len(self.matches('tap "dripping*')), 1)
+        self.assertEqual(self.matches('***'), [])
+
+        in_location.location = 'Canteen'
+        in_location.save()
+        WasteRequest.objects.filter(pk=in_description.pk).update(description='Fixed')
+        self.assertEqual(self.matches('library'), [])
+        self.assertEqual(len(self.matches('canteen')), 2)
+        in_location.delete()
+        self.assertEqual(len(self.matches('canteen')), 1)
+
+    def test_admin_changelist_and_staff_endpoint_are_ranked(self):
+        worker = make_user('w1', 'Worker', 'Garbage Collection')
+        by_worker = make_request(self.requestee, location='Canteen', status='Assigned', assigned_worker=worker)
+        in_description = make_request(self.requestee, location='Hostel 4', description='Bins near the library')
+        in_location = make_request(self.requestee, location='Library')
+        self.assertEqual(list(search_requests(WasteRequest.objects.all(), 'w1', usernames=True)), [by_worker])
+
+        self.client.force_login(self.requestee)
+        self.assertEqual(self.client.get('/app/admin/search/', {'q': 'library'}).status_code, 302)
+        admin = User.objects.create_superuser(username='ops', password='x')
+        self.client.force_login(admin)
+        response = self.client.get('/admin/waste_management/wasterequest/', {'q': 'library'})
+        self.assertEqual(list(response.context['cl'].result_list), [in_location, in_description])
+        self.assertEqual(response.context['cl'].result_count, 2)
+
+        results = self.client.get('/app/admin/search/', {'q': 'library', 'limit': 5}).json()['results']
+        self.assertEqual([result['id'] for result in results], [in_location.pk, in_description.pk])
+        self.assertEqual(results[1]['snippet'], 'Bins near the [library]')
+
+    def test_admin_search_matches_username_and_category_prefixes(self):
+        worker = make_user('walter', 'Worker', 'Water Leakage')
+        by_worker = make_request(self.requestee, category='Water Leakage', location='Canteen', status='Assigned', assigned_worker=worker)
+        in_location = make_request(self.requestee, category='Garbage Collection', location='Library')
+        admin = WasteRequestAdmin(WasteRequest, admin_site)
+
+        def search(term):
+            results, _duplicates = admin.get_search_results(None, WasteRequest.objects.all(), term)
+            return list(results)
+
+        self.assertEqual(search('walt'), [by_worker])
+        self.assertEqual(search('stud'), [by_worker, in_location])
+        self.assertEqual(search('leak'), [by_worker])
+        self.assertEqual(search('garbage library'), [in_location])
+        self.assertEqual(search('library walter'), [])
+        # Requests found in the text come first, then those found only through a username.
+        in_text = make_request(self.requestee, location='Walter Hall')
+        self.assertEqual(search('walt'), [in_text, by_worker])
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, CLEANIFY_ADMIN_COUNT_CAP=3)
+class AdminChangelistTests(TestCase):
+
+    def setUp(self):
+        get_worker_pool().invalidate()
+        self.client.force_login(User.objects.create_superuser(username='ops', password='x'))
+
+    def add_rows(self, count):
+        for _ in range(count):
+            requestee = make_user(f"student{User.objects.count()}", 'Requestee')
+            worker = make_user(f"worker{User.objects.count()}", 'Worker', 'Garbage Collection')
+            make_request(requestee, status='Assigned', assigned_worker=worker)
+
+    def queries_for(self, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data or {})
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_the_page(self):
+        pages = ['/admin/waste_management/wasterequest/', '/admin/waste_management/userprofile/', '/admin/auth/user/']
+        self.add_rows(1)
+        few = [self.queries_for(url) for url in pages]
+        self.add_rows(4)
+        self.assertEqual([self.queries_for(url) for url in pages], few)
+        # Session, user, then the page: requests are counted from RequestStatusCount, and the
+        # date hierarchy needs first/last created_at plus one probe for the single day they span.
+        self.assertEqual(few, [8, 4, 5])
+
+    def test_request_counts_come_from_counters_or_stop_at_the_cap(self):
+        self.add_rows(5)
+        url = '/admin/waste_management/wasterequest/'
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'status__exact': 'Assigned'})
+        self.assertEqual(response.context['cl'].result_count, 5)
+        self.assertFalse([q for q in queries.captured_queries if 'COUNT(' in q['sql']])
+        matching = WasteRequest.objects.filter(priority=2).order_by('pk')
+        total = matching.count()
+        capped = EstimatedCountPaginator(matching, 1)
+        self.assertEqual((capped.count, capped.count_capped), (3, True))
+        # Deeper pages count on to the end of the next page, so the last row is still reachable.
+        last = EstimatedCountPaginator(matching, 1, page=total)
+        self.assertEqual((last.count, last.count_capped), (total, False))
+        self.assertEqual(list(last.page(total)), [matching.last()])
+        listed = self.client.get(url, {'priority__exact': 2}).context['cl']
+        self.assertEqual((listed.result_count, listed.paginator.count_capped), (total, False))
+
+        # The date hierarchy's probes give the same periods as the stock row-by-row DISTINCT.
+        old = WasteRequest.objects.first()
+        WasteRequest.objects.filter(pk=old.pk).update(created_at=old.created_at - timedelta(days=45))
+        # Only the changelist's queryset probes; the model's own datetimes() is Django's.
+        self.assertIsInstance(WasteRequest.objects.datetimes('created_at', 'day'), QuerySet)
+        requests = WasteRequestAdmin(WasteRequest, admin_site).get_queryset(RequestFactory().get(url))
+        self.assertEqual(requests.datetimes('created_at', 'day'), list(QuerySet.datetimes(requests, 'created_at', 'day')))
+        self.assertEqual(
+            requests.datetimes('created_at', 'month', order='DESC'),
+            list(QuerySet.datetimes(requests, 'created_at', 'month', order='DESC')),
+        )
+
+
+# The default (local memory) cache, whichever backend CLEANIFY_FRAGMENT_CACHE_BACKEND picked.
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, CLEANIFY_FRAGMENT_CACHE='default')
+class DashboardFragmentCacheTests(TestCase):
+
+    def setUp(self):
+        get_worker_pool().invalidate()
+        get_fragment_cache().clear()
+        get_registry().reset()
+        self.requestee = make_user('student', 'Requestee')
+        self.worker = make_user('w1', 'Worker', 'Garbage Collection')
+
+    def test_repeat_view_is_served_from_cache_until_a_request_is_saved(self):
+        make_request(self.requestee, location='Library')
+        self.client.force_login(self.requestee)
+        self.client.get('/app/requestee/dashboard/')
+        # Session and user only: the fragment is current, so no request is loaded.
+        with self.assertNumQueries(2):
+            response = self.client.get('/app/requestee/dashboard/')
+        self.assertContains(response, 'Library')
+
+        make_request(self.requestee, location='Gymnasium')
+        self.assertContains(self.client.get('/app/requestee/dashboard/'), 'Gymnasium')
+        metrics = get_registry().render()
+        self.assertIn('cleanify_fragment_cache_total{fragment="requestee_dashboard",result="hit"} 1', metrics)
+        self.assertIn('cleanify_fragment_cache_total{fragment="requestee_dashboard",result="miss"} 2', metrics)
+
+    def test_bulk_assignment_refreshes_every_affected_dashboard(self):
+        task = make_request(self.requestee, location='Chemistry Lab')
+        admin = User.objects.create_user(username='ops', is_staff=True)
+        pages = {
+            self.requestee: '/app/requestee/dashboard/',
+            self.worker: '/app/worker/dashboard/',
+            admin: '/app/admin/dashboard/',
+        }
+        for user, url in pages.items():
+            self.client.force_login(user)
+            self.client.get(url)
+
+        # Conditional UPDATEs only: no post_save, so the transition signal has to do it.
+        self.assertTrue(claim_assignment(task.pk, self.worker.pk))
+        self.client.force_login(self.requestee)
+        self.assertContains(self.client.get(pages[self.requestee]), '>w1<')
+        self.client.force_login(self.worker)
+        self.assertContains(self.client.get(pages[self.worker]), 'Garbage Collection at Chemistry Lab')
+        self.client.force_login(admin)
+        self.assertEqual(str(self.client.get(pages[admin]).context['total_assigned']), '1')
+
+
+@override_settings(
+    STATIC_ROOT=os.path.join(TEST_MEDIA_ROOT, 'static-root'),
+    STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+    STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'waste_management.staticfiles.CompressedManifestStaticFilesStorage'},
+    },
+    CLEANIFY_SERVE_STATIC=True,
+)
+class StaticAssetTests(TestCase):
+
+    def test_collected_stylesheet_is_served_compressed_and_cached_for_good(self):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        page = self.client.get('/').content.decode()
+        url = re.search(r'href="(/static/css/cleanify\.[0-9a-f]{12}\.css)"', page).group(1)
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertLess(int(response['Content-Length']), os.path.getsize(os.path.join(settings.STATIC_ROOT, url[len('/static/'):])))
+        self.assertEqual(response['Content-Type'], 'text/css; charset=utf-8')
+        revalidated = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+
+        # The unhashed name still works, briefly cached and uncompressed for a client that asks for nothing.
+        plain = self.client.get('/static/css/cleanify.css')
+        self.assertEqual(plain['Cache-Control'], 'public, max-age=60')
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertTrue(b''.join(plain.streaming_content).startswith(b'/*! tailwindcss'))
+
+    def test_candidates_and_minifier(self):
+        template = os.path.join(TEST_MEDIA_ROOT, 'scan.html')
+        with open(template, 'w') as f:
+            f.write('<div class="sm:flex-row {% if x %}bg-green-200{% endif %}"><p>Hi 3</p></div>')
+        candidates = scan_candidates([template])
+        self.assertLessEqual({'sm:flex-row', 'bg-green-200'}, candidates)
+        self.assertFalse({'{%', '%}', '3'} & candidates)
+        self.assertEqual(
+            minify_css('/*! keep */\n/* drop */\n.a , .b {\n  content: "x ; y" ;\n  margin: 0 auto;\n}\n'),
+            '/*! keep */ .a,.b{content: "x ; y";margin: 0 auto}\n',
+        )
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class MediaViewTests(TestCase):
+
+    def setUp(self):
+        get_worker_pool().invalidate()
+        self.requestee = make_user('owner', 'Requestee')
+        self.worker = make_user('sweeper', 'Worker', 'Garbage Collection')
+        self.waste_request = make_request(self.requestee, status='Assigned', assigned_worker=self.worker)
+        self.url = self.waste_request.request_image.url
+
+    def test_only_parties_and_staff_see_a_requests_images(self):
+        stranger = make_user('stranger', 'Requestee')
+        thumb = derivative_name(self.waste_request.request_image.name, 'thumb')
+        os.makedirs(os.path.dirname(os.path.join(TEST_MEDIA_ROOT, thumb)), exist_ok=True)
+        with open(os.path.join(TEST_MEDIA_ROOT, thumb), 'wb') as f:
+            f.write(b'thumb-bytes')
+        WasteRequest.objects.filter(pk=self.waste_request.pk).update(request_image_thumb=thumb)
+
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+        for user in (self.requestee, self.worker, User.objects.create_user(username='ops', is_staff=True)):
+            self.client.force_login(user)
+            self.assertEqual(b''.join(self.client.get(self.url).streaming_content), b'fake-image-bytes')
+            self.assertEqual(self.client.get(settings.MEDIA_URL + thumb).status_code, 200)
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+        self.assertEqual(self.client.get('/media/../manage.py').status_code, 404)
+
+        self.client.force_login(stranger)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(self.client.get(settings.MEDIA_URL + thumb).status_code, 404)
+        # Uploading the same photo stores one shared file (and renditions), which the stranger's own request now shows.
+        make_request(stranger)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(self.client.get(settings.MEDIA_URL + thumb).status_code, 200)
+
+    def test_conditional_range_and_offloaded_responses(self):
+        self.client.force_login(self.requestee)
+        full = self.client.get(self.url)
+        self.assertEqual(full['Cache-Control'], 'private, max-age=31536000, immutable')
+        self.assertEqual(full['Accept-Ranges'], 'bytes')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=full['ETag']).status_code, 304)
+
+        head = self.client.get(self.url, HTTP_RANGE='bytes=0-3')
+        self.assertEqual((head.status_code, head['Content-Range']), (206, 'bytes 0-3/16'))
+        self.assertEqual(b''.join(head.streaming_content), b'fake')
+        tail = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(tail.streaming_content), b'bytes')
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=16-')['Content-Range'], 'bytes */16')
+        # A range against an older copy gets the whole current file.
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=0-3', HTTP_IF_RANGE='"stale"').status_code, 200)
+
+        with override_settings(CLEANIFY_MEDIA_OFFLOAD='x-accel-redirect'):
+            offloaded = self.client.get(self.url)
+        self.assertEqual(offloaded['X-Accel-Redirect'], '/protected-media/' + self.waste_request.request_image.name)
+        self.assertEqual(offloaded.content, b'')
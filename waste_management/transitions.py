@@ -0,0 +1,22 @@
+
+from collections import namedtuple
+
+from django.dispatch import Signal
+
+
+# One WasteRequest moving between statuses (or categories). old_status is None for a newly
+# created request and new_status is None for a deleted one. requestee_id may be None where
+# the sender did not have it to hand.
+Transition = namedtuple('Transition', [
+    'request_id', 'category', 'old_status', 'new_status', 'worker_id', 'created_at', 'at', 'old_category',
+    'requestee_id',
+], defaults=[None])
+
+# Sent with sender=WasteRequest and transitions=[Transition, ...], inside the transaction
+# that made the change. Bulk paths (assignment engine, dispatcher) send one signal per batch.
+request_status_changed = Signal()
+
+
+def notify_transitions(sender, transitions):
+    if transitions:
+        request_status_changed.send(sender=sender, transitions=transitions)
@@ -1,20 +1,30 @@
 
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+if settings.CLEANIFY_ASYNC_DASHBOARDS:
+    from . import async_views as dashboards
+else:
+    dashboards = views
 
 urlpatterns = [
     
-    path('requestee/dashboard/', views.requestee_dashboard, name='requestee_dashboard'),
+    path('requestee/dashboard/', dashboards.requestee_dashboard, name='requestee_dashboard'),
     path('requestee/request/new/', views.create_request_view, name='create_request'),
     path('requestee/request/<int:request_id>/review/', views.approve_request_view, name='approve_request'), 
 
     
-    path('worker/dashboard/', views.worker_dashboard, name='worker_dashboard'),
+    path('worker/dashboard/', dashboards.worker_dashboard, name='worker_dashboard'),
     path('worker/task/<int:request_id>/complete/', views.complete_task_view, name='complete_task'),
+    path('worker/assignment/poll/', async_views.worker_assignment_poll, name='worker_assignment_poll'),
 
    
-    path('admin/dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin/dashboard/', dashboards.admin_dashboard, name='admin_dashboard'),
     path('admin/request/<int:request_id>/manual_assign/', views.admin_manual_assign_view, name='admin_manual_assign'), 
+    path('admin/export/', views.admin_export_view, name='admin_export'),
+    path('admin/sla/', views.admin_sla_view, name='admin_sla'),
+    path('admin/search/', views.admin_search_view, name='admin_search'),
 
    
 ]
\ No newline at end of file
@@ -7,11 +7,35 @@ from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
 from django.contrib.auth.forms import AuthenticationForm, UserCreationForm 
 from django.contrib import messages
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Q
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.http import require_safe
+from datetime import timedelta
+import hmac
 import logging
 
 
-from .models import WasteRequest, UserProfile 
+from .models import WasteRequest, UserProfile, RequestStatusCount, SlaRollup
+from .assignment import (
+    assign_request,
+    assign_next_pending,
+    manual_assign,
+    apply_result,
+    LOST_REQUEST,
+    LOST_WORKER
+)
+from .derivatives import schedule_derivatives, discard_derivatives
+from .fragment_cache import ADMIN_SCOPE, user_scope
+from .pagination import keyset_page
+from .media import can_view, media_path, serve_media
+from .metrics import get_registry
+from .exporting import CONTENT_TYPES, FORMATS as EXPORT_FORMATS, export_lines, export_queryset
+from .roles import get_role_info, has_role
+from .search import DEFAULT_LIMIT as SEARCH_DEFAULT_LIMIT, MAX_LIMIT as SEARCH_MAX_LIMIT, ranked_matches, search_available, search_requests
 from .forms import (
     CustomUserCreationForm,
     RequestCreationForm,
@@ -22,19 +46,22 @@ from .forms import (
 
 logger = logging.getLogger(__name__)
 
+REQUEST_HISTORY_PAGE_SIZE = 20
+WORKER_HISTORY_PAGE_SIZE = 10
+
 def requestee_required(function=None, login_url='login'):
-    """ Decorator for views that require Requestee role via UserProfile. """
+    """ Decorator for views that require Requestee role via UserProfile (cached, see roles.py). """
     actual_decorator = user_passes_test(
-            lambda u: u.is_authenticated and hasattr(u, 'profile') and u.profile.role == 'Requestee',
+            lambda u: has_role(u, 'Requestee'),
             login_url=login_url
         )
     if function: return actual_decorator(function)
     return actual_decorator
 
 def worker_required(function=None, login_url='login'):
-    """ Decorator for views that require Worker role via UserProfile. """
+    """ Decorator for views that require Worker role via UserProfile (cached, see roles.py). """
     actual_decorator = user_passes_test(
-            lambda u: u.is_authenticated and hasattr(u, 'profile') and u.profile.role == 'Worker',
+            lambda u: has_role(u, 'Worker'),
             login_url=login_url
         )
     if function: return actual_decorator(function)
@@ -49,34 +76,23 @@ def admin_required(function=None, login_url='login'):
     if function: return actual_decorator(function)
     return actual_decorator
 
-def find_and_assign_worker(request_instance):
+def find_and_assign_worker(request_instance, exclude=None):
     """
     Tries to find a *free* worker of the *matching category* and assign the request.
-    Returns True if assigned, False otherwise. Uses UserProfile.
+    Returns True if assigned, False otherwise. The claim itself is atomic (see assignment.py).
+    The worker ID `exclude` is only chosen if no other worker is free.
     """
     category = request_instance.category
     logger.debug(f"Attempting auto-assignment for Request ID: {request_instance.id}, Category: {category}")
-    available_workers = User.objects.filter(
-        profile__role='Worker',
-        profile__category=category,
-        profile__is_busy=False,
-        is_active=True
-    ).order_by('?')
-    worker_to_assign = available_workers.first()
-    if worker_to_assign:
-        request_instance.assigned_worker = worker_to_assign
-        request_instance.assigned_at = timezone.now()
-        request_instance.status = 'Assigned'
-        request_instance.save(update_fields=['assigned_worker', 'assigned_at', 'status'])
-        try:
-            worker_profile = worker_to_assign.profile
-            worker_profile.is_busy = True
-            worker_profile.save(update_fields=['is_busy'])
-        except UserProfile.DoesNotExist:
-             logger.error(f"UserProfile not found for assigned worker {worker_to_assign.username} during auto-assignment!")
-             pass
-        logger.info(f"Auto-assigned Request ID: {request_instance.id} to Worker: {worker_to_assign.username}")
+    result = assign_request(request_instance, exclude=exclude)
+    if result:
+        apply_result(request_instance, result)
+        logger.info(f"Auto-assigned Request ID: {request_instance.id} to Worker: {request_instance.assigned_worker.username}")
         return True
+    elif result.outcome == LOST_REQUEST:
+        logger.info(f"Request ID: {request_instance.id} was claimed concurrently by another assignment.")
+        request_instance.refresh_from_db()
+        return False
     else:
         logger.info(f"No free worker found for Request ID: {request_instance.id} (Category: {category}). Status remains Pending.")
         if request_instance.status != 'Pending':
@@ -92,21 +108,16 @@ def try_assign_pending_task_to_worker(worker):
     if not worker or not hasattr(worker, 'profile') or worker.profile.role != 'Worker':
         logger.warning(f"Attempted to assign task to non-worker or user without profile: {worker}")
         return
-    worker.profile.refresh_from_db()
-    if worker.profile.is_busy:
-        logger.debug(f"Worker {worker.username} is busy, skipping pending task check.")
-        return
     category = worker.profile.category
     if not category:
          logger.warning(f"Worker {worker.username} has no category, cannot assign tasks.")
          return
     logger.debug(f"Checking for pending tasks for free Worker: {worker.username}, Cat: {category}")
-    pending_request = WasteRequest.objects.filter(
-        status='Pending', category=category
-    ).order_by('created_at').first()
-    if pending_request:
-        logger.info(f"Found pending Request ID: {pending_request.id} for Worker: {worker.username}.")
-        find_and_assign_worker(pending_request)
+    result = assign_next_pending(worker)
+    if result:
+        logger.info(f"Assigned pending Request ID: {result.request_id} to Worker: {worker.username}.")
+    elif result.outcome == LOST_WORKER:
+        logger.debug(f"Worker {worker.username} is busy, skipping pending task check.")
     else:
         logger.debug(f"No pending tasks found for Cat: {category} for Worker: {worker.username}")
 
@@ -117,6 +128,18 @@ def about_page(request):
 def contact_page(request):
     return render(request, 'contact.html')
 
+def _has_metrics_token(request):
+    token = settings.CLEANIFY_METRICS_TOKEN
+    scheme, _space, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    return bool(token) and scheme.lower() == 'bearer' and hmac.compare_digest(credentials.strip().encode(), token.encode())
+
+def metrics_view(request):
+    """ Prometheus scrape endpoint; open to staff, CLEANIFY_METRICS_TOKEN bearers and CLEANIFY_METRICS_ALLOWED_IPS. """
+    allowed = _has_metrics_token(request) or request.META.get('REMOTE_ADDR') in settings.CLEANIFY_METRICS_ALLOWED_IPS
+    if not allowed and not (request.user.is_authenticated and request.user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(get_registry().render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 def signup_view(request):
     if request.method == 'POST':
         form = CustomUserCreationForm(request.POST)
@@ -126,8 +149,6 @@ def signup_view(request):
                 logger.info(f"New user '{user.username}' created with role '{user.profile.role}'.")
                 if user.profile.role == 'Worker':
                     logger.debug(f"New worker {user.username} signed up. Checking for pending tasks...")
-                    user.profile.is_busy = False
-                    user.profile.save(update_fields=['is_busy'])
                     try_assign_pending_task_to_worker(user)
                 login(request, user)
                 messages.success(request, "Registration successful! Welcome.")
@@ -180,12 +201,13 @@ def logout_view(request):
 def dashboard_redirect_view(request):
     user = request.user
     logger.debug(f"Dashboard redirect for user '{user.username}'")
-    if not hasattr(user, 'profile'):
+    role_info = get_role_info(user)
+    if role_info is None:
         logger.error(f"User '{user.username}' redirecting but has no profile!")
         messages.error(request, "Profile missing or incomplete. Contact support.")
         logout(request)
         return redirect('login')
-    role = user.profile.role
+    role = role_info.role
     if user.is_superuser or user.is_staff:
         logger.info(f"Redirecting admin user '{user.username}' to admin dashboard.")
         return redirect('admin_dashboard')
@@ -203,13 +225,19 @@ def dashboard_redirect_view(request):
 
 @requestee_required
 def requestee_dashboard(request):
-    """Displays the requestee's submitted requests."""
-    my_requests = WasteRequest.objects.filter(requestee=request.user).select_related('assigned_worker').order_by('-updated_at')
-    pending_approval = my_requests.filter(status='Pending Approval')
-    other = my_requests.exclude(status='Pending Approval')
+    """Displays the requestee's submitted requests. Nothing is queried when the cached fragment is current."""
+    cursor = request.GET.get('cursor')
+    my_requests = WasteRequest.objects.filter(requestee=request.user).select_related('assigned_worker')
+    pending_approval = my_requests.filter(status='Pending Approval').order_by('-updated_at')
+    other = SimpleLazyObject(lambda: keyset_page(
+        my_requests.exclude(status='Pending Approval'), 'updated_at',
+        token=cursor, page_size=REQUEST_HISTORY_PAGE_SIZE,
+    ))
     context = {
         'pending_approval_requests': pending_approval,
         'other_requests': other,
+        'fragment_scopes': [user_scope(request.user.pk)],
+        'cursor': cursor,
     }
     return render(request, 'requestee/dashboard.html', context)
 
@@ -224,6 +252,7 @@ def create_request_view(request):
                 waste_request.requestee = request.user
                 waste_request.status = 'Pending'
                 waste_request.save()
+                schedule_derivatives(waste_request, 'request_image')
                 logger.info(f"Requestee '{request.user.username}' created Request ID: {waste_request.id} (Category: {waste_request.category})")
                 messages.success(request, "Request submitted successfully! Assigning worker...")
                 assigned = find_and_assign_worker(waste_request)
@@ -247,11 +276,12 @@ def create_request_view(request):
 def approve_request_view(request, request_id):
     """
     Handles requestee approval/rejection and rating.
-    Rating is saved REGARDLESS of approval status if form is valid.
-    Average rating is updated REGARDLESS of approval status if form is valid.
+    Rating is saved on the request REGARDLESS of approval status if form is valid.
+    The worker's running rating totals only count approved (Completed) work, because
+    a rejected request is detached from its worker and goes back to the queue.
     """
     waste_request = get_object_or_404(
-        WasteRequest.objects.select_related('assigned_worker', 'assigned_worker__profile'),
+        WasteRequest.objects.select_related('assigned_worker', 'assigned_worker__profile', 'building'),
         id=request_id,
         requestee=request.user,
         status='Pending Approval'
@@ -272,43 +302,53 @@ def approve_request_view(request, request_id):
                 approval_instance.is_approved_by_student = True
                 approval_instance.status = 'Completed'
                 approval_instance.approved_at = timezone.now()
-                logger.info(f"Request ID: {request_id} APPROVED by Requestee: {request.user.username}")
-                messages.success(request, "Work approved and marked as Completed. Feedback submitted.")
             else:
                 approval_instance.is_approved_by_student = False
                 approval_instance.status = 'Pending'
                 approval_instance.assigned_worker = None
                 approval_instance.assigned_at = None
                 approval_instance.approved_at = None
+                approval_instance.requeue_after_rejection()
+
+            with transaction.atomic():
+                # Of two submissions (a double click, a second tab) only the first still finds it awaiting
+                # approval, so the image is released, the transition announced and the rating counted once.
+                claimed = approval_instance.claim('Pending Approval')
+                if claimed:
+                    if not is_approved:
+                        # Only drops this request's reference to the stored image, together with the save.
+                        if approval_instance.completion_image:
+                            try:
+                                approval_instance.completion_image.delete(save=False)
+                                logger.info(f"Released completion image for rejected Request ID: {request_id}")
+                            except Exception as img_del_err:
+                                logger.error(f"Error deleting completion_image for Request ID: {request_id}: {img_del_err}")
+                        approval_instance.completion_image = None
+                        discard_derivatives(approval_instance, 'completion_image')
+                    approval_instance.save()
+                    logger.debug(f"Saved Request ID: {request_id} with Status: {approval_instance.status}, Rating: {approval_instance.worker_rating}")
+
+                    if original_worker and is_approved:
+                        logger.debug(f"Recording rating for original worker: {original_worker.username}")
+                        try:
+                            original_worker.profile.record_rating(approval_instance.worker_rating)
+                        except UserProfile.DoesNotExist:
+                            logger.error(f"UserProfile not found for worker {original_worker.username} during rating update!")
+                    elif not original_worker:
+                         logger.warning(f"Original worker not found for Request ID: {request_id} when updating rating.")
+
+            if not claimed:
+                logger.info(f"Request ID: {request_id} was already reviewed; ignoring repeated submission by {request.user.username}")
+                messages.info(request, "This request has already been reviewed.")
+            elif is_approved:
+                logger.info(f"Request ID: {request_id} APPROVED by Requestee: {request.user.username}")
+                messages.success(request, "Work approved and marked as Completed. Feedback submitted.")
+            else:
                 logger.info(f"Request ID: {request_id} REJECTED by Requestee: {request.user.username}. Status set to Pending.")
-                if approval_instance.completion_image:
-                    try:
-                        approval_instance.completion_image.delete(save=False)
-                        logger.info(f"Deleted completion image for rejected Request ID: {request_id}")
-                    except Exception as img_del_err:
-                        logger.error(f"Error deleting completion_image for Request ID: {request_id}: {img_del_err}")
-                approval_instance.completion_image = None 
-                approval_instance.completion_image = None 
                 messages.warning(request, "Work not approved. Returned to Pending queue. Your rating has been recorded.")
-
-            approval_instance.save()
-            logger.debug(f"Saved Request ID: {request_id} with Status: {approval_instance.status}, Rating: {approval_instance.worker_rating}")
-
-            if original_worker:
-                logger.debug(f"Attempting to update average rating for original worker: {original_worker.username}")
-                try:
-                    worker_profile = original_worker.profile
-                    worker_profile.update_average_rating()
-                except UserProfile.DoesNotExist:
-                    logger.error(f"UserProfile not found for worker {original_worker.username} during rating update!")
-                except Exception as e:
-                    logger.error(f"Could not update rating profile for worker {original_worker.username}. Error: {e}", exc_info=True)
-            else:
-                 logger.warning(f"Original worker not found for Request ID: {request_id} when updating rating.")
-
-            if not is_approved:
                 logger.debug(f"Attempting immediate re-assignment for rejected Request ID: {request_id}")
-                find_and_assign_worker(approval_instance)
+                # The rejected worker just finished here, so they would always be the nearest.
+                find_and_assign_worker(approval_instance, exclude=original_worker.pk if original_worker else None)
 
             return redirect('requestee_dashboard')
         else:
@@ -320,49 +360,44 @@ def approve_request_view(request, request_id):
     context = { 'form': form, 'waste_request': waste_request }
     return render(request, 'requestee/approve_request.html', context)
 
-@worker_required
-def worker_dashboard(request):
-    """Displays the worker's currently assigned task and average rating. Uses UserProfile."""
-    worker = request.user
-    try:
-        if hasattr(worker, 'profile'):
-            worker.profile.update_busy_status()
-        else:
-             logger.error(f"UserProfile missing for worker {worker.username} on dashboard!")
-             UserProfile.objects.get_or_create(user=worker, defaults={'role': 'Worker'}) 
-             UserProfile.objects.get_or_create(user=worker, defaults={'role': 'Worker'}) 
-    except Exception as e:
-         logger.error(f"Error updating busy status for worker {worker.username} on dashboard: {e}")
-
-    current_task = WasteRequest.objects.filter(
-        assigned_worker=worker,
-        status='Assigned'
-    ).select_related('requestee').first()
-
-    avg_rating = None
+def _worker_summary(worker):
+    """ The worker's current task and rating text; one query loads profile, task and requestee. """
+    worker_profile = UserProfile.objects.select_related('current_task__requestee').filter(user=worker).first()
+    current_task = None
     rating_str = "Not Rated Yet"
-    try:
-        worker_profile = UserProfile.objects.get(user=worker)
-        avg_rating = worker_profile.average_rating
-        if avg_rating is not None:
-             rating_str = f"{avg_rating:.2f} / 5.00"
-    except UserProfile.DoesNotExist:
-        logger.error(f"UserProfile still missing for worker {worker.username} after get_or_create attempt!")
+    if worker_profile is None:
+        logger.error(f"UserProfile missing for worker {worker.username} on dashboard!")
         rating_str = "Profile Error"
-    except Exception as e:
-        logger.error(f"Error fetching profile/rating for worker {worker.username} on dashboard: {e}", exc_info=True)
-        rating_str = "Rating Error"
+    else:
+        current_task = worker_profile.current_task
+        if worker_profile.average_rating is not None:
+            rating_str = f"{worker_profile.average_rating:.2f} / 5.00"
+    return {'current_task': current_task, 'average_rating_str': rating_str}
 
-    completed_tasks = WasteRequest.objects.filter(
-        assigned_worker=worker,
-        status='Completed'
-    ).select_related('requestee').order_by('-approved_at')[:10] 
 
+@worker_required
+def worker_dashboard(request):
+    """Displays the worker's currently assigned task and average rating. Read-only, and loaded only when the cached fragment is stale."""
+    worker = request.user
+    cursor = request.GET.get('cursor')
+    summary = SimpleLazyObject(lambda: _worker_summary(worker))
+    completed_tasks = SimpleLazyObject(lambda: keyset_page(
+        WasteRequest.objects.filter(
+            assigned_worker=worker,
+            status='Completed',
+            approved_at__isnull=False
+        ).select_related('requestee'),
+        'approved_at',
+        token=cursor,
+        page_size=WORKER_HISTORY_PAGE_SIZE,
+    ))
 
     context = {
-        'current_task': current_task,
-        'average_rating_str': rating_str,
-        'completed_tasks': completed_tasks, 
+        'current_task': SimpleLazyObject(lambda: summary['current_task']),
+        'average_rating_str': SimpleLazyObject(lambda: summary['average_rating_str']),
+        'completed_tasks': completed_tasks,
+        'fragment_scopes': [user_scope(worker.pk)],
+        'cursor': cursor,
     }
     return render(request, 'worker/dashboard.html', context)
 
@@ -371,7 +406,7 @@ def worker_dashboard(request):
 def complete_task_view(request, request_id):
     """Handles the worker marking a task as complete and uploading proof. Uses UserProfile."""
     waste_request = get_object_or_404(
-        WasteRequest,
+        WasteRequest.objects.select_related('building'),
         id=request_id,
         assigned_worker=request.user,
         status='Assigned'
@@ -384,21 +419,32 @@ def complete_task_view(request, request_id):
             try:
                 completion_instance = form.save(commit=False)
                 completion_instance.status = 'Pending Approval'
-                completion_instance.save()
+                with transaction.atomic():
+                    if not completion_instance.claim('Assigned'):
+                        logger.info(f"Request ID: {request_id} was already submitted; ignoring repeated submission by {request.user.username}")
+                        messages.info(request, "This task has already been submitted.")
+                        return redirect('worker_dashboard')
+                    completion_instance.save()
+                    # The worker is free again in the same transaction as the status change.
+                    worker_profile = getattr(request.user, 'profile', None)
+                    if worker_profile is not None:
+                        worker_profile.current_task = None
+                        # The worker is now at the building they just cleaned, which is where the pool looks for them.
+                        moved = worker_profile.move_to(waste_request.building) if waste_request.building_id else []
+                        worker_profile.save(update_fields=['current_task'] + moved)
+                    else:
+                        logger.error(f"UserProfile missing for worker {request.user.username} when trying to mark as free!")
+                schedule_derivatives(completion_instance, 'completion_image')
 
                 logger.info(f"Worker '{request.user.username}' submitted Request ID: {request_id} for approval.")
                 messages.success(request, "Task submitted for approval. Image uploaded.")
 
-                try:
-                    worker_profile = request.user.profile
-                    worker_profile.is_busy = False
-                    worker_profile.save(update_fields=['is_busy'])
+                if worker_profile is not None:
                     logger.debug(f"Marked worker {request.user.username} as free.")
-                    try_assign_pending_task_to_worker(request.user)
-                except UserProfile.DoesNotExist:
-                     logger.error(f"UserProfile missing for worker {request.user.username} when trying to mark as free!")
-                except Exception as e_busy:
-                     logger.error(f"Error updating busy status or assigning next task for {request.user.username}: {e_busy}", exc_info=True)
+                    try:
+                        try_assign_pending_task_to_worker(request.user)
+                    except Exception as e_busy:
+                         logger.error(f"Error assigning next task for {request.user.username}: {e_busy}", exc_info=True)
 
                 return redirect('worker_dashboard')
 
@@ -417,10 +463,12 @@ def complete_task_view(request, request_id):
 
 @admin_required
 def admin_dashboard(request):
-    total_pending = WasteRequest.objects.filter(status='Pending').count()
-    total_assigned = WasteRequest.objects.filter(status='Assigned').count()
-    total_pending_approval = WasteRequest.objects.filter(status='Pending Approval').count()
-    total_completed = WasteRequest.objects.filter(status='Completed').count()
+    # Lazy like the querysets below: a current cached fragment needs none of them.
+    totals = SimpleLazyObject(RequestStatusCount.totals_by_status)
+    total_pending = SimpleLazyObject(lambda: totals['Pending'])
+    total_assigned = SimpleLazyObject(lambda: totals['Assigned'])
+    total_pending_approval = SimpleLazyObject(lambda: totals['Pending Approval'])
+    total_completed = SimpleLazyObject(lambda: totals['Completed'])
     recent_pending = WasteRequest.objects.filter(status='Pending').select_related('requestee').order_by('-created_at')[:15]
     recent_assigned = WasteRequest.objects.filter(status='Assigned').select_related('requestee', 'assigned_worker').order_by('-assigned_at')[:15]
     recent_pending_approval = WasteRequest.objects.filter(status='Pending Approval').select_related('requestee', 'assigned_worker').order_by('-updated_at')[:15]
@@ -430,6 +478,7 @@ def admin_dashboard(request):
         'total_pending_approval': total_pending_approval, 'total_completed': total_completed,
         'recent_pending': recent_pending, 'recent_assigned': recent_assigned,
         'recent_pending_approval': recent_pending_approval, 'recent_completed': recent_completed,
+        'fragment_scopes': [ADMIN_SCOPE],
     }
     return render(request, 'admin/dashboard.html', context)
 
@@ -447,17 +496,16 @@ def admin_manual_assign_view(request, request_id):
             manual_assignment = form.save(commit=False)
             assigned_worker = manual_assignment.assigned_worker
             try:
-                worker_profile = assigned_worker.profile
-                if worker_profile.is_busy:
+                result = manual_assign(waste_request.id, assigned_worker)
+                if result.outcome == LOST_WORKER:
                     logger.warning(f"Admin '{request.user.username}' manual assign busy worker '{assigned_worker.username}' to Req ID: {request_id}")
                     messages.error(request, f"Worker '{assigned_worker.username}' is busy. Select a free worker.")
                     context = {'form': form, 'waste_request': waste_request}
                     return render(request, 'admin/assign_worker_override.html', context)
-                manual_assignment.status = 'Assigned'
-                manual_assignment.assigned_at = timezone.now()
-                manual_assignment.save()
-                worker_profile.is_busy = True
-                worker_profile.save(update_fields=['is_busy'])
+                if result.outcome == LOST_REQUEST:
+                    logger.warning(f"Admin '{request.user.username}' lost manual assign race for Req ID: {request_id}")
+                    messages.error(request, "This request was assigned by someone else in the meantime.")
+                    return redirect('admin_dashboard')
                 logger.info(f"Admin '{request.user.username}' MANUALLY assigned Worker '{assigned_worker.username}' to Request ID: {request_id}")
                 messages.success(request, f"Worker {assigned_worker.username} manually assigned!")
                 return redirect('admin_dashboard')
@@ -478,6 +526,119 @@ def admin_manual_assign_view(request, request_id):
     context = { 'form': form, 'waste_request': waste_request, 'workers_available': workers_available }
     return render(request, 'admin/assign_worker_override.html', context)
 
+@admin_required
+def admin_export_view(request):
+    """
+    Streams WasteRequest rows as CSV (default) or JSONL (?format=jsonl), filtered by
+    ?since=, ?until= (created date), ?status=, ?category= (both repeatable) and ?worker= (username).
+    """
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return HttpResponseBadRequest(f"Unknown format {fmt!r}.")
+    try:
+        queryset = export_queryset(
+            since=request.GET.get('since'),
+            until=request.GET.get('until'),
+            statuses=request.GET.getlist('status'),
+            categories=request.GET.getlist('category'),
+            worker=request.GET.get('worker'),
+        )
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    logger.info(f"Admin '{request.user.username}' exporting requests ({fmt}) with filters {request.GET.dict()}")
+    response = StreamingHttpResponse(export_lines(queryset, fmt), content_type=CONTENT_TYPES[fmt])
+    filename = f"cleanify-requests-{timezone.localdate():%Y%m%d}.{fmt}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@admin_required
+def admin_search_view(request):
+    """
+    Ranked full-text search over request locations and descriptions for staff tools:
+    ?q= (every word must match, as a word or word prefix) and ?limit= (default 20, at most 200).
+    Answers {"query", "results": [...]}, best match first; "snippet" marks matched words with [ ].
+    """
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = min(max(int(request.GET.get('limit', SEARCH_DEFAULT_LIMIT)), 1), SEARCH_MAX_LIMIT)
+    except ValueError:
+        return HttpResponseBadRequest("limit must be a number.")
+    if search_available():
+        matches = ranked_matches(query, limit)
+    else:
+        matches = [(pk, None, None) for pk in search_requests(WasteRequest.objects.all(), query).values_list('pk', flat=True)[:limit]]
+    requests_by_id = WasteRequest.objects.select_related('requestee', 'assigned_worker').in_bulk([pk for pk, _rank, _snippet in matches])
+    results = []
+    for pk, rank, snippet in matches:
+        waste_request = requests_by_id.get(pk)
+        if waste_request is None:
+            continue
+        results.append({
+            'id': pk,
+            'rank': rank,
+            'snippet': snippet,
+            'location': waste_request.location,
+            'category': waste_request.category,
+            'status': waste_request.status,
+            'requestee': waste_request.requestee.username,
+            'assigned_worker': waste_request.assigned_worker.username if waste_request.assigned_worker else None,
+            'created_at': waste_request.created_at.isoformat(),
+            'admin_url': reverse('admin:waste_management_wasterequest_change', args=[pk]),
+        })
+    logger.debug(f"Admin '{request.user.username}' searched for {query!r}: {len(results)} results")
+    return JsonResponse({'query': query, 'results': results})
+
+SLA_RANGES = (7, 30, 90, 365)
+
+def _format_duration(seconds):
+    """ 'Xd Yh', 'Xh Ym' or 'Xm' for a number of seconds; '---' when there is nothing to average. """
+    if seconds is None:
+        return "---"
+    minutes = int(seconds // 60)
+    if minutes >= 24 * 60:
+        return f"{minutes // (24 * 60)}d {minutes % (24 * 60) // 60}h"
+    if minutes >= 60:
+        return f"{minutes // 60}h {minutes % 60}m"
+    return f"{minutes}m"
+
+def _format_sla_row(row):
+    row['avg_assign'] = _format_duration(row['avg_assign_seconds'])
+    row['avg_complete'] = _format_duration(row['avg_complete_seconds'])
+    row['approval'] = f"{row['approval_rate']:.0%}" if row['approval_rate'] is not None else "---"
+    return row
+
+@admin_required
+def admin_sla_view(request):
+    """
+    Time-to-assign, time-to-complete and approval rates per category and per day over the
+    last ?days= days (7, 30, 90 or 365). Reads only the SlaRollup table, never WasteRequest.
+    """
+    try:
+        days = int(request.GET.get('days', 30))
+    except ValueError:
+        days = 30
+    if days not in SLA_RANGES:
+        days = 30
+    until = timezone.localdate()
+    since = until - timedelta(days=days - 1)
+    by_category, by_day = SlaRollup.report(since, until)
+    context = {
+        'days': days, 'ranges': SLA_RANGES, 'since': since, 'until': until,
+        'by_category': [_format_sla_row(row) for row in by_category],
+        'by_day': [_format_sla_row(row) for row in by_day],
+    }
+    return render(request, 'admin/sla.html', context)
+
+@require_safe
+@login_required
+def media_view(request, name):
+    """ An uploaded image, for staff and the requestee or assigned worker of a request showing it. """
+    path = media_path(name)
+    # The same 404 for a missing file and someone else's, so names cannot be probed.
+    if path is None or not can_view(request.user, name):
+        raise Http404("No such media file")
+    return serve_media(request, name, path)
+
 def custom_404(request, exception):
     logger.warning(f"404 Not Found: {request.path} Exception: {exception}")
     return render(request, 'error.html', {'error_code': 404, 'error_message': 'Page Not Found'}, status=404)
@@ -0,0 +1,482 @@
+
+import heapq
+import itertools
+import math
+import random
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Max
+import logging
+
+from .models import CATEGORY_CHOICES
+
+logger = logging.getLogger(__name__)
+
+
+POLICY_RANDOM = 'random'
+POLICY_LEAST_RECENT = 'least_recent'
+POLICY_RATING = 'rating'
+
+POLICY_CHOICES = (POLICY_RANDOM, POLICY_LEAST_RECENT, POLICY_RATING)
+
+
+class _RandomBucket:
+    """ Free workers of one category; uniform random pick via swap-remove on a list. """
+
+    def __init__(self):
+        self._ids = []
+        self._index = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, worker_id):
+        return worker_id in self._index
+
+    def add(self, worker_id, rating=None):
+        if worker_id in self._index:
+            return
+        self._index[worker_id] = len(self._ids)
+        self._ids.append(worker_id)
+
+    def remove(self, worker_id):
+        """ Removes the worker; returns their key for restore() (order is random, so there is none). """
+        position = self._index.pop(worker_id, None)
+        if position is None:
+            return None
+        last = self._ids.pop()
+        if last != worker_id:
+            self._ids[position] = last
+            self._index[last] = position
+        return None
+
+    def restore(self, worker_id, key):
+        self.add(worker_id)
+
+    def pop(self, exclude=None):
+        """ Removes and returns (worker ID, key) of a random worker, (None, None) if empty. """
+        if not self._ids:
+            return None, None
+        # Draw from the other slots only, so the pick stays uniform among the rest.
+        skip = self._index.get(exclude) if len(self._ids) > 1 else None
+        position = random.randrange(len(self._ids) - (skip is not None))
+        if skip is not None and position >= skip:
+            position += 1
+        worker_id = self._ids[position]
+        return worker_id, self.remove(worker_id)
+
+
+class _LeastRecentBucket:
+    """ Free workers of one category in the order they became free; the longest idle is picked first. """
+
+    def __init__(self):
+        # worker ID -> sequence number of when they joined, which is also the dict's order.
+        self._ids = OrderedDict()
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, worker_id):
+        return worker_id in self._ids
+
+    def add(self, worker_id, rating=None):
+        if worker_id not in self._ids:
+            self._ids[worker_id] = next(self._counter)
+
+    def remove(self, worker_id):
+        return self._ids.pop(worker_id, None)
+
+    def restore(self, worker_id, key):
+        """ Puts a removed worker back at the place `key` held in the queue. """
+        if worker_id in self._ids or key is None:
+            return
+        self._ids[worker_id] = key
+        # Only after a lost claim, so re-sorting the category's queue is affordable.
+        self._ids = OrderedDict(sorted(self._ids.items(), key=lambda item: item[1]))
+
+    def pop(self, exclude=None):
+        if not self._ids:
+            return None, None
+        first_two = list(itertools.islice(self._ids, 2))
+        worker_id = next((w for w in first_two if w != exclude), first_two[0])
+        return worker_id, self.remove(worker_id)
+
+
+class _RatingBucket:
+    """
+    Free workers of one category keyed by average rating (unrated workers last).
+    Uses a heap with lazy deletion, so pick/return are O(log n) rather than O(1).
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._entries = {}
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, worker_id):
+        return worker_id in self._entries
+
+    def add(self, worker_id, rating=None):
+        if worker_id in self._entries:
+            return
+        entry = (-(rating if rating is not None else -1.0), next(self._counter), worker_id)
+        self._entries[worker_id] = entry
+        heapq.heappush(self._heap, entry)
+
+    def remove(self, worker_id):
+        # The heap entry stays behind and is skipped in pop(); compact once stale entries dominate.
+        entry = self._entries.pop(worker_id, None)
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = list(self._entries.values())
+            heapq.heapify(self._heap)
+        return entry
+
+    def restore(self, worker_id, key):
+        """ Puts a removed worker back under the rating and tie-break `key` they were removed with. """
+        if worker_id in self._entries or key is None:
+            return
+        # A new tuple, so a stale copy of the old one left in the heap is still recognised as stale.
+        entry = (key[0], key[1], worker_id)
+        self._entries[worker_id] = entry
+        heapq.heappush(self._heap, entry)
+
+    def pop(self, exclude=None):
+        held = picked = None
+        while self._heap and picked is None:
+            entry = heapq.heappop(self._heap)
+            if self._entries.get(entry[2]) is not entry:
+                continue
+            if entry[2] == exclude:
+                held = entry
+            else:
+                picked = entry
+        if held is not None:
+            if picked is None:
+                picked = held
+            else:
+                heapq.heappush(self._heap, held)
+        if picked is None:
+            return None, None
+        del self._entries[picked[2]]
+        return picked[2], picked
+
+
+class _SpatialGrid:
+    """
+    Free workers of one category with a known location, bucketed into square cells.
+    nearest() searches outward ring by ring and stops as soon as no unvisited cell
+    can hold anyone closer, so a pick looks at a handful of cells, not every worker.
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = float(cell_size)
+        self._cells = defaultdict(set)
+        self._positions = {}
+        # Cell bounds ever used; only grow, which keeps them a valid search limit.
+        self._bounds = None
+
+    def __len__(self):
+        return len(self._positions)
+
+    def _cell(self, x, y):
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def add(self, worker_id, location):
+        self.remove(worker_id)
+        cell = self._cell(*location)
+        self._cells[cell].add(worker_id)
+        self._positions[worker_id] = (location, cell)
+        if self._bounds is None:
+            self._bounds = [cell[0], cell[1], cell[0], cell[1]]
+        else:
+            bounds = self._bounds
+            bounds[0], bounds[1] = min(bounds[0], cell[0]), min(bounds[1], cell[1])
+            bounds[2], bounds[3] = max(bounds[2], cell[0]), max(bounds[3], cell[1])
+
+    def remove(self, worker_id):
+        """ Removes the worker; returns their location, or None if they were not in the grid. """
+        entry = self._positions.pop(worker_id, None)
+        if entry is None:
+            return None
+        location, cell = entry
+        members = self._cells[cell]
+        members.discard(worker_id)
+        if not members:
+            del self._cells[cell]
+        return location
+
+    def _ring(self, cx, cy, ring):
+        if ring == 0:
+            yield (cx, cy)
+            return
+        for dx in range(-ring, ring + 1):
+            yield (cx + dx, cy - ring)
+            yield (cx + dx, cy + ring)
+        for dy in range(-ring + 1, ring):
+            yield (cx - ring, cy + dy)
+            yield (cx + ring, cy + dy)
+
+    def nearest(self, x, y, exclude=None):
+        """ The ID of the worker closest to (x, y) other than `exclude`, or None if there is none. """
+        if not self._positions:
+            return None
+        cx, cy = self._cell(x, y)
+        min_x, min_y, max_x, max_y = self._bounds
+        last_ring = max(cx - min_x, max_x - cx, cy - min_y, max_y - cy)
+        best, best_distance = None, math.inf
+        for ring in range(last_ring + 1):
+            for cell in self._ring(cx, cy, ring):
+                for worker_id in self._cells.get(cell, ()):
+                    if worker_id == exclude:
+                        continue
+                    (wx, wy), _cell = self._positions[worker_id]
+                    distance = math.hypot(wx - x, wy - y)
+                    if distance < best_distance or (distance == best_distance and worker_id < best):
+                        best, best_distance = worker_id, distance
+            # Anything in the next ring out is at least this far away.
+            if best is not None and best_distance <= ring * self.cell_size:
+                break
+        return best
+
+
+_BUCKET_CLASSES = {
+    POLICY_RANDOM: _RandomBucket,
+    POLICY_LEAST_RECENT: _LeastRecentBucket,
+    POLICY_RATING: _RatingBucket,
+}
+
+
+class FreeWorkerPool:
+    """
+    In-memory, per-category pool of free worker IDs for this process.
+
+    The pool is a hint, not the source of truth: callers must still claim the
+    picked worker in the database (see find_and_assign_worker). It is filled from
+    the database the first time it is used, kept current by the UserProfile/User
+    signals in signals.py, and re-read per category on a miss (throttled by
+    miss_refresh_interval) so that workers freed by other processes are found.
+
+    Workers with a last known location are also kept in a per-category spatial
+    grid, so pick(category, near=(x, y)) returns the closest of them; the policy
+    only decides among workers whose location is unknown.
+    """
+
+    def __init__(self, policy=POLICY_RANDOM, miss_refresh_interval=2.0, cell_size=100.0):
+        if policy not in _BUCKET_CLASSES:
+            raise ValueError(f"Unknown worker pool policy '{policy}'. Choose one of {POLICY_CHOICES}.")
+        self.policy = policy
+        self.miss_refresh_interval = miss_refresh_interval
+        self.cell_size = cell_size
+        self._lock = threading.RLock()
+        self._buckets = {}
+        self._grids = {}
+        self._membership = {}
+        # worker ID -> (category, bucket key, location) as pick() took them, for unpick().
+        self._picked = {}
+        self._last_refresh = {}
+        self._loaded = False
+
+    def _bucket(self, category):
+        bucket = self._buckets.get(category)
+        if bucket is None:
+            bucket = self._buckets[category] = _BUCKET_CLASSES[self.policy]()
+        return bucket
+
+    def _grid(self, category):
+        grid = self._grids.get(category)
+        if grid is None:
+            grid = self._grids[category] = _SpatialGrid(self.cell_size)
+        return grid
+
+    def _add(self, worker_id, category, rating, location):
+        self._bucket(category).add(worker_id, rating)
+        if location is not None:
+            self._grid(category).add(worker_id, location)
+        self._membership[worker_id] = category
+
+    def _remove(self, worker_id, category):
+        """ Removes the worker from the category's bucket and grid; returns (bucket key, location). """
+        key = self._bucket(category).remove(worker_id)
+        grid = self._grids.get(category)
+        return key, grid.remove(worker_id) if grid is not None else None
+
+    def _free_workers_queryset(self, category=None):
+        queryset = User.objects.filter(
+            profile__role='Worker',
+            profile__category__isnull=False,
+            profile__current_task__isnull=True,
+            is_active=True
+        )
+        if category is not None:
+            queryset = queryset.filter(profile__category=category)
+        if self.policy == POLICY_LEAST_RECENT:
+            queryset = queryset.annotate(last_assigned=Max('assigned_tasks__assigned_at')).order_by('last_assigned', 'id')
+        return queryset.values_list('id', 'profile__category', 'profile__average_rating', 'profile__location_x', 'profile__location_y')
+
+    def rebuild(self):
+        """ Reloads every category from the database. """
+        rows = list(self._free_workers_queryset())
+        with self._lock:
+            self._buckets = {}
+            self._grids = {}
+            self._membership = {}
+            self._picked = {}
+            now = time.monotonic()
+            for worker_id, category, rating, x, y in rows:
+                self._add(worker_id, category, rating, _location(x, y))
+            self._last_refresh = {category: now for category, _label in CATEGORY_CHOICES}
+            self._loaded = True
+        logger.info(f"Worker pool rebuilt with {len(rows)} free workers (policy: {self.policy}).")
+
+    def refresh_category(self, category):
+        """ Reloads a single category from the database. """
+        rows = list(self._free_workers_queryset(category))
+        with self._lock:
+            for worker_id in [w for w, c in self._membership.items() if c == category]:
+                del self._membership[worker_id]
+            for worker_id in [w for w, picked in self._picked.items() if picked[0] == category]:
+                del self._picked[worker_id]
+            self._buckets[category] = _BUCKET_CLASSES[self.policy]()
+            self._grids.pop(category, None)
+            for worker_id, _category, rating, x, y in rows:
+                self._add(worker_id, category, rating, _location(x, y))
+            self._last_refresh[category] = time.monotonic()
+        logger.debug(f"Worker pool refreshed category '{category}': {len(rows)} free workers.")
+
+    def ensure_loaded(self):
+        if not self._loaded:
+            self.rebuild()
+
+    def invalidate(self):
+        """ Drops all state; the next pick() reloads from the database. """
+        with self._lock:
+            self._buckets = {}
+            self._grids = {}
+            self._membership = {}
+            self._picked = {}
+            self._last_refresh = {}
+            self._loaded = False
+
+    def _take(self, category, near, exclude):
+        """
+        Removes and returns the nearest located worker if `near` is given, else the policy's pick.
+        `exclude` is only returned when no other worker is free. Lock held.
+        """
+        worker_id = None
+        grid = self._grids.get(category)
+        if near is not None and grid:
+            worker_id = grid.nearest(*near, exclude=exclude)
+        if worker_id is None:
+            worker_id, key = self._bucket(category).pop(exclude)
+            location = grid.remove(worker_id) if grid is not None and worker_id is not None else None
+        else:
+            key, location = self._remove(worker_id, category)
+        if worker_id is not None:
+            self._membership.pop(worker_id, None)
+            self._picked[worker_id] = (category, key, location)
+        return worker_id
+
+    def pick(self, category, near=None, exclude=None):
+        """
+        Removes and returns a free worker ID for the category (the closest to `near`, an (x, y), if given),
+        or None. The worker `exclude` is passed over unless they are the only one free.
+        """
+        self.ensure_loaded()
+        with self._lock:
+            worker_id = self._take(category, near, exclude)
+            if worker_id is not None:
+                return worker_id
+            last_refresh = self._last_refresh.get(category, 0.0)
+        if time.monotonic() - last_refresh < self.miss_refresh_interval:
+            return None
+        self.refresh_category(category)
+        with self._lock:
+            return self._take(category, near, exclude)
+
+    def unpick(self, worker_id):
+        """
+        Puts back a worker that pick() returned but who did not get the request (it was
+        claimed elsewhere), under the same rating or queue position and location as before.
+        """
+        with self._lock:
+            picked = self._picked.pop(worker_id, None)
+            if picked is None or worker_id in self._membership:
+                return
+            category, key, location = picked
+            self._bucket(category).restore(worker_id, key)
+            if location is not None:
+                self._grid(category).add(worker_id, location)
+            self._membership[worker_id] = category
+
+    def release(self, worker_id, category, rating=None, location=None):
+        """ Puts a (now free) worker back into the pool for its category, at `location` if known. """
+        if not category:
+            return
+        with self._lock:
+            self._picked.pop(worker_id, None)
+            previous = self._membership.get(worker_id)
+            if previous == category:
+                if location is not None:
+                    self._grid(category).add(worker_id, location)
+                return
+            if previous is not None:
+                self._remove(worker_id, previous)
+            self._add(worker_id, category, rating, location)
+
+    def discard(self, worker_id):
+        """ Removes a worker from the pool, wherever it is. """
+        with self._lock:
+            self._picked.pop(worker_id, None)
+            category = self._membership.pop(worker_id, None)
+            if category is not None:
+                self._remove(worker_id, category)
+
+    def sync_profile(self, profile, is_active=True):
+        """ Applies the current state of a UserProfile to the pool. """
+        if not self._loaded:
+            return
+        if profile.role == 'Worker' and profile.category and not profile.is_busy and is_active:
+            self.release(profile.user_id, profile.category, profile.average_rating, profile.location)
+        else:
+            self.discard(profile.user_id)
+
+    def size(self, category=None):
+        with self._lock:
+            if category is not None:
+                bucket = self._buckets.get(category)
+                return len(bucket) if bucket is not None else 0
+            return len(self._membership)
+
+    def __contains__(self, worker_id):
+        with self._lock:
+            return worker_id in self._membership
+
+
+def _location(x, y):
+    return None if x is None or y is None else (x, y)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool():
+    """ Returns this process's FreeWorkerPool, configured from settings. """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = FreeWorkerPool(
+                    policy=getattr(settings, 'CLEANIFY_WORKER_POOL_POLICY', POLICY_RANDOM),
+                    miss_refresh_interval=getattr(settings, 'CLEANIFY_WORKER_POOL_MISS_REFRESH', 2.0),
+                    cell_size=getattr(settings, 'CLEANIFY_WORKER_GRID_CELL_METRES', 100.0),
+                )
+    return _pool